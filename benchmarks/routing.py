@@ -0,0 +1,98 @@
+"""
+Routing latency of the linear Starlette scan versus the dispatch router.
+
+Builds a main app with `servers` mounted sub-apps of `tools` POST routes each
+and times requests to the last tool of the last server, the worst case for
+the linear scan. Run with:
+
+    python benchmarks/routing.py
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+
+from mcpo.utils.dispatch import install_dispatch_router
+
+
+def build_app(servers: int, tools: int, dispatch: bool) -> FastAPI:
+    main_app = FastAPI()
+    if dispatch:
+        install_dispatch_router(main_app)
+    for server in range(servers):
+        sub_app = FastAPI()
+        if dispatch:
+            install_dispatch_router(sub_app)
+        for tool in range(tools):
+
+            async def handler():
+                return {"ok": True}
+
+            sub_app.add_api_route(f"/tool_{tool}", handler, methods=["POST"])
+        main_app.mount(f"/server_{server}", sub_app)
+    return main_app
+
+
+async def time_requests(app: FastAPI, path: str, requests: int) -> float:
+    """Return the mean time per request in microseconds."""
+    body = json.dumps({}).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+
+    def make_scope():
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("127.0.0.1", 8000),
+        }
+
+    for _ in range(100):
+        await app(make_scope(), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(make_scope(), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument(
+        "--sizes",
+        default="1x10,10x10,10x100,100x100,200x500",
+        help="Comma-separated SERVERSxTOOLS deployment sizes",
+    )
+    options = parser.parse_args()
+
+    print(f"{'servers':>8} {'tools':>8} {'linear us':>10} {'dispatch us':>12}")
+    for size in options.sizes.split(","):
+        servers, tools = (int(n) for n in size.split("x"))
+        path = f"/server_{servers - 1}/tool_{tools - 1}"
+        linear = await time_requests(
+            build_app(servers, tools, dispatch=False), path, options.requests
+        )
+        dispatch = await time_requests(
+            build_app(servers, tools, dispatch=True), path, options.requests
+        )
+        print(f"{servers:>8} {servers * tools:>8} {linear:>10.1f} {dispatch:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Payload size and CPU time of JSON versus MessagePack and CBOR tool bodies.
+
+Builds a tool endpoint over a canned MCP session and times requests for a few
+result shapes, each in every format, through the whole ASGI app: result
+processing, encoding and, for uploads, decoding and validating the request.
+Needs the 'binary' extra (pip install mcpo[binary]). Run with:
+
+    python benchmarks/serialization.py
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import json
+import os
+import time
+
+import cbor2
+import msgpack
+from fastapi import FastAPI
+from mcp import types
+
+from mcpo.main import create_dynamic_endpoints
+
+FORMATS = {
+    "json": ("application/json", json.dumps),
+    "msgpack": ("application/msgpack", msgpack.packb),
+    "cbor": ("application/cbor", cbor2.dumps),
+}
+
+TOOL = types.Tool(
+    name="tool",
+    inputSchema={"type": "object", "properties": {"data": {"type": "string"}}},
+)
+
+
+class CannedSession:
+    def __init__(self, result: types.CallToolResult):
+        self.result = result
+
+    async def initialize(self):
+        return types.InitializeResult(
+            protocolVersion="2025-03-26",
+            capabilities=types.ServerCapabilities(),
+            serverInfo=types.Implementation(name="bench", version="1.0"),
+        )
+
+    async def list_tools(self):
+        return types.ListToolsResult(tools=[TOOL])
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        return self.result
+
+
+def image_result(size: int) -> types.CallToolResult:
+    data = base64.b64encode(os.urandom(size)).decode()
+    return types.CallToolResult(
+        content=[
+            types.TextContent(type="text", text="Rendered chart"),
+            types.ImageContent(type="image", data=data, mimeType="image/png"),
+        ]
+    )
+
+
+def records_result(count: int) -> types.CallToolResult:
+    records = [
+        {"id": i, "name": f"item {i}", "price": i * 1.25, "tags": ["a", "b"]}
+        for i in range(count)
+    ]
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=json.dumps(records))],
+        structuredContent={"records": records},
+    )
+
+
+async def time_requests(app, body: bytes, content_type: str, accept: str, requests):
+    """Return the mean time per request in microseconds and the response size."""
+    response_body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            response_body.extend(message.get("body", b""))
+
+    def make_scope():
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/tool",
+            "raw_path": b"/tool",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"content-type", content_type.encode()),
+                (b"accept", accept.encode()),
+            ],
+            "client": ("127.0.0.1", 1234),
+            "server": ("127.0.0.1", 8000),
+        }
+
+    for _ in range(10):
+        await app(make_scope(), receive, send)
+    started = time.process_time()
+    for _ in range(requests):
+        response_body.clear()
+        await app(make_scope(), receive, send)
+    elapsed = time.process_time() - started
+    return elapsed / requests * 1e6, len(response_body)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--image-size", type=int, default=512 * 1024)
+    parser.add_argument("--records", type=int, default=1000)
+    options = parser.parse_args()
+
+    upload = os.urandom(options.image_size)
+    cases = [
+        ("image result", image_result(options.image_size), {}),
+        ("records result", records_result(options.records), {}),
+        # Binary formats carry the upload as bytes, JSON as base64
+        ("image upload", types.CallToolResult(content=[]), {"data": upload}),
+    ]
+
+    print(f"{'case':<16}{'format':<10}{'bytes':>12}{'cpu us':>12}")
+    for name, result, arguments in cases:
+        app = FastAPI()
+        app.state.session = CannedSession(result)
+        await create_dynamic_endpoints(app)
+        for format_name, (media_type, encode) in FORMATS.items():
+            if format_name == "json" and arguments:
+                body = encode({"data": base64.b64encode(upload).decode()}).encode()
+            else:
+                body = encode(arguments)
+                body = body.encode() if isinstance(body, str) else body
+            # The endpoint prints its arguments, keep them out of the table
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    cpu, size = await time_requests(
+                        app, body, media_type, media_type, options.requests
+                    )
+            size = len(body) if arguments else size
+            print(f"{name:<16}{format_name:<10}{size:>12}{cpu:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,11 +2,12 @@ import sys
 import asyncio
 import typer
 import os
-from dotenv import load_dotenv
 
 from typing_extensions import Annotated
 from typing import Optional, List
 
+from mcpo.utils.startup import StartupReport, measure
+
 app = typer.Typer()
 
 
@@ -66,6 +67,249 @@ def main(
     headers: Annotated[
         Optional[str], typer.Option("--header", "-H", help="Headers in JSON format")
     ] = None,
+    enable_tracing: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--enable-tracing",
+            help="Record OpenTelemetry spans for tool calls and propagate trace context to MCP servers",
+        ),
+    ] = False,
+    compression: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--compression",
+            help="Compress responses with zstd, brotli or gzip when the client accepts it",
+        ),
+    ] = False,
+    compression_min_size: Annotated[
+        Optional[int],
+        typer.Option(
+            "--compression-min-size",
+            help="Minimum response size in bytes before compressing",
+        ),
+    ] = 1000,
+    compression_level: Annotated[
+        Optional[int],
+        typer.Option("--compression-level", help="Compression level"),
+    ] = None,
+    max_request_size: Annotated[
+        Optional[int],
+        typer.Option(
+            "--max-request-size", help="Maximum tool request body size in bytes"
+        ),
+    ] = None,
+    max_response_size: Annotated[
+        Optional[int],
+        typer.Option("--max-response-size", help="Maximum tool response size in bytes"),
+    ] = None,
+    oversized_response: Annotated[
+        Optional[str],
+        typer.Option(
+            "--oversized-response",
+            help="How to handle responses over --max-response-size: 'spill' to a temporary file or 'truncate'",
+        ),
+    ] = "spill",
+    async_jobs: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--async-jobs",
+            help="Allow running tool calls as background jobs with ?async=true",
+        ),
+    ] = False,
+    max_concurrent_jobs: Annotated[
+        Optional[int],
+        typer.Option(
+            "--max-concurrent-jobs", help="Maximum running jobs per MCP server"
+        ),
+    ] = 8,
+    job_ttl: Annotated[
+        Optional[float],
+        typer.Option(
+            "--job-ttl", help="Seconds to keep finished job results available"
+        ),
+    ] = 3600,
+    job_store_dir: Annotated[
+        Optional[str],
+        typer.Option("--job-store-dir", help="Directory to persist job results in"),
+    ] = None,
+    max_concurrent_calls: Annotated[
+        Optional[int],
+        typer.Option(
+            "--max-concurrent-calls",
+            help="Maximum concurrent tool calls per MCP server, queued fairly across clients beyond that",
+        ),
+    ] = None,
+    client_id_header: Annotated[
+        Optional[str],
+        typer.Option(
+            "--client-id-header",
+            help="Header identifying clients for fair scheduling, the API key is used when absent",
+        ),
+    ] = "X-Client-ID",
+    session_affinity: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--session-affinity",
+            help="Give each client session header its own MCP server session",
+        ),
+    ] = False,
+    affinity_header: Annotated[
+        Optional[str],
+        typer.Option(
+            "--affinity-header",
+            help="Header carrying the client session for --session-affinity",
+        ),
+    ] = "X-Session-ID",
+    idempotency: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--idempotency",
+            help="Run tool calls with the same Idempotency-Key header once, replaying the outcome to retries",
+        ),
+    ] = False,
+    idempotency_ttl: Annotated[
+        Optional[float],
+        typer.Option(
+            "--idempotency-ttl",
+            help="Seconds to keep the outcome of a call with an Idempotency-Key",
+        ),
+    ] = None,
+    dispatch_router: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--dispatch-router",
+            help="Resolve server and tool routes through a hash map instead of a linear scan",
+        ),
+    ] = False,
+    validate_output: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--validate-output",
+            help="Validate structured tool output against the tool's output schema",
+        ),
+    ] = False,
+    adaptive_concurrency: Annotated[
+        Optional[str],
+        typer.Option(
+            "--adaptive-concurrency",
+            help="Adapt each server's concurrency limit to its latency: 'gradient' or 'aimd'",
+        ),
+    ] = None,
+    websocket: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--websocket",
+            help="Add /ws endpoints for persistent, multiplexed tool calls",
+        ),
+    ] = False,
+    mcp_gateway: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--mcp-gateway",
+            help="Serve all MCP servers' tools as one streamable HTTP MCP server at /mcp",
+        ),
+    ] = False,
+    gateway_separator: Annotated[
+        Optional[str],
+        typer.Option(
+            "--gateway-separator",
+            help="Separator between server and tool names in the MCP gateway",
+        ),
+    ] = None,
+    resources: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--resources",
+            help="Add endpoints listing and reading MCP resources and getting prompts",
+        ),
+    ] = False,
+    resource_cache_size: Annotated[
+        Optional[int],
+        typer.Option(
+            "--resource-cache-size",
+            help="Bytes of resource contents cached per server, 0 to disable caching",
+        ),
+    ] = None,
+    resource_cache_ttl: Annotated[
+        Optional[float],
+        typer.Option(
+            "--resource-cache-ttl",
+            help="Seconds resource reads stay cached, required to cache servers without subscriptions",
+        ),
+    ] = None,
+    tool_search: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--tool-search",
+            help="Add /tools/search and filtered OpenAPI documents at /tools/openapi.json",
+        ),
+    ] = False,
+    share_sessions: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--share-sessions",
+            help="Run config entries with the same command, args and env as one shared server process",
+        ),
+    ] = False,
+    drain_timeout: Annotated[
+        Optional[float],
+        typer.Option(
+            "--drain-timeout",
+            help="On shutdown, reject new requests and give running tool calls this many seconds to finish",
+        ),
+    ] = None,
+    reuse_port: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--reuse-port",
+            help="Listen with SO_REUSEPORT, so a new process can take over the port while this one drains",
+        ),
+    ] = False,
+    fd: Annotated[
+        Optional[int],
+        typer.Option(
+            "--fd", help="Serve on an inherited listening socket file descriptor"
+        ),
+    ] = None,
+    startup_report: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--startup-report",
+            help="Log how long imports, config parsing, and each server's spawn, initialize, list_tools and model generation took",
+        ),
+    ] = False,
+    memory_endpoint: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--memory-endpoint",
+            help="Add /memory endpoints reporting memory use and tracemalloc snapshots",
+        ),
+    ] = False,
+    trace_memory: Annotated[
+        Optional[int],
+        typer.Option(
+            "--trace-memory",
+            help="Trace allocations with tracemalloc from startup, keeping this many frames",
+        ),
+    ] = None,
+    record_traffic: Annotated[
+        Optional[str],
+        typer.Option(
+            "--record-traffic",
+            help="Record sampled tool calls and results to a JSON Lines file (gzipped if it ends in .gz)",
+        ),
+    ] = None,
+    record_sample_rate: Annotated[
+        Optional[float],
+        typer.Option("--record-sample-rate", help="Fraction of tool calls to record"),
+    ] = None,
+    record_redact: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--record-redact",
+            help="Additional argument and result keys to redact in recordings",
+        ),
+    ] = None,
 ):
     server_command = None
     if not config_path:
@@ -81,7 +325,10 @@ def main(
             typer.echo("Error: You must specify the MCP server command after '--'")
             return
 
-    from mcpo.main import run
+    report = StartupReport() if startup_report else None
+    # The server stack is only imported once the arguments are parsed
+    with measure(report, "imports"):
+        from mcpo.main import run
 
     if config_path:
         print("Starting MCP OpenAPI Proxy with config file:", config_path)
@@ -98,6 +345,8 @@ def main(
                 env_dict[key] = value
 
         if env_path:
+            from dotenv import load_dotenv
+
             # Load environment variables from the specified file
             load_dotenv(env_path)
             env_dict.update(dict(os.environ))
@@ -137,6 +386,43 @@ def main(
             ssl_keyfile=ssl_keyfile,
             path_prefix=path_prefix,
             headers=headers,
+            enable_tracing=enable_tracing,
+            compression=compression,
+            compression_min_size=compression_min_size,
+            compression_level=compression_level,
+            max_request_size=max_request_size,
+            max_response_size=max_response_size,
+            oversized_response=oversized_response,
+            async_jobs=async_jobs,
+            max_concurrent_jobs=max_concurrent_jobs,
+            job_ttl=job_ttl,
+            job_store_dir=job_store_dir,
+            max_concurrent_calls=max_concurrent_calls,
+            client_id_header=client_id_header,
+            session_affinity=session_affinity,
+            affinity_header=affinity_header,
+            idempotency=idempotency,
+            idempotency_ttl=idempotency_ttl,
+            dispatch_router=dispatch_router,
+            validate_output=validate_output,
+            adaptive_concurrency=adaptive_concurrency,
+            websocket=websocket,
+            mcp_gateway=mcp_gateway,
+            gateway_separator=gateway_separator,
+            tool_search=tool_search,
+            resources=resources,
+            resource_cache_size=resource_cache_size,
+            resource_cache_ttl=resource_cache_ttl,
+            share_sessions=share_sessions,
+            drain_timeout=drain_timeout,
+            reuse_port=reuse_port,
+            fd=fd,
+            startup_report=report,
+            memory_endpoint=memory_endpoint,
+            trace_memory=trace_memory,
+            record_traffic=record_traffic,
+            record_sample_rate=record_sample_rate,
+            record_redact=record_redact,
         )
     )
 
@@ -1,25 +1,87 @@
+import hashlib
 import json
 import os
 import logging
 import socket
 import asyncio
-from contextlib import AsyncExitStack, asynccontextmanager
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from dataclasses import replace
 from typing import Optional
 
 import uvicorn
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from mcp import ClientSession, StdioServerParameters
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.sse import sse_client
-from mcp.client.stdio import stdio_client
+from mcp.client.stdio import get_default_environment, stdio_client
 from mcp.client.streamable_http import streamablehttp_client
 from starlette.routing import Mount
 
 logger = logging.getLogger(__name__)
 
 
-from mcpo.utils.main import get_model_fields, get_tool_handler
+from mcpo.utils.main import (
+    get_model_fields,
+    get_tool_handler,
+    is_text_output,
+    ToolRoute,
+)
+from mcpo.utils.affinity import (
+    DEFAULT_AFFINITY_HEADER,
+    AffinityPool,
+    AffinitySettings,
+)
 from mcpo.utils.auth import get_verify_api_key, APIKeyMiddleware
+from mcpo.utils.compression import MAX_DECOMPRESSED_SIZE, CompressionMiddleware
+from mcpo.utils.circuit_breaker import ServerCircuitBreakers, get_circuit_breaker
+from mcpo.utils.concurrency import ConcurrencySettings, create_adaptive_limit
+from mcpo.utils.dispatch import install_dispatch_router
+from mcpo.utils.gateway import DEFAULT_SEPARATOR, add_gateway_route
+from mcpo.utils.health import (
+    HEALTH_PATHS,
+    SERVER_ID_ENV,
+    ServerStatus,
+    add_health_routes,
+    find_child_process,
+)
+from mcpo.utils.idempotency import IdempotencySettings, IdempotencyStore
+from mcpo.utils.jobs import JobSettings, JobStore, add_job_routes
+from mcpo.utils.limits import PayloadLimits, ServerPayloadLimits, get_payload_limits
+from mcpo.utils.memory import MemoryProfiler, add_memory_routes
+from mcpo.utils.process import ProcessLimits, supervise_server
+from mcpo.utils.recording import (
+    DEFAULT_REDACT_KEYS,
+    RecordingSettings,
+    TrafficLog,
+    TrafficRecorder,
+)
+from mcpo.utils.resources import (
+    ResourceSettings,
+    add_resource_routes,
+    setup_resource_cache,
+)
+from mcpo.utils.retry import ServerRetryPolicies, get_retry_policy
+from mcpo.utils.scheduling import (
+    DEFAULT_CLIENT_HEADER,
+    FairScheduler,
+    SchedulerSettings,
+    add_scheduler_routes,
+)
+from mcpo.utils.search import ToolIndex, ToolScope, add_tool_search_routes
+from mcpo.utils.sharing import SessionView, SharedSessions, get_launch_key
+from mcpo.utils.shutdown import (
+    DrainMiddleware,
+    DrainState,
+    DrainingServer,
+    create_listening_socket,
+    run_server_lifespans,
+)
+from mcpo.utils.startup import measure
+from mcpo.utils.tracing import configure_tracing
+from mcpo.utils.transport import TransportSettings, get_http_client_factory
+from mcpo.utils.websocket import add_main_websocket_route, add_server_websocket_route
 
 
 async def create_dynamic_endpoints(app: FastAPI, api_dependency=None):
@@ -27,7 +89,10 @@ async def create_dynamic_endpoints(app: FastAPI, api_dependency=None):
     if not session:
         raise ValueError("Session is not initialized in the app state.")
 
-    result = await session.initialize()
+    report = getattr(app.state, "startup_report", None)
+    server_name = getattr(app.state, "server_name", None) or app.title
+    with measure(report, "initialize", server_name):
+        result = await session.initialize()
     server_info = getattr(result, "serverInfo", None)
     if server_info:
         app.title = server_info.name or app.title
@@ -40,9 +105,36 @@ async def create_dynamic_endpoints(app: FastAPI, api_dependency=None):
     if instructions:
         app.description = instructions
 
-    tools_result = await session.list_tools()
-    tools = tools_result.tools
+    if getattr(app.state, "resource_cache", None):
+        add_resource_routes(
+            app, getattr(result, "capabilities", None), api_dependency=api_dependency
+        )
+
+    with measure(report, "list_tools", server_name):
+        tools_result = await session.list_tools()
+    tools = app.state.tools = tools_result.tools
+
+    status = getattr(app.state, "status", None)
+    if status:
+        status.tools_listed(len(tools))
+
+    recorder = getattr(app.state, "recorder", None)
+    if recorder:
+        recorder.record_tools(tools)
+
+    tags = list(getattr(app.state, "tags", ()))
+    tool_index = getattr(app.state, "tool_index", None)
+    if tool_index:
+        tool_index.add_server(
+            getattr(app.state, "server_name", None),
+            tools,
+            path=getattr(app.state, "mount_path", ""),
+            tags=tags,
+        )
 
+    callers = app.state.tool_callers = {}
+
+    models_started = time.perf_counter()
     for tool in tools:
         endpoint_name = tool.name
         endpoint_description = tool.description
@@ -58,6 +150,7 @@ async def create_dynamic_endpoints(app: FastAPI, api_dependency=None):
         )
 
         response_model_fields = None
+        parse_text = not is_text_output(outputSchema)
         if outputSchema:
             response_model_fields = get_model_fields(
                 f"{endpoint_name}_response_model",
@@ -71,81 +164,278 @@ async def create_dynamic_endpoints(app: FastAPI, api_dependency=None):
             endpoint_name,
             form_model_fields,
             response_model_fields,
+            limits=get_payload_limits(app, endpoint_name),
+            status=status,
+            jobs=getattr(app.state, "jobs", None),
+            scheduler=getattr(app.state, "scheduler", None),
+            breaker=get_circuit_breaker(app, endpoint_name),
+            retry=get_retry_policy(app, tool),
+            affinity=getattr(app.state, "affinity", None),
+            validate_output=getattr(app.state, "validate_output", False),
+            parse_text=parse_text,
+            recorder=recorder,
+            callers=callers,
+            idempotency=getattr(app.state, "idempotency", None),
         )
 
-        app.post(
+        app.router.add_api_route(
             f"/{endpoint_name}",
+            tool_handler,
+            methods=["POST"],
             summary=endpoint_name.replace("_", " ").title(),
             description=endpoint_description,
             response_model_exclude_none=True,
+            tags=tags or None,
             dependencies=[Depends(api_dependency)] if api_dependency else [],
-        )(tool_handler)
+            route_class_override=ToolRoute,
+        )
+    if report:
+        report.record("models", time.perf_counter() - models_started, server_name)
+
+
+def add_server_routes(
+    app: FastAPI,
+    job_settings: JobSettings,
+    scheduler_settings: SchedulerSettings,
+    affinity_settings: AffinitySettings,
+    concurrency_settings: ConcurrencySettings,
+    resource_settings: ResourceSettings,
+    idempotency_settings: IdempotencySettings,
+    api_dependency=None,
+):
+    """
+    Set up the optional job store, scheduler, affinity sessions, resource
+    cache and idempotency keys of a server app.
+    """
+    if job_settings.enabled:
+        app.state.jobs = JobStore(job_settings)
+        add_job_routes(app, api_dependency=api_dependency)
+    if scheduler_settings.enabled or concurrency_settings.enabled:
+        limit = create_adaptive_limit(concurrency_settings)
+        app.state.scheduler = FairScheduler(scheduler_settings, limit=limit)
+        app.state.status.concurrency_limit = limit
+        add_scheduler_routes(app, api_dependency=api_dependency)
+    if affinity_settings.enabled:
+        app.state.affinity = AffinityPool(
+            affinity_settings, lambda entry: connect_affinity_session(app, entry)
+        )
+        app.state.status.affinity = app.state.affinity
+    if resource_settings.enabled:
+        setup_resource_cache(app, resource_settings)
+    if idempotency_settings.enabled:
+        app.state.idempotency = IdempotencyStore(idempotency_settings)
+        app.state.status.idempotency = app.state.idempotency
+
+
+def get_message_handler(app: FastAPI):
+    """Pass notifications from the app's MCP server on to its `notification_listeners`."""
+
+    async def message_handler(message):
+        if not isinstance(message, types.ServerNotification):
+            return
+        for listener in getattr(app.state, "notification_listeners", ()):
+            try:
+                await listener(message.root)
+            except Exception as e:
+                logger.warning(f"Failed to handle notification {message.root}: {e}")
+
+    return message_handler
 
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def connect_server(app: FastAPI, message_handler=None):
+    """Open a new session to the app's MCP server, yielding it with the subprocess PID."""
+    message_handler = message_handler or get_message_handler(app)
     server_type = getattr(app.state, "server_type", "stdio")
     command = getattr(app.state, "command", None)
     args = getattr(app.state, "args", [])
+    args = args if isinstance(args, list) else [args]
     env = getattr(app.state, "env", {})
+    transport_settings = getattr(app.state, "transport_settings", None)
+
+    if server_type == "stdio":
+        server_id = uuid.uuid4().hex
+        process_limits = getattr(app.state, "process_limits", None)
+        base_env = (
+            get_default_environment()
+            if process_limits and not process_limits.inherit_env
+            else os.environ
+        )
+        server_params = StdioServerParameters(
+            command=command,
+            args=args,
+            env={**base_env, **env, SERVER_ID_ENV: server_id},
+        )
+
+        async with stdio_client(server_params) as (reader, writer):
+            async with ClientSession(
+                reader, writer, message_handler=message_handler
+            ) as session:
+                yield session, find_child_process(server_id)
+    elif server_type == "sse":
+        headers = getattr(app.state, "headers", None)
+        httpx_client_factory = get_http_client_factory(args[0], transport_settings)
+        async with sse_client(
+            url=args[0],
+            sse_read_timeout=None,
+            headers=headers,
+            httpx_client_factory=httpx_client_factory,
+        ) as (
+            reader,
+            writer,
+        ):
+            async with ClientSession(
+                reader, writer, message_handler=message_handler
+            ) as session:
+                yield session, None
+    elif server_type == "streamablehttp" or server_type == "streamable_http":
+        headers = getattr(app.state, "headers", None)
+
+        # Ensure URL has trailing slash to avoid redirects
+        url = args[0]
+        if not url.endswith("/"):
+            url = f"{url}/"
+        httpx_client_factory = get_http_client_factory(url, transport_settings)
+
+        # Connect using streamablehttp_client from the SDK, similar to sse_client
+        async with streamablehttp_client(
+            url=url, headers=headers, httpx_client_factory=httpx_client_factory
+        ) as (
+            reader,
+            writer,
+            _,  # get_session_id callback not needed for ClientSession
+        ):
+            async with ClientSession(
+                reader, writer, message_handler=message_handler
+            ) as session:
+                yield session, None
+    else:
+        raise ValueError(f"Unsupported server type: {server_type}")
+
+
+@asynccontextmanager
+async def open_session(app: FastAPI):
+    """
+    Connect the app's MCP server, or share the session of an identical stdio
+    server, yielding it with the subprocess PID.
+
+    The session is limited to the app's `allowed_tools`, if any.
+    """
+    allowed_tools = getattr(app.state, "allowed_tools", None)
+    shared_sessions = getattr(app.state, "shared_sessions", None)
+    process_limits = getattr(app.state, "process_limits", None)
+    # Servers with their own process limits are restarted on their own
+    key = get_launch_key(app) if shared_sessions and not process_limits else None
+    if key is None:
+        if process_limits:
+            resource_cache = getattr(app.state, "resource_cache", None)
+            connection = supervise_server(
+                getattr(app.state, "server_name", None) or app.title,
+                process_limits,
+                lambda: connect_server(app),
+                status=getattr(app.state, "status", None),
+                on_restart=[resource_cache.clear] if resource_cache else [],
+            )
+        else:
+            connection = connect_server(app)
+        async with connection as (session, pid):
+            if allowed_tools is not None:
+                session = SessionView(session, allowed_tools)
+            yield session, pid
+        return
+
+    async with shared_sessions.connect(
+        app,
+        key,
+        lambda message_handler: connect_server(app, message_handler),
+        get_message_handler(app),
+    ) as (session, pid, shared):
+        yield SessionView(session, allowed_tools, shared), pid
+
+
+def connect_affinity_session(app: FastAPI, entry):
+    """
+    Connect the dedicated session of an affinity key, under the app's
+    process limits, if any, reporting restarts and failures to the entry.
+    """
+    process_limits = getattr(app.state, "process_limits", None)
+    if not process_limits:
+        return connect_server(app)
+    name = getattr(app.state, "server_name", None) or app.title
+    # The key comes from a client header, so it is hashed into the cgroup name
+    key_hash = hashlib.sha256(entry.key.encode()).hexdigest()[:12]
+    return supervise_server(
+        f"{name}-{key_hash}",
+        process_limits,
+        lambda: connect_server(app),
+        status=entry,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    server_type = getattr(app.state, "server_type", "stdio")
+    command = getattr(app.state, "command", None)
+    args = getattr(app.state, "args", [])
 
     args = args if isinstance(args, list) else [args]
     api_dependency = getattr(app.state, "api_dependency", None)
+    gateway = getattr(app.state, "gateway", None)
 
     if (server_type == "stdio" and not command) or (
         server_type == "sse" and not args[0]
     ):
         # Main app lifespan (when config_path is provided)
         async with AsyncExitStack() as stack:
-            for route in app.routes:
-                if isinstance(route, Mount) and isinstance(route.app, FastAPI):
-                    await stack.enter_async_context(
-                        route.app.router.lifespan_context(route.app),  # noqa
-                    )
+            await stack.enter_async_context(
+                run_server_lifespans(
+                    [
+                        route.app
+                        for route in app.routes
+                        if isinstance(route, Mount) and isinstance(route.app, FastAPI)
+                    ]
+                )
+            )
+            if gateway:
+                await stack.enter_async_context(gateway.run())
             yield
     else:
-        if server_type == "stdio":
-            server_params = StdioServerParameters(
-                command=command,
-                args=args,
-                env={**os.environ, **env},
-            )
-
-            async with stdio_client(server_params) as (reader, writer):
-                async with ClientSession(reader, writer) as session:
-                    app.state.session = session
-                    await create_dynamic_endpoints(app, api_dependency=api_dependency)
-                    yield
-        if server_type == "sse":
-            headers = getattr(app.state, "headers", None)
-            async with sse_client(
-                url=args[0], sse_read_timeout=None, headers=headers
-            ) as (
-                reader,
-                writer,
-            ):
-                async with ClientSession(reader, writer) as session:
-                    app.state.session = session
-                    await create_dynamic_endpoints(app, api_dependency=api_dependency)
-                    yield
-        if server_type == "streamablehttp" or server_type == "streamable_http":
-            headers = getattr(app.state, "headers", None)
-
-            # Ensure URL has trailing slash to avoid redirects
-            url = args[0]
-            if not url.endswith("/"):
-                url = f"{url}/"
-
-            # Connect using streamablehttp_client from the SDK, similar to sse_client
-            async with streamablehttp_client(url=url, headers=headers) as (
-                reader,
-                writer,
-                _,  # get_session_id callback not needed for ClientSession
-            ):
-                async with ClientSession(reader, writer) as session:
-                    app.state.session = session
-                    await create_dynamic_endpoints(app, api_dependency=api_dependency)
-                    yield
+        status = getattr(app.state, "status", None)
+        if not status:
+            status = app.state.status = ServerStatus()
+        jobs = getattr(app.state, "jobs", None)
+        idempotency = getattr(app.state, "idempotency", None)
+        affinity = getattr(app.state, "affinity", None)
+        report = getattr(app.state, "startup_report", None)
+
+        spawn_started = time.perf_counter()
+        async with open_session(app) as (session, pid):
+            if report:
+                report.record(
+                    "spawn",
+                    time.perf_counter() - spawn_started,
+                    getattr(app.state, "server_name", None) or app.title,
+                )
+            app.state.session = session
+            await create_dynamic_endpoints(app, api_dependency=api_dependency)
+            status.set_ready(pid=pid)
+            if affinity:
+                affinity.start()
+            async with gateway.run() if gateway else nullcontext():
+                yield
+            if affinity:
+                await affinity.close()
+            if jobs:
+                await jobs.close()
+            if idempotency:
+                await idempotency.close()
+
+        status.set_stopped()
+
+    # Recording is shared by all servers, so the main app closes it last
+    traffic_log = getattr(app.state, "traffic_log", None)
+    if traffic_log:
+        traffic_log.close()
 
 
 async def run(
@@ -155,6 +445,10 @@ async def run(
     cors_allow_origins=["*"],
     **kwargs,
 ):
+    # Time spent in each phase of startup, logged once the server accepts connections
+    startup_report = kwargs.get("startup_report")
+    setup_started = time.perf_counter()
+
     # Server API Key
     api_dependency = get_verify_api_key(api_key) if api_key else None
     strict_auth = kwargs.get("strict_auth", False)
@@ -179,11 +473,72 @@ async def run(
     ssl_keyfile = kwargs.get("ssl_keyfile")
     path_prefix = kwargs.get("path_prefix") or "/"
 
+    # Resolve routes through a hash map instead of a linear scan
+    dispatch_router = kwargs.get("dispatch_router", False)
+
+    # Memory introspection, tracing allocations from startup if asked to
+    trace_memory = kwargs.get("trace_memory")
+    memory_profiler = None
+    if kwargs.get("memory_endpoint", False) or trace_memory:
+        memory_profiler = MemoryProfiler()
+        if trace_memory:
+            memory_profiler.start(trace_memory)
+
+    # Persistent WebSocket endpoints for tool calls
+    websocket = kwargs.get("websocket", False)
+
+    # One MCP endpoint in front of all servers
+    mcp_gateway = kwargs.get("mcp_gateway", False)
+
+    # Tool search and filtered OpenAPI documents
+    tool_index = ToolIndex() if kwargs.get("tool_search", False) else None
+    tool_scopes = {}
+
+    # Let tool calls finish on shutdown, and share the port with a new process
+    drain_timeout = kwargs.get("drain_timeout")
+    drain = DrainState(drain_timeout) if drain_timeout is not None else None
+    reuse_port = kwargs.get("reuse_port", False)
+    listen_fd = kwargs.get("fd")
+
+    # One session for config entries launching the same stdio server
+    shared_sessions = SharedSessions() if kwargs.get("share_sessions") else None
+
+    # Validate structured tool output against the tool's output schema
+    validate_output = kwargs.get("validate_output", False)
+
+    # Traffic recording, shared by all servers
+    record_traffic = kwargs.get("record_traffic")
+    traffic_log = TrafficLog(record_traffic) if record_traffic else None
+    recording_settings = RecordingSettings(
+        enabled=bool(record_traffic),
+        sample_rate=kwargs.get("record_sample_rate") or RecordingSettings.sample_rate,
+        redact=DEFAULT_REDACT_KEYS
+        + tuple(key.lower() for key in kwargs.get("record_redact") or ()),
+    )
+
+    # Response compression
+    compression = kwargs.get("compression", False)
+    compression_min_size = kwargs.get("compression_min_size") or 1000
+    compression_level = kwargs.get("compression_level")
+
+    # Payload limits
+    payload_limits = PayloadLimits.from_config(
+        {
+            "maxRequestSize": kwargs.get("max_request_size"),
+            "maxResponseSize": kwargs.get("max_response_size"),
+            "oversizedResponse": kwargs.get("oversized_response") or "spill",
+        }
+    )
+
     # Configure basic logging
     logging.basicConfig(
         level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
     )
     logger.info("Starting MCPO Server...")
+
+    # OpenTelemetry
+    enable_tracing = configure_tracing(kwargs.get("enable_tracing", False))
+
     logger.info(f"  Name: {name}")
     logger.info(f"  Version: {version}")
     logger.info(f"  Description: {description}")
@@ -196,6 +551,8 @@ async def run(
     if ssl_keyfile:
         logger.info(f"  SSL Key File: {ssl_keyfile}")
     logger.info(f"  Path Prefix: {path_prefix}")
+    logger.info(f"  Tracing: {'Enabled' if enable_tracing else 'Disabled'}")
+    logger.info(f"  Compression: {'Enabled' if compression else 'Disabled'}")
 
     main_app = FastAPI(
         title=name,
@@ -205,6 +562,8 @@ async def run(
         ssl_keyfile=ssl_keyfile,
         lifespan=lifespan,
     )
+    if dispatch_router:
+        install_dispatch_router(main_app)
 
     main_app.add_middleware(
         CORSMiddleware,
@@ -214,9 +573,97 @@ async def run(
         allow_headers=["*"],
     )
 
+    main_app.state.startup_report = startup_report
+    main_app.state.payload_limits = ServerPayloadLimits(default=payload_limits)
+    main_app.state.validate_output = validate_output
+    main_app.state.traffic_log = traffic_log
+    if traffic_log:
+        main_app.state.recorder = TrafficRecorder(traffic_log, recording_settings, None)
+
+    # Asynchronous jobs
+    job_settings = JobSettings(
+        enabled=kwargs.get("async_jobs", False),
+        max_concurrent=kwargs.get("max_concurrent_jobs") or JobSettings.max_concurrent,
+        ttl=kwargs.get("job_ttl") or JobSettings.ttl,
+        persist_directory=kwargs.get("job_store_dir"),
+    )
+
+    # Fair-share scheduling
+    scheduler_settings = SchedulerSettings.from_config(
+        {
+            "maxConcurrent": kwargs.get("max_concurrent_calls"),
+            "clientHeader": kwargs.get("client_id_header") or DEFAULT_CLIENT_HEADER,
+        }
+    )
+
+    # Adaptive concurrency limit per server
+    concurrency_algorithm = kwargs.get("adaptive_concurrency")
+    concurrency_settings = ConcurrencySettings.from_config(
+        {"algorithm": concurrency_algorithm} if concurrency_algorithm else None
+    )
+
+    # Resource and prompt endpoints, with cached resource reads
+    resource_cache_size = kwargs.get("resource_cache_size")
+    resource_settings = ResourceSettings(
+        enabled=kwargs.get("resources", False),
+        cache_size=(
+            resource_cache_size
+            if resource_cache_size is not None
+            else ResourceSettings.cache_size
+        ),
+        ttl=kwargs.get("resource_cache_ttl"),
+    )
+
+    # Dedicated backend sessions per client session
+    affinity_settings = AffinitySettings(
+        enabled=kwargs.get("session_affinity", False),
+        header=kwargs.get("affinity_header") or DEFAULT_AFFINITY_HEADER,
+    )
+
+    # Deduplicated tool calls with an idempotency key
+    idempotency_settings = IdempotencySettings(
+        enabled=kwargs.get("idempotency", False),
+        ttl=kwargs.get("idempotency_ttl") or IdempotencySettings.ttl,
+    )
+
+    # Liveness, readiness and per-server status
+    servers = []
+    add_health_routes(main_app, servers, api_dependency=api_dependency)
+    if memory_profiler:
+        add_memory_routes(
+            main_app, servers, memory_profiler, api_dependency=api_dependency
+        )
+    if tool_index:
+        main_app.state.tool_index = tool_index
+        add_tool_search_routes(
+            main_app,
+            servers,
+            tool_index,
+            tool_scopes,
+            client_header=scheduler_settings.client_header,
+            api_dependency=api_dependency,
+        )
+
+    if compression:
+        main_app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=compression_min_size,
+            level=compression_level,
+            max_request_size=max(
+                payload_limits.max_request_size or 0, MAX_DECOMPRESSED_SIZE
+            ),
+        )
+
     # Add middleware to protect also documentation and spec
     if api_key and strict_auth:
-        main_app.add_middleware(APIKeyMiddleware, api_key=api_key)
+        main_app.add_middleware(
+            APIKeyMiddleware, api_key=api_key, exempt_paths=HEALTH_PATHS
+        )
+
+    # Outermost, so requests are turned away before any other work
+    if drain:
+        main_app.state.drain = drain
+        main_app.add_middleware(DrainMiddleware, drain=drain)
 
     headers = kwargs.get("headers")
     if headers and isinstance(headers, str):
@@ -234,6 +681,18 @@ async def run(
         main_app.state.args = server_command[0]  # Expects URL as the first element
         main_app.state.api_dependency = api_dependency
         main_app.state.headers = headers
+        main_app.state.status = ServerStatus()
+        servers.append(main_app)
+        add_server_routes(
+            main_app,
+            job_settings,
+            scheduler_settings,
+            affinity_settings,
+            concurrency_settings,
+            resource_settings,
+            idempotency_settings,
+            api_dependency=api_dependency,
+        )
     elif server_type == "streamablehttp" or server_type == "streamable_http":
         logger.info(
             f"Configuring for a single StreamableHTTP MCP Server with URL {server_command[0]}"
@@ -242,6 +701,18 @@ async def run(
         main_app.state.args = server_command[0]  # Expects URL as the first element
         main_app.state.api_dependency = api_dependency
         main_app.state.headers = headers
+        main_app.state.status = ServerStatus()
+        servers.append(main_app)
+        add_server_routes(
+            main_app,
+            job_settings,
+            scheduler_settings,
+            affinity_settings,
+            concurrency_settings,
+            resource_settings,
+            idempotency_settings,
+            api_dependency=api_dependency,
+        )
     elif server_command:  # This handles stdio
         logger.info(
             f"Configuring for a single Stdio MCP Server with command: {' '.join(server_command)}"
@@ -251,12 +722,28 @@ async def run(
         main_app.state.args = server_command[1:]
         main_app.state.env = os.environ.copy()
         main_app.state.api_dependency = api_dependency
+        main_app.state.status = ServerStatus()
+        servers.append(main_app)
+        add_server_routes(
+            main_app,
+            job_settings,
+            scheduler_settings,
+            affinity_settings,
+            concurrency_settings,
+            resource_settings,
+            idempotency_settings,
+            api_dependency=api_dependency,
+        )
     elif config_path:
         logger.info(f"Loading MCP server configurations from: {config_path}")
-        with open(config_path, "r") as f:
+        with measure(startup_report, "config"), open(config_path, "r") as f:
             config_data = json.load(f)
 
         mcp_servers = config_data.get("mcpServers", {})
+        tool_scopes.update(
+            (client_id, ToolScope.from_config(scope))
+            for client_id, scope in config_data.get("toolScopes", {}).items()
+        )
         if not mcp_servers:
             logger.error(f"No 'mcpServers' found in config file: {config_path}")
             raise ValueError("No 'mcpServers' found in config file.")
@@ -302,6 +789,8 @@ async def run(
                 version="1.0",
                 lifespan=lifespan,
             )
+            if dispatch_router:
+                install_dispatch_router(sub_app)
 
             sub_app.add_middleware(
                 CORSMiddleware,
@@ -316,7 +805,14 @@ async def run(
                 sub_app.state.server_type = "stdio"
                 sub_app.state.command = server_cfg["command"]
                 sub_app.state.args = server_cfg.get("args", [])
-                sub_app.state.env = {**os.environ, **server_cfg.get("env", {})}
+                process_limits = ProcessLimits.from_config(server_cfg.get("process"))
+                if process_limits.enabled:
+                    sub_app.state.process_limits = process_limits
+                sub_app.state.env = (
+                    {**os.environ, **server_cfg.get("env", {})}
+                    if process_limits.inherit_env
+                    else server_cfg.get("env", {})
+                )
 
             server_config_type = server_cfg.get("type")
             if server_config_type == "sse" and server_cfg.get("url"):
@@ -342,11 +838,85 @@ async def run(
                 sub_app.state.args = server_cfg["url"]
                 sub_app.state.headers = server_cfg.get("headers")
 
+            sub_app.state.payload_limits = ServerPayloadLimits.from_config(
+                server_cfg.get("limits"), payload_limits
+            )
+            sub_app.state.validate_output = server_cfg.get(
+                "validateOutput", validate_output
+            )
+
+            server_recording_settings = RecordingSettings.from_config(
+                server_cfg.get("recording"), recording_settings
+            )
+            if traffic_log and server_recording_settings.enabled:
+                sub_app.state.recorder = TrafficRecorder(
+                    traffic_log, server_recording_settings, server_name
+                )
+
+            if server_cfg.get("transport"):
+                sub_app.state.transport_settings = TransportSettings.from_config(
+                    server_cfg["transport"]
+                )
+
             # Add middleware to protect also documentation and spec
             if api_key and strict_auth:
                 sub_app.add_middleware(APIKeyMiddleware, api_key=api_key)
 
             sub_app.state.api_dependency = api_dependency
+            sub_app.state.server_name = server_name
+            sub_app.state.mount_path = f"{path_prefix}{server_name}"
+            sub_app.state.tags = tuple(server_cfg.get("tags", ()))
+            sub_app.state.tool_index = tool_index
+            sub_app.state.startup_report = startup_report
+            sub_app.state.allowed_tools = server_cfg.get("allowedTools")
+            if server_cfg.get("share", True):
+                sub_app.state.shared_sessions = shared_sessions
+            sub_app.state.status = ServerStatus(
+                required=server_cfg.get("required", True)
+            )
+            servers.append(sub_app)
+
+            if server_cfg.get("circuitBreaker"):
+                sub_app.state.circuit_breakers = ServerCircuitBreakers.from_config(
+                    server_cfg["circuitBreaker"]
+                )
+                sub_app.state.status.circuit_breakers = sub_app.state.circuit_breakers
+
+            if server_cfg.get("retry"):
+                sub_app.state.retry_policies = ServerRetryPolicies.from_config(
+                    server_cfg["retry"]
+                )
+
+            server_job_settings = JobSettings.from_config(
+                server_cfg.get("jobs"), job_settings
+            )
+            if server_job_settings.persist_directory:
+                server_job_settings = replace(
+                    server_job_settings,
+                    persist_directory=os.path.join(
+                        server_job_settings.persist_directory, server_name
+                    ),
+                )
+            add_server_routes(
+                sub_app,
+                server_job_settings,
+                SchedulerSettings.from_config(
+                    server_cfg.get("scheduling"), scheduler_settings
+                ),
+                AffinitySettings.from_config(
+                    server_cfg.get("affinity"), affinity_settings
+                ),
+                ConcurrencySettings.from_config(
+                    server_cfg.get("concurrency"), concurrency_settings
+                ),
+                ResourceSettings.from_config(
+                    server_cfg.get("resources"), resource_settings
+                ),
+                IdempotencySettings.from_config(
+                    server_cfg.get("idempotency"), idempotency_settings
+                ),
+                api_dependency=api_dependency,
+            )
 
             main_app.mount(f"{path_prefix}{server_name}", sub_app)
             main_app.description += f"\n    - [{server_name}](/{server_name}/docs)"
@@ -354,6 +924,22 @@ async def run(
         logger.error("MCPO server_command or config_path must be provided.")
         raise ValueError("You must provide either server_command or config.")
 
+    if websocket:
+        for server in servers:
+            add_server_websocket_route(server, api_dependency=api_dependency)
+        if main_app not in servers:
+            add_main_websocket_route(main_app, servers, api_dependency=api_dependency)
+
+    if mcp_gateway:
+        add_gateway_route(
+            main_app,
+            servers,
+            api_dependency=api_dependency,
+            separator=kwargs.get("gateway_separator") or DEFAULT_SEPARATOR,
+        )
+
+    if startup_report:
+        startup_report.record("setup", time.perf_counter() - setup_started)
     logger.info("Uvicorn server starting...")
     config = uvicorn.Config(
         app=main_app,
@@ -363,10 +949,29 @@ async def run(
         ssl_keyfile=ssl_keyfile,
         log_level="info",
     )
-    server = uvicorn.Server(config)
+    if drain:
+        gateway = getattr(main_app.state, "gateway", None)
+        server = DrainingServer(
+            config,
+            drain,
+            servers,
+            on_drained=[gateway.close_streams] if gateway else [],
+        )
+    else:
+        server = uvicorn.Server(config)
+
+    sockets = None
+    if reuse_port or listen_fd is not None:
+        sockets = [
+            create_listening_socket(host, port, reuse_port=reuse_port, fd=listen_fd)
+        ]
+
+    if startup_report:
+        # Referenced until serving ends, so the task is not garbage collected
+        report_task = asyncio.create_task(startup_report.log_when_started(server))
 
     try:
-        await server.serve()
+        await server.serve(sockets=sockets)
     except asyncio.CancelledError:
         server.should_exit = True
         await server.shutdown()
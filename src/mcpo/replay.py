@@ -0,0 +1,269 @@
+"""
+Replay traffic recorded with `mcpo --record-traffic`.
+
+`serve` runs a stub MCP server over stdio that lists the recorded tools and
+answers calls with the recorded results after their recorded latency. Run
+mcpo against it, then re-drive the recorded calls through mcpo with `drive`:
+
+    mcpo --port 8000 -- mcpo-replay serve traffic.jsonl.gz
+    mcpo-replay drive traffic.jsonl.gz --url http://localhost:8000
+"""
+
+import asyncio
+import gzip
+import json
+import statistics
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+import typer
+from mcp import types
+from mcp.server.lowlevel import Server
+from mcp.server.stdio import stdio_server
+from mcp.shared.exceptions import McpError
+from typing_extensions import Annotated
+
+app = typer.Typer(help="Replay traffic recorded with mcpo --record-traffic.")
+
+
+@dataclass
+class Recording:
+    tools: Dict[Optional[str], List[dict]] = field(default_factory=dict)
+    calls: List[dict] = field(default_factory=list)
+
+    def servers(self) -> List[Optional[str]]:
+        return list(self.tools)
+
+
+def load_recording(path: str) -> Recording:
+    recording = Recording()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["type"] == "tools":
+                recording.tools[record["server"]] = record["tools"]
+            elif record["type"] == "call":
+                recording.calls.append(record)
+    return recording
+
+
+def call_key(tool: str, arguments: Optional[dict]) -> Tuple[str, str]:
+    return tool, json.dumps(arguments or {}, sort_keys=True)
+
+
+class ReplayBackend:
+    """
+    Answer tool calls with the recorded results of one server.
+
+    Calls are matched on tool name and arguments, falling back to any
+    recorded call of the tool. Repeated matches cycle through the recorded
+    results. Latencies are scaled by `speed`, so 0 answers immediately.
+    """
+
+    def __init__(
+        self, recording: Recording, server: Optional[str] = None, speed: float = 1.0
+    ):
+        self.tools = [
+            types.Tool.model_validate(tool) for tool in recording.tools.get(server, [])
+        ]
+        self.speed = speed
+        self.by_arguments: Dict[Tuple[str, str], Deque[dict]] = defaultdict(deque)
+        self.by_tool: Dict[str, Deque[dict]] = defaultdict(deque)
+        for record in recording.calls:
+            if record["server"] == server:
+                key = call_key(record["tool"], record["arguments"])
+                self.by_arguments[key].append(record)
+                self.by_tool[record["tool"]].append(record)
+
+    def find(self, tool: str, arguments: Optional[dict]) -> Optional[dict]:
+        records = self.by_arguments.get(call_key(tool, arguments)) or self.by_tool.get(
+            tool
+        )
+        if not records:
+            return None
+        record = records[0]
+        records.rotate(-1)
+        return record
+
+    async def call_tool(
+        self, tool: str, arguments: Optional[dict]
+    ) -> types.CallToolResult:
+        record = self.find(tool, arguments)
+        if record is None:
+            raise McpError(
+                types.ErrorData(
+                    code=types.METHOD_NOT_FOUND,
+                    message=f"No recorded call of tool '{tool}'",
+                )
+            )
+        await asyncio.sleep(record["latency"] * self.speed)
+        if "error" in record:
+            raise McpError(types.ErrorData.model_validate(record["error"]))
+        return types.CallToolResult.model_validate(record["result"])
+
+
+def create_stub_server(backend: ReplayBackend) -> Server:
+    server = Server("mcpo-replay")
+
+    @server.list_tools()
+    async def list_tools() -> List[types.Tool]:
+        return backend.tools
+
+    async def call_tool(request: types.CallToolRequest) -> types.ServerResult:
+        # Registered directly rather than through `server.call_tool()`, so
+        # results and errors are sent exactly as recorded
+        result = await backend.call_tool(request.params.name, request.params.arguments)
+        return types.ServerResult(result)
+
+    server.request_handlers[types.CallToolRequest] = call_tool
+    return server
+
+
+@dataclass
+class ReplayReport:
+    requests: int = 0
+    mismatches: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    # Latency added on top of the recorded backend latency
+    overheads: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "mismatches": self.mismatches,
+            "throughput": self.requests / self.elapsed if self.elapsed else 0.0,
+            "latency": percentiles(self.latencies),
+            "overhead": percentiles(self.overheads),
+        }
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if len(values) < 2:
+        return {}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": cuts[49] * 1000,
+        "p95": cuts[94] * 1000,
+        "p99": cuts[98] * 1000,
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    recording: Recording,
+    server: Optional[str] = None,
+    concurrency: int = 8,
+    repeat: int = 1,
+    speed: float = 1.0,
+) -> ReplayReport:
+    """
+    Send the recorded calls through mcpo and measure its latency.
+
+    With `server`, only that server's calls are sent, to the root of the
+    client's base URL (mcpo running a single stub server). Otherwise calls
+    are sent to `/{server}/{tool}` as in a config file deployment.
+    """
+    calls = [
+        record
+        for record in recording.calls
+        if server is None or record["server"] == server
+    ] * repeat
+    report = ReplayReport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(record: dict):
+        prefix = f"/{record['server']}" if server is None and record["server"] else ""
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(
+                f"{prefix}/{record['tool']}", json=record["arguments"]
+            )
+            latency = time.perf_counter() - started
+        report.requests += 1
+        if response.is_success == ("error" in record):
+            report.mismatches += 1
+        report.latencies.append(latency)
+        report.overheads.append(latency - record["latency"] * speed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(record) for record in calls))
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def select_server(recording: Recording, server: Optional[str]) -> Optional[str]:
+    servers = recording.servers()
+    if server is None and len(servers) > 1:
+        raise typer.BadParameter(
+            f"The recording has several servers, pick one of {servers} with --server"
+        )
+    return server if server is not None else (servers[0] if servers else None)
+
+
+@app.command()
+def serve(
+    path: Annotated[str, typer.Argument(help="Recorded traffic file")],
+    server: Annotated[
+        Optional[str],
+        typer.Option("--server", help="Server to replay, if several were recorded"),
+    ] = None,
+    speed: Annotated[
+        float, typer.Option("--speed", help="Factor applied to recorded latencies")
+    ] = 1.0,
+):
+    """Run a stub MCP server over stdio that answers with recorded results."""
+    recording = load_recording(path)
+    backend = ReplayBackend(recording, select_server(recording, server), speed)
+    stub = create_stub_server(backend)
+
+    async def run():
+        async with stdio_server() as (read_stream, write_stream):
+            await stub.run(
+                read_stream, write_stream, stub.create_initialization_options()
+            )
+
+    asyncio.run(run())
+
+
+@app.command("drive")
+def drive_command(
+    path: Annotated[str, typer.Argument(help="Recorded traffic file")],
+    url: Annotated[
+        str, typer.Option("--url", help="Base URL of the mcpo instance")
+    ] = "http://localhost:8000",
+    server: Annotated[
+        Optional[str],
+        typer.Option("--server", help="Only send this server's calls, to the root URL"),
+    ] = None,
+    concurrency: Annotated[
+        int, typer.Option("--concurrency", help="Calls in flight at once")
+    ] = 8,
+    repeat: Annotated[
+        int, typer.Option("--repeat", help="Times to send the recorded calls")
+    ] = 1,
+    speed: Annotated[
+        float, typer.Option("--speed", help="Latency factor the stub server uses")
+    ] = 1.0,
+    api_key: Annotated[
+        Optional[str], typer.Option("--api-key", "-k", help="mcpo API key")
+    ] = None,
+):
+    """Send the recorded calls through a running mcpo and report its latency."""
+    recording = load_recording(path)
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else None
+
+    async def run():
+        async with httpx.AsyncClient(
+            base_url=url, headers=headers, timeout=None
+        ) as client:
+            return await drive(client, recording, server, concurrency, repeat, speed)
+
+    report = asyncio.run(run())
+    print(json.dumps(report.to_dict(), indent=2))
@@ -0,0 +1,72 @@
+import pytest
+from fastapi import FastAPI
+from mcp import types
+
+from mcpo.main import create_dynamic_endpoints
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+ECHO_TOOL = types.Tool(
+    name="echo",
+    description="Echo the input",
+    inputSchema={
+        "type": "object",
+        "properties": {"text": {"type": "string"}},
+    },
+)
+
+
+class FakeSession:
+    """Stand-in for `mcp.ClientSession` that returns a canned result."""
+
+    def __init__(self, result=None, error=None, tools=None, wait=None):
+        # `wait` is an optional asyncio.Event the call blocks on
+        self.result = result or types.CallToolResult(content=[])
+        self.error = error
+        self.tools = tools or [ECHO_TOOL]
+        self.wait = wait
+        self.calls = []
+
+    async def initialize(self):
+        return types.InitializeResult(
+            protocolVersion="2025-03-26",
+            capabilities=types.ServerCapabilities(),
+            serverInfo=types.Implementation(name="fake", version="1.0"),
+        )
+
+    async def list_tools(self):
+        return types.ListToolsResult(tools=self.tools)
+
+    async def call_tool(self, name, arguments=None, progress_callback=None, **kwargs):
+        self.calls.append((name, arguments, kwargs))
+        if progress_callback:
+            await progress_callback(1, 2, "halfway")
+        if self.wait:
+            await self.wait.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def fake_session():
+    return FakeSession
+
+
+@pytest.fixture
+def make_app():
+    """Build an app with tool endpoints for a session, after applying `state`."""
+
+    async def make_app(session, **state):
+        app = FastAPI()
+        app.state.session = session
+        for key, value in state.items():
+            setattr(app.state, key, value)
+        await create_dynamic_endpoints(app)
+        return app
+
+    return make_app
@@ -0,0 +1,186 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import anyio
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from mcpo.utils.affinity import AffinityPool, AffinitySettings
+
+
+@pytest.fixture
+def session_factory(fake_session):
+    """Open a new fake session per call, recording opened and closed sessions."""
+
+    class SessionFactory:
+        def __init__(self):
+            self.opened = []
+            self.closed = []
+            self.error = None
+
+        @asynccontextmanager
+        async def __call__(self, entry=None):
+            if self.error:
+                raise self.error
+            session = fake_session()
+            self.opened.append(session)
+            try:
+                yield session, None
+            finally:
+                self.closed.append(session)
+
+    return SessionFactory()
+
+
+def test_settings_from_config():
+    settings = AffinitySettings.from_config(
+        {"header": "X-Browser", "maxSessions": 4, "idleTtl": 60, "maxConcurrent": 2}
+    )
+    assert settings.enabled
+    assert (settings.header, settings.max_sessions) == ("X-Browser", 4)
+    assert (settings.idle_ttl, settings.max_concurrent) == (60, 2)
+    assert not AffinitySettings.from_config(None).enabled
+
+
+@pytest.mark.anyio
+async def test_sessions_are_dedicated_per_key(session_factory):
+    pool = AffinityPool(AffinitySettings(enabled=True), session_factory)
+    async with pool.session("a") as a1:
+        pass
+    async with pool.session("a") as a2:
+        pass
+    async with pool.session("b") as b:
+        pass
+    assert a1 is a2
+    assert a1 is not b
+    assert len(session_factory.opened) == 2
+
+    await pool.close()
+    assert len(session_factory.closed) == 2
+
+
+@pytest.mark.anyio
+async def test_least_recently_used_session_is_evicted(session_factory):
+    pool = AffinityPool(AffinitySettings(enabled=True, max_sessions=2), session_factory)
+    for key in ("a", "b", "a", "c"):
+        async with pool.session(key):
+            pass
+    assert list(pool.sessions) == ["a", "c"]
+    assert session_factory.closed == [session_factory.opened[1]]
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_busy_sessions_are_not_evicted(session_factory):
+    pool = AffinityPool(AffinitySettings(enabled=True, max_sessions=1), session_factory)
+    async with pool.session("a"):
+        with pytest.raises(HTTPException) as exc_info:
+            async with pool.session("b"):
+                pass
+    assert exc_info.value.status_code == 503
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_concurrent_new_keys_respect_max_sessions(session_factory):
+    pool = AffinityPool(AffinitySettings(enabled=True, max_sessions=1), session_factory)
+    release = asyncio.Event()
+
+    async def call(key):
+        async with pool.session(key):
+            await release.wait()
+
+    async with pool.session("x"):
+        pass
+    # Both requests want the idle session's slot, which takes a while to close
+    calls = [asyncio.create_task(call(key)) for key in "ab"]
+    await asyncio.sleep(0.05)
+    assert len(pool.sessions) == 1
+    release.set()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    assert len(session_factory.opened) == 2
+    assert [getattr(result, "status_code", None) for result in results] == [None, 503]
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_session_with_transport_error_is_replaced(session_factory):
+    pool = AffinityPool(AffinitySettings(enabled=True), session_factory)
+    with pytest.raises(HTTPException):
+        async with pool.session("a"):
+            try:
+                raise anyio.ClosedResourceError()
+            except anyio.ClosedResourceError:
+                # Tool call errors reach the pool as HTTP errors
+                raise HTTPException(status_code=500, detail="Unexpected error")
+    assert not pool.sessions
+    assert session_factory.closed == session_factory.opened
+
+    # Other errors keep the session
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            async with pool.session("a"):
+                raise HTTPException(status_code=404, detail="Unknown tool")
+    assert len(session_factory.opened) == 2
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_idle_sessions_expire(session_factory):
+    pool = AffinityPool(AffinitySettings(enabled=True, idle_ttl=0), session_factory)
+    async with pool.session("a"):
+        pass
+    await pool.close_idle()
+    assert not pool.sessions
+    assert len(session_factory.closed) == 1
+
+
+@pytest.mark.anyio
+async def test_per_session_concurrency(session_factory):
+    pool = AffinityPool(AffinitySettings(enabled=True), session_factory)
+    running = []
+
+    async def call(key):
+        async with pool.session(key):
+            running.append(key)
+            await asyncio.sleep(0.01)
+            assert running.count(key) == 1
+            running.remove(key)
+
+    await asyncio.gather(call("a"), call("a"), call("b"))
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_failed_session_start(session_factory):
+    session_factory.error = RuntimeError("no browser")
+    pool = AffinityPool(AffinitySettings(enabled=True), session_factory)
+    with pytest.raises(HTTPException) as exc_info:
+        async with pool.session("a"):
+            pass
+    assert exc_info.value.status_code == 502
+
+    session_factory.error = None
+    async with pool.session("a") as session:
+        assert session is session_factory.opened[0]
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_tool_calls_use_affinity_session(make_app, fake_session, session_factory):
+    shared = fake_session()
+    pool = AffinityPool(AffinitySettings(enabled=True), session_factory)
+    app = await make_app(shared, affinity=pool)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.post("/echo", json={"text": "shared"})
+        await client.post("/echo", json={"text": "a"}, headers={"X-Session-ID": "a"})
+        await client.post("/echo", json={"text": "a"}, headers={"X-Session-ID": "a"})
+
+    assert [args for _, args, _ in shared.calls] == [{"text": "shared"}]
+    (dedicated,) = session_factory.opened
+    assert len(dedicated.calls) == 2
+    await pool.close()
@@ -0,0 +1,148 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+from mcp.shared.exceptions import McpError
+from mcp.types import INTERNAL_ERROR, INVALID_PARAMS, ErrorData
+
+from mcpo.utils.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerSettings,
+    ServerCircuitBreakers,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(**config):
+    clock = FakeClock()
+    settings = CircuitBreakerSettings.from_config(
+        {"windowSize": 4, "minimumCalls": 4, "openDuration": 10, **config}
+    )
+    return CircuitBreaker(settings, clock=clock), clock
+
+
+def call(breaker, failed, duration=0.0):
+    probe = breaker.before_call()
+    breaker.record(probe, failed, duration)
+
+
+def test_settings_from_config():
+    settings = CircuitBreakerSettings.from_config(
+        {"errorRateThreshold": 0.25, "slowCallThreshold": 2, "perTool": True}
+    )
+    assert settings.enabled
+    assert settings.error_rate_threshold == 0.25
+    assert settings.slow_call_threshold == 2
+    assert settings.per_tool
+    assert not CircuitBreakerSettings.from_config(None).enabled
+    assert not CircuitBreakerSettings.from_config({"enabled": False}).enabled
+
+
+def test_opens_on_error_rate():
+    breaker, clock = make_breaker()
+    for failed in (True, False, True):
+        call(breaker, failed)
+    assert breaker.get_state() == "closed"
+    call(breaker, False)
+    assert breaker.get_state() == "open"
+
+    with pytest.raises(HTTPException) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "10"
+    assert breaker.to_dict()["rejected"] == 1
+
+
+def test_opens_on_slow_calls():
+    breaker, clock = make_breaker(slowCallThreshold=1.0, slowCallRateThreshold=0.75)
+    for duration in (2.0, 2.0, 0.1, 2.0):
+        call(breaker, False, duration)
+    assert breaker.get_state() == "open"
+
+
+def test_half_open_probes():
+    breaker, clock = make_breaker(halfOpenProbes=1)
+    for _ in range(4):
+        call(breaker, True)
+    clock.now = 10
+    assert breaker.get_state() == "half_open"
+
+    probe = breaker.before_call()
+    assert probe
+    with pytest.raises(HTTPException):
+        # Only one probe at a time
+        breaker.before_call()
+    breaker.record(probe, True)
+    assert breaker.get_state() == "open"
+
+    clock.now = 20
+    call(breaker, False)
+    assert breaker.get_state() == "closed"
+    assert breaker.to_dict()["times_opened"] == 2
+
+
+def test_probe_that_never_ran_frees_its_slot():
+    breaker, clock = make_breaker()
+    for _ in range(4):
+        call(breaker, True)
+    clock.now = 10
+    breaker.record(breaker.before_call(), None)
+    assert breaker.get_state() == "half_open"
+    assert breaker.before_call()
+
+
+def test_server_and_tool_breakers():
+    breakers = ServerCircuitBreakers.from_config(
+        {"tools": {"slow": {"slowCallThreshold": 5}, "safe": {"enabled": False}}}
+    )
+    assert breakers.for_tool("a") is breakers.for_tool("b")
+    assert breakers.for_tool("slow") is not breakers.for_tool("a")
+    assert breakers.for_tool("safe") is None
+    assert set(breakers.to_dict()) == {"*", "slow"}
+
+    per_tool = ServerCircuitBreakers.from_config({"perTool": True})
+    assert per_tool.for_tool("a") is not per_tool.for_tool("b")
+
+
+@pytest.mark.anyio
+async def test_open_circuit_fails_fast(make_app, fake_session):
+    session = fake_session(
+        error=McpError(ErrorData(code=INTERNAL_ERROR, message="down"))
+    )
+    breakers = ServerCircuitBreakers.from_config({"minimumCalls": 2, "windowSize": 2})
+    app = await make_app(session, circuit_breakers=breakers)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        for _ in range(2):
+            response = await client.post("/echo", json={})
+            assert response.status_code == 500
+
+        response = await client.post("/echo", json={})
+        assert response.status_code == 503
+        assert "retry-after" in response.headers
+        assert len(session.calls) == 2
+
+
+@pytest.mark.anyio
+async def test_client_errors_do_not_open_circuit(make_app, fake_session):
+    session = fake_session(
+        error=McpError(ErrorData(code=INVALID_PARAMS, message="bad"))
+    )
+    breakers = ServerCircuitBreakers.from_config({"minimumCalls": 2, "windowSize": 2})
+    app = await make_app(session, circuit_breakers=breakers)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        for _ in range(3):
+            response = await client.post("/echo", json={})
+            assert response.status_code == 422
+    assert breakers.for_tool("echo").get_state() == "closed"
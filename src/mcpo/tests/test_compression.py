@@ -0,0 +1,166 @@
+import gzip
+import os
+import tracemalloc
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from mcpo.utils.compression import (
+    CompressionMiddleware,
+    get_available_codecs,
+    select_encoding,
+)
+from mcpo.utils.limits import PayloadLimits, ServerPayloadLimits
+
+LARGE_TEXT = "mcpo " * 1000
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"text": (await request.json())["text"]}
+
+    @app.get("/image")
+    async def image():
+        return Response(content=b"\x89PNG" + b"0" * 2000, media_type="image/png")
+
+    return TestClient(app)
+
+
+def test_select_encoding():
+    codings = ["zstd", "br", "gzip"]
+    assert select_encoding("gzip, br", codings) == "br"
+    assert select_encoding("gzip;q=1.0, br;q=0.5", codings) == "gzip"
+    assert select_encoding("*", codings) == "zstd"
+    assert select_encoding("*, zstd;q=0", codings) == "br"
+    assert select_encoding("identity", codings) is None
+    assert select_encoding("", codings) is None
+
+
+def test_large_response_is_compressed(client):
+    response = client.post(
+        "/echo", json={"text": LARGE_TEXT}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == {"text": LARGE_TEXT}
+
+
+def test_small_response_is_not_compressed(client):
+    response = client.post(
+        "/echo", json={"text": "short"}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"text": "short"}
+
+
+def test_compressed_media_is_skipped(client):
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.parametrize("encoding", ["br", "zstd"])
+def test_optional_encodings(client, encoding):
+    pytest.importorskip({"br": "brotli", "zstd": "zstandard"}[encoding])
+    response = client.post(
+        "/echo", json={"text": LARGE_TEXT}, headers={"Accept-Encoding": encoding}
+    )
+    assert response.headers["content-encoding"] == encoding
+    assert response.json() == {"text": LARGE_TEXT}
+
+
+def test_compressed_request_body(client):
+    body = gzip.compress(b'{"text": "compressed"}')
+    response = client.post(
+        "/echo",
+        content=body,
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"text": "compressed"}
+
+
+def test_invalid_compressed_request_body(client):
+    response = client.post(
+        "/echo",
+        content=b"not gzip",
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 400
+
+
+def test_unsupported_request_encoding(client):
+    response = client.post(
+        "/echo",
+        content=b"{}",
+        headers={"Content-Encoding": "compress", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_compressed_request_bodies_are_inflated_in_chunks(encoding):
+    pytest.importorskip({"br": "brotli", "zstd": "zstandard"}.get(encoding, "zlib"))
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, max_request_size=1024 * 1024)
+    chunks = []
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        async for chunk in request.stream():
+            chunks.append(len(chunk))
+        return {"size": sum(chunks)}
+
+    compress, _, finish = get_available_codecs()[encoding].compressor()
+    client = TestClient(app)
+    headers = {"Content-Encoding": encoding}
+
+    data = os.urandom(300_000)
+    body = compress(data) + finish()
+    response = client.post("/upload", content=body, headers=headers)
+    assert response.json() == {"size": 300_000}
+    assert len(chunks) > 2
+
+    # A small body inflating far past the limit is rejected without inflating it all
+    compress, _, finish = get_available_codecs()[encoding].compressor()
+    bomb = compress(b"0" * 50 * 1024 * 1024) + finish()
+    assert len(bomb) < 1024 * 1024
+    chunks.clear()
+    tracemalloc.start()
+    response = client.post("/upload", content=bomb, headers=headers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 413
+    assert sum(chunks) <= 1024 * 1024
+    assert peak < 10 * 1024 * 1024
+
+
+@pytest.mark.anyio
+async def test_route_request_limit_applies_to_inflated_body(make_app, fake_session):
+    session = fake_session()
+    app = await make_app(
+        session,
+        payload_limits=ServerPayloadLimits(
+            default=PayloadLimits(max_request_size=1000)
+        ),
+    )
+    app.add_middleware(CompressionMiddleware)
+    body = gzip.compress(b'{"text": "' + b"x" * 100_000 + b'"}')
+    assert len(body) < 1000
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/echo",
+            content=body,
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+        )
+    assert response.status_code == 413
+    assert not session.calls
@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from mcpo.utils.concurrency import (
+    AIMDLimit,
+    ConcurrencySettings,
+    GradientLimit,
+    create_adaptive_limit,
+)
+from mcpo.utils.scheduling import FairScheduler, SchedulerSettings
+
+
+def test_settings_from_config():
+    settings = ConcurrencySettings.from_config(
+        {"algorithm": "aimd", "initialLimit": 4, "maxLimit": 50, "timeout": 2}
+    )
+    assert settings.enabled
+    assert (settings.initial_limit, settings.max_limit) == (4, 50)
+    assert isinstance(create_adaptive_limit(settings), AIMDLimit)
+    assert create_adaptive_limit(ConcurrencySettings.from_config(None)) is None
+
+    with pytest.raises(ValueError):
+        ConcurrencySettings.from_config({"algorithm": "vegas"})
+    with pytest.raises(ValueError):
+        ConcurrencySettings.from_config({"minLimit": 10, "maxLimit": 5})
+
+
+def test_aimd_limit():
+    limit = AIMDLimit(ConcurrencySettings(initial_limit=10, max_limit=12, timeout=1))
+    # Not growing while most of the limit is unused
+    limit.update(0.1, in_flight=2, failed=False)
+    assert limit.limit == 10
+    for _ in range(5):
+        limit.update(0.1, in_flight=10, failed=False)
+    assert limit.limit == 12
+
+    limit.update(0.1, in_flight=12, failed=True)
+    assert limit.limit == 10
+    limit.update(2.0, in_flight=10, failed=False)
+    assert limit.limit == 9
+    assert limit.drops == 2
+
+
+def test_gradient_limit():
+    limit = GradientLimit(ConcurrencySettings(initial_limit=10, long_window=10))
+    for _ in range(20):
+        limit.update(0.1, in_flight=limit.limit, failed=False)
+    grown = limit.limit
+    assert grown > 10
+
+    # Latency well past the tolerated increase shrinks the limit
+    for _ in range(10):
+        limit.update(1.0, in_flight=limit.limit, failed=False)
+    assert limit.limit < grown
+    assert limit.to_dict()["baseline_latency"] > 0.1
+
+
+def test_limit_bounds():
+    limit = AIMDLimit(ConcurrencySettings(initial_limit=2, min_limit=2))
+    for _ in range(5):
+        limit.update(0.1, in_flight=2, failed=True)
+    assert limit.limit == 2
+
+
+@pytest.mark.anyio
+async def test_scheduler_follows_limit():
+    limit = AIMDLimit(ConcurrencySettings(initial_limit=1))
+    scheduler = FairScheduler(SchedulerSettings(), limit=limit)
+    first = await scheduler.acquire("a", "tool")
+    waiters = [asyncio.create_task(scheduler.acquire("a", "tool")) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert scheduler.to_dict()["queued"] == 2
+
+    # A successful call at the limit raises it to 2, admitting both waiters
+    scheduler.release(first, latency=0.1, failed=False)
+    await asyncio.sleep(0)
+    assert all(waiter.done() for waiter in waiters)
+    assert scheduler.to_dict()["max_concurrent"] == 2
+    assert scheduler.to_dict()["adaptive_limit"]["samples"] == 1
+
+
+@pytest.mark.anyio
+async def test_tool_calls_update_limit(make_app, fake_session):
+    limit = create_adaptive_limit(ConcurrencySettings(enabled=True, algorithm="aimd"))
+    session = fake_session()
+    app = await make_app(
+        session, scheduler=FairScheduler(SchedulerSettings(), limit=limit)
+    )
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.post("/echo", json={"text": "ok"})
+        session.error = McpError(types.ErrorData(code=-32603, message="boom"))
+        await client.post("/echo", json={"text": "fail"})
+        # Rejected by the MCP server as invalid, which says nothing about its load
+        session.error = McpError(types.ErrorData(code=-32602, message="bad"))
+        await client.post("/echo", json={"text": "bad"})
+
+    assert limit.samples == 3
+    assert limit.drops == 1
@@ -0,0 +1,119 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from mcp import types
+
+from mcpo.utils.dispatch import DispatchRouter, install_dispatch_router
+
+
+def make_tools(count):
+    return [
+        types.Tool(
+            name=f"tool_{i}",
+            description=f"Tool {i}",
+            inputSchema={
+                "type": "object",
+                "properties": {"text": {"type": "string"}},
+            },
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def make_main_app(make_app, fake_session):
+    async def make_main_app(dispatch: bool):
+        main_app = FastAPI()
+        if dispatch:
+            install_dispatch_router(main_app)
+
+        @main_app.get("/status/{server_name}")
+        async def get_status(server_name: str):
+            return {"status": server_name}
+
+        for name in ("alpha", "beta"):
+            sub_app = await make_app(
+                fake_session(tools=make_tools(3)), server_name=name
+            )
+            if dispatch:
+                install_dispatch_router(sub_app)
+            main_app.mount(f"/{name}", sub_app)
+        return main_app
+
+    return make_main_app
+
+
+@pytest.mark.anyio
+async def test_same_responses_as_linear_routing(make_main_app):
+    requests = [
+        ("POST", "/alpha/tool_0", {"text": "a"}),
+        ("POST", "/beta/tool_2", {}),
+        ("GET", "/alpha/tool_0", None),
+        ("POST", "/alpha/missing", {}),
+        ("POST", "/gamma/tool_0", {}),
+        ("GET", "/status/alpha", None),
+        ("GET", "/alpha/openapi.json", None),
+    ]
+    results = []
+    for dispatch in (False, True):
+        app = await make_main_app(dispatch)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            responses = [
+                await client.request(method, path, json=body)
+                for method, path, body in requests
+            ]
+        results.append([(r.status_code, r.content) for r in responses])
+
+    assert results[0] == results[1]
+    assert [status for status, _ in results[1]] == [200, 200, 405, 404, 404, 200, 200]
+
+
+@pytest.mark.anyio
+async def test_openapi_is_unchanged(make_app, fake_session):
+    documents = []
+    for dispatch in (False, True):
+        app = await make_app(fake_session(tools=make_tools(5)))
+        if dispatch:
+            install_dispatch_router(app)
+        documents.append(app.openapi())
+    assert documents[0] == documents[1]
+
+
+@pytest.mark.anyio
+async def test_index_follows_new_routes(make_app, fake_session):
+    app = await make_app(fake_session(tools=make_tools(1)))
+    install_dispatch_router(app)
+    router = app.router.middleware_stack
+    assert isinstance(router, DispatchRouter)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        assert (await client.post("/tool_0", json={})).status_code == 200
+        assert "/tool_0" in router.routes
+
+        @app.post("/added")
+        async def added():
+            return "added"
+
+        assert (await client.post("/added")).json() == "added"
+        assert "/added" in router.routes
+
+
+def test_dynamic_routes_keep_precedence():
+    app = FastAPI()
+
+    @app.get("/{name}")
+    async def dynamic(name: str):
+        return "dynamic"
+
+    @app.get("/static")
+    async def static():
+        return "static"
+
+    router = DispatchRouter(app.router)
+    router.build_index()
+    # The linear scan matches "/{name}" first, so "/static" must not be indexed
+    assert "/static" not in router.routes
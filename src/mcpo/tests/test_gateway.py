@@ -0,0 +1,235 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from mcpo.utils.circuit_breaker import ServerCircuitBreakers
+from mcpo.utils.limits import PayloadLimits, ServerPayloadLimits
+
+from mcpo.utils.auth import get_verify_api_key
+from mcpo.utils.gateway import GATEWAY_PATH, McpGateway, add_gateway_route
+from mcpo.utils.health import ServerStatus
+
+ACCEPT = {"Accept": "application/json, text/event-stream"}
+
+ADD_TOOL = types.Tool(
+    name="add",
+    description="Add two numbers",
+    inputSchema={
+        "type": "object",
+        "properties": {"a": {"type": "number"}, "b": {"type": "number"}},
+    },
+)
+
+
+class McpClient:
+    """Minimal streamable HTTP client, reading the SSE response to each request."""
+
+    def __init__(self, client: TestClient, headers=None):
+        self.client = client
+        self.headers = {**ACCEPT, **(headers or {})}
+        self.next_id = 1
+
+    def post(self, message: dict):
+        return self.client.post(GATEWAY_PATH, json=message, headers=self.headers)
+
+    def request(self, method: str, params=None) -> list:
+        message = {"jsonrpc": "2.0", "id": self.next_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        self.next_id += 1
+        response = self.post(message)
+        assert response.status_code == 200, response.text
+        return [
+            json.loads(line[len("data: ") :])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def initialize(self):
+        response = self.post(
+            {
+                "jsonrpc": "2.0",
+                "id": 0,
+                "method": "initialize",
+                "params": {
+                    "protocolVersion": "2025-03-26",
+                    "capabilities": {},
+                    "clientInfo": {"name": "test", "version": "1.0"},
+                },
+            }
+        )
+        assert response.status_code == 200, response.text
+        self.headers["mcp-session-id"] = response.headers["mcp-session-id"]
+        self.post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        return self
+
+
+@pytest.fixture
+def make_gateway(make_app, fake_session):
+    async def make_gateway(api_dependency=None):
+        servers = [
+            await make_app(fake_session(), server_name="text"),
+            await make_app(
+                fake_session(
+                    result=types.CallToolResult(
+                        content=[types.TextContent(type="text", text="3")],
+                        structuredContent={"result": 3},
+                    ),
+                    tools=[ADD_TOOL],
+                ),
+                server_name="math",
+                status=ServerStatus(),
+            ),
+        ]
+        app = FastAPI(lifespan=lambda app: app.state.gateway.run())
+        gateway = add_gateway_route(app, servers, api_dependency=api_dependency)
+        return gateway, servers, app
+
+    return make_gateway
+
+
+@pytest.mark.anyio
+async def test_lists_and_routes_tools(make_gateway):
+    _, servers, app = await make_gateway()
+    with TestClient(app) as client:
+        mcp = McpClient(client).initialize()
+        (listed,) = mcp.request("tools/list")
+        names = [tool["name"] for tool in listed["result"]["tools"]]
+        assert names == ["text__echo", "math__add"]
+
+        progress, result = mcp.request(
+            "tools/call",
+            {
+                "name": "math__add",
+                "arguments": {"a": 1, "b": 2},
+                "_meta": {"progressToken": "p"},
+            },
+        )
+        (unknown,) = mcp.request("tools/call", {"name": "math__sub", "arguments": {}})
+    assert progress["method"] == "notifications/progress"
+    assert progress["params"]["progressToken"] == "p"
+    assert result["result"]["structuredContent"] == {"result": 3}
+    assert servers[1].state.session.calls[0][:2] == ("add", {"a": 1, "b": 2})
+    assert servers[1].state.status.calls == 1
+    assert unknown["result"]["isError"] is True
+
+
+@pytest.mark.anyio
+async def test_tool_list_changes_invalidate_cache(make_gateway):
+    gateway, servers, app = await make_gateway()
+
+    class Client:
+        def __init__(self):
+            self.notifications = []
+
+        async def send_notification(self, notification):
+            self.notifications.append(notification.root)
+
+    client = Client()
+    gateway.clients.add(client)
+    (listener,) = servers[0].state.notification_listeners
+
+    with TestClient(app) as http_client:
+        mcp = McpClient(http_client).initialize()
+        mcp.request("tools/list")
+        servers[0].state.session.tools = [ADD_TOOL]
+        (listed,) = mcp.request("tools/list")
+        assert listed["result"]["tools"][0]["name"] == "text__echo"
+
+        await listener(types.ToolListChangedNotification())
+        (listed,) = mcp.request("tools/list")
+        assert listed["result"]["tools"][0]["name"] == "text__add"
+        # Tools listed after the server started are called without a route
+        (called,) = mcp.request("tools/call", {"name": "text__add", "arguments": {}})
+        assert called["result"]["isError"] is False
+        assert servers[0].state.session.calls[-1][0] == "add"
+    assert isinstance(client.notifications[0], types.ToolListChangedNotification)
+
+    await listener(
+        types.LoggingMessageNotification(
+            params=types.LoggingMessageNotificationParams(
+                level="info", logger="db", data="connected"
+            )
+        )
+    )
+    assert client.notifications[1].params.logger == "text.db"
+
+
+@pytest.mark.anyio
+async def test_requires_api_key(make_gateway):
+    _, _, app = await make_gateway(api_dependency=get_verify_api_key("secret"))
+    with TestClient(app) as client:
+        response = McpClient(client).post({"jsonrpc": "2.0", "id": 1, "method": "ping"})
+        assert response.status_code == 401
+
+        mcp = McpClient(client, {"Authorization": "Bearer secret"}).initialize()
+        (listed,) = mcp.request("tools/list")
+        assert len(listed["result"]["tools"]) == 2
+
+
+@pytest.mark.anyio
+async def test_calls_use_the_server_limits(make_app, fake_session):
+    failing = fake_session(
+        error=McpError(types.ErrorData(code=types.INTERNAL_ERROR, message="down"))
+    )
+    large = fake_session(
+        result=types.CallToolResult(
+            content=[types.TextContent(type="text", text="x" * 1000)]
+        )
+    )
+    servers = [
+        await make_app(
+            failing,
+            server_name="failing",
+            circuit_breakers=ServerCircuitBreakers.from_config(
+                {"minimumCalls": 2, "windowSize": 2}
+            ),
+        ),
+        await make_app(
+            large,
+            server_name="large",
+            payload_limits=ServerPayloadLimits(
+                default=PayloadLimits(max_response_size=100)
+            ),
+        ),
+    ]
+    app = FastAPI(lifespan=lambda app: app.state.gateway.run())
+    add_gateway_route(app, servers)
+    with TestClient(app) as client:
+        mcp = McpClient(client).initialize()
+        results = [
+            mcp.request("tools/call", {"name": "failing__echo", "arguments": {}})[0]
+            for _ in range(3)
+        ]
+        (truncated,) = mcp.request(
+            "tools/call", {"name": "large__echo", "arguments": {}}
+        )
+    assert all(result["result"]["isError"] for result in results)
+    # The open circuit rejects the third call without reaching the server
+    assert "down" in results[0]["result"]["content"][0]["text"]
+    assert "down" not in results[2]["result"]["content"][0]["text"]
+    assert len(failing.calls) == 2
+
+    text = truncated["result"]["content"][0]["text"]
+    assert text.startswith("x" * 100 + "\n[mcpo: response truncated")
+
+
+@pytest.mark.anyio
+async def test_unconnected_servers_are_listed_later(make_app, fake_session):
+    connected = await make_app(fake_session(), server_name="up")
+    pending = FastAPI()
+    pending.state.server_name = "pending"
+    gateway = McpGateway([connected, pending])
+    gateway.track_client = lambda: None
+
+    assert [tool.name for tool in await gateway.list_tools()] == ["up__echo"]
+    assert gateway.tools is None
+
+    pending.state.session = fake_session(tools=[ADD_TOOL])
+    tools = await gateway.list_tools()
+    assert [tool.name for tool in tools] == ["up__echo", "pending__add"]
+    assert gateway.tools is tools
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from mcpo.utils.health import (
+    SERVER_ID_ENV,
+    ServerStatus,
+    add_health_routes,
+    find_child_process,
+    get_process_rss,
+    is_process_alive,
+)
+
+
+def make_server(name, required=True):
+    server = FastAPI()
+    server.state.server_name = name
+    server.state.status = ServerStatus(required=required)
+    return server
+
+
+@pytest.fixture
+def servers():
+    return [make_server("time"), make_server("memory", required=False)]
+
+
+@pytest.fixture
+def client(servers):
+    app = FastAPI()
+    add_health_routes(app, servers)
+    return TestClient(app)
+
+
+def test_healthz(client):
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+
+def test_readyz_waits_for_required_servers(client, servers):
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["servers"] == {"time": "starting", "memory": "starting"}
+
+    servers[0].state.status.set_ready()
+    servers[1].state.status.set_failed(RuntimeError("boom"))
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["servers"] == {"time": "ready", "memory": "failed"}
+
+
+def test_server_status(client, servers):
+    status = servers[0].state.status
+    status.set_ready()
+    status.tools_listed(3)
+    status.call_started()
+    status.call_started()
+    status.call_finished(success=True)
+
+    response = client.get("/status/time")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["state"] == "ready"
+    assert body["tool_count"] == 3
+    assert body["in_flight"] == 1
+    assert body["calls"] == 2
+    assert body["last_success"] is not None
+    assert body["last_list_tools"] is not None
+
+    assert set(client.get("/status").json()) == {"time", "memory"}
+    assert client.get("/status/unknown").status_code == 404
+
+
+def test_health_routes_not_in_openapi(client):
+    assert client.get("/openapi.json").json()["paths"] == {}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="requires /proc")
+def test_child_process_tracking():
+    server_id = uuid.uuid4().hex
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(30)"],
+        env={**os.environ, SERVER_ID_ENV: server_id},
+    )
+    try:
+        pid = find_child_process(server_id)
+        assert pid == process.pid
+        assert is_process_alive(pid)
+        assert get_process_rss(pid) > 0
+
+        status = ServerStatus()
+        status.set_ready(pid=pid)
+        assert status.is_ready
+
+        process.kill()
+        process.wait()
+        assert not is_process_alive(pid)
+        assert status.get_state() == "exited"
+    finally:
+        process.kill()
+        process.wait()
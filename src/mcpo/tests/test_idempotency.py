@@ -0,0 +1,213 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse
+from mcp import types
+from starlette.background import BackgroundTask
+
+from mcpo.utils.idempotency import IdempotencySettings, IdempotencyStore
+from mcpo.utils.jobs import JobSettings, JobStore
+from mcpo.utils.limits import PayloadLimits, ServerPayloadLimits
+
+
+@pytest.fixture
+def make_client(make_app, fake_session):
+    async def make_client(settings=None, session=None, **state):
+        session = session or fake_session(
+            result=types.CallToolResult(
+                content=[types.TextContent(type="text", text='{"ok": true}')]
+            )
+        )
+        store = IdempotencyStore(settings or IdempotencySettings(enabled=True))
+        app = await make_app(session, idempotency=store, **state)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+        return client, session, store
+
+    return make_client
+
+
+def key_headers(key, api_key=None):
+    headers = {"Idempotency-Key": key}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+@pytest.mark.anyio
+async def test_retries_replay_the_first_outcome(make_client):
+    client, session, _ = await make_client()
+    first = await client.post("/echo", json={"text": "hi"}, headers=key_headers("a"))
+    retry = await client.post("/echo", json={"text": "hi"}, headers=key_headers("a"))
+    assert first.json() == retry.json() == {"ok": True}
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(session.calls) == 1
+
+    # Other keys, API keys and requests without a key are called again
+    await client.post("/echo", json={"text": "hi"}, headers=key_headers("b"))
+    await client.post("/echo", json={"text": "hi"}, headers=key_headers("a", "k1"))
+    await client.post("/echo", json={"text": "hi"})
+    assert len(session.calls) == 4
+
+
+@pytest.mark.anyio
+async def test_mismatched_arguments_are_rejected(make_client):
+    client, session, _ = await make_client()
+    await client.post("/echo", json={"text": "hi"}, headers=key_headers("a"))
+    response = await client.post(
+        "/echo", json={"text": "bye"}, headers=key_headers("a")
+    )
+    assert response.status_code == 422
+    assert "different arguments" in response.json()["detail"]["message"]
+    assert len(session.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_duplicates_share_the_call(make_client, fake_session):
+    release = asyncio.Event()
+    client, session, store = await make_client(session=fake_session(wait=release))
+    calls = [
+        asyncio.create_task(
+            client.post("/echo", json={"text": "hi"}, headers=key_headers("a"))
+        )
+        for _ in range(3)
+    ]
+    while not session.calls:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    assert store.to_dict() == {"keys": 1, "in_flight": 1}
+
+    release.set()
+    responses = await asyncio.gather(*calls)
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len(session.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_errors(make_client, fake_session):
+    error = types.CallToolResult(
+        content=[types.TextContent(type="text", text="failed")], isError=True
+    )
+    client, session, store = await make_client(session=fake_session(result=error))
+    responses = [
+        await client.post("/echo", json={"text": "hi"}, headers=key_headers("a"))
+        for _ in range(2)
+    ]
+    assert [response.status_code for response in responses] == [500, 500]
+    assert "idempotent-replayed" not in responses[0].headers
+    assert responses[1].headers["idempotent-replayed"] == "true"
+    assert responses[0].json() == responses[1].json()
+    # The tool ran and failed, so the failure is replayed
+    assert len(session.calls) == 1
+
+    # Calls rejected before reaching the tool can be retried
+    attempts = []
+
+    async def rejected():
+        attempts.append(1)
+        raise HTTPException(status_code=503, detail="Circuit open")
+
+    request = Request({"type": "http", "headers": []})
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await store.run(request, "echo", "b", {}, rejected)
+    assert len(attempts) == 2
+    assert len(store.entries) == 1
+
+
+@pytest.mark.anyio
+async def test_async_jobs_are_submitted_once(make_client):
+    client, session, _ = await make_client(jobs=JobStore(JobSettings(enabled=True)))
+    responses = [
+        await client.post(
+            "/echo?async=true", json={"text": "hi"}, headers=key_headers("a")
+        )
+        for _ in range(2)
+    ]
+    assert [response.status_code for response in responses] == [202, 202]
+    assert responses[0].json()["id"] == responses[1].json()["id"]
+
+    # The same key without ?async=true is another request
+    response = await client.post("/echo", json={"text": "hi"}, headers=key_headers("a"))
+    assert response.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_spilled_results_are_kept_until_expiry(make_client, tmp_path):
+    result = types.CallToolResult(
+        content=[types.TextContent(type="text", text='{"text": "' + "x" * 100 + '"}')]
+    )
+    limits = PayloadLimits(max_response_size=10, spill_directory=str(tmp_path))
+    client, session, store = await make_client(
+        session=None,
+        payload_limits=ServerPayloadLimits(default=limits),
+    )
+    session.result = result
+    for _ in range(2):
+        response = await client.post(
+            "/echo", json={"text": "hi"}, headers=key_headers("a")
+        )
+        assert response.json() == {"text": "x" * 100}
+    assert len(session.calls) == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    store.settings = IdempotencySettings(enabled=True, ttl=0)
+    store.evict_expired()
+    assert not store.entries
+    assert not list(tmp_path.iterdir())
+
+
+def test_settings_from_config():
+    settings = IdempotencySettings.from_config({"header": "X-Request-ID", "ttl": 60})
+    assert settings.enabled
+    assert (settings.header, settings.ttl) == ("X-Request-ID", 60)
+    assert not IdempotencySettings.from_config(None).enabled
+
+
+@pytest.mark.anyio
+async def test_spilled_results_are_deleted_once_unused(tmp_path):
+    store = IdempotencyStore(IdempotencySettings(enabled=True))
+    request = Request({"type": "http", "headers": []})
+    release = asyncio.Event()
+
+    async def spill(name):
+        await release.wait()
+        path = tmp_path / name
+        path.write_text("{}")
+        return FileResponse(str(path), background=BackgroundTask(path.unlink))
+
+    # The first request goes away before the result is spilled
+    waiting = asyncio.create_task(
+        store.run(request, "echo", "a", {}, lambda: spill("a"))
+    )
+    await asyncio.sleep(0)
+    waiting.cancel()
+    release.set()
+    await asyncio.gather(waiting, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert (tmp_path / "a").exists()
+
+    # Evicting a result while it is sent deletes it once sent
+    response, replayed = await store.run(request, "echo", "a", {}, lambda: spill("a"))
+    assert replayed
+    store.remove(next(iter(store.entries)))
+    assert (tmp_path / "a").exists()
+    await response.background()
+    assert not (tmp_path / "a").exists()
+
+    # Shutting down deletes kept results and cancels calls in flight
+    await store.run(request, "echo", "b", {}, lambda: spill("b"))
+    release.clear()
+    pending = asyncio.create_task(
+        store.run(request, "echo", "c", {}, lambda: spill("c"))
+    )
+    await asyncio.sleep(0)
+    await store.close()
+    assert list(tmp_path.iterdir()) == []
+    assert not store.entries
+    with pytest.raises(asyncio.CancelledError):
+        await pending
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.responses import FileResponse
+from mcp import types
+
+from mcpo.utils.jobs import JobSettings, JobStore, add_job_routes
+
+
+@pytest.fixture
+def make_client(make_app, fake_session):
+    async def make_client(settings, **session_kwargs):
+        session = fake_session(**session_kwargs)
+        app = await make_app(session, jobs=JobStore(settings))
+        add_job_routes(app)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+        return client, session
+
+    return make_client
+
+
+async def wait_for_job(client, job_id):
+    for _ in range(100):
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["state"] not in ("pending", "running"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+@pytest.mark.anyio
+async def test_async_tool_call(make_client):
+    result = types.CallToolResult(
+        content=[types.TextContent(type="text", text='{"ok": true}')]
+    )
+    client, session = await make_client(JobSettings(enabled=True), result=result)
+
+    response = await client.post("/echo?async=true", json={"text": "hi"})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.headers["location"] == f"/jobs/{job_id}"
+
+    job = await wait_for_job(client, job_id)
+    assert job["state"] == "succeeded"
+    assert (job["progress"], job["total"], job["message"]) == (1, 2, "halfway")
+
+    response = await client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+
+
+@pytest.mark.anyio
+async def test_synchronous_call_without_async_flag(make_client):
+    client, session = await make_client(JobSettings(enabled=True))
+    response = await client.post("/echo", json={"text": "hi"})
+    assert response.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_cancel_job_and_concurrency_cap(make_client):
+    client, session = await make_client(
+        JobSettings(enabled=True, max_concurrent=1), wait=asyncio.Event()
+    )
+
+    job_id = (await client.post("/echo?async=1", json={})).json()["id"]
+    response = await client.post("/echo?async=1", json={})
+    assert response.status_code == 429
+
+    response = await client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 409
+
+    await client.delete(f"/jobs/{job_id}")
+    job = await wait_for_job(client, job_id)
+    assert job["state"] == "cancelled"
+
+
+@pytest.mark.anyio
+async def test_failed_job_result(make_client):
+    client, session = await make_client(
+        JobSettings(enabled=True), error=RuntimeError("boom")
+    )
+
+    job_id = (await client.post("/echo?async=true", json={})).json()["id"]
+    await wait_for_job(client, job_id)
+
+    response = await client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 500
+    assert response.json()["detail"]["error"] == "boom"
+
+
+@pytest.mark.anyio
+async def test_jobs_expire_and_persist(tmp_path):
+    settings = JobSettings(enabled=True, ttl=60, persist_directory=str(tmp_path))
+    store = JobStore(settings)
+
+    async def call(progress_callback):
+        return {"answer": 42}
+
+    job = store.submit("echo", call)
+    await asyncio.sleep(0.01)
+    assert job.state == "succeeded"
+    assert (tmp_path / f"{job.id}.json").exists()
+
+    # A new store picks up the finished job from disk
+    reloaded = JobStore(settings)
+    response = reloaded.get_result_response(job.id)
+    assert response.path == str(tmp_path / f"{job.id}.json")
+
+    reloaded.jobs[job.id].finished_at = time.time() - 120
+    with pytest.raises(Exception):
+        reloaded.get(job.id)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.anyio
+async def test_close_deletes_spilled_results(tmp_path):
+    store = JobStore(JobSettings(enabled=True))
+    path = tmp_path / "result.json"
+    path.write_text("{}")
+
+    async def call(progress_callback):
+        return FileResponse(str(path))
+
+    store.submit("echo", call)
+    await asyncio.sleep(0.01)
+    await store.close()
+    assert not path.exists()
@@ -0,0 +1,164 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from mcp import types
+
+from mcpo.utils.limits import (
+    PayloadLimits,
+    ServerPayloadLimits,
+    get_result_size,
+    spill_tool_result,
+    truncate_tool_result,
+)
+
+FETCH_TOOL = types.Tool(
+    name="fetch",
+    inputSchema={"type": "object", "properties": {"url": {"type": "string"}}},
+)
+
+
+def text_result(*texts):
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=text) for text in texts]
+    )
+
+
+@pytest.fixture
+def make_client(make_app, fake_session):
+    async def make_client(result, limits_config):
+        app = await make_app(
+            fake_session(result=result, tools=[FETCH_TOOL]),
+            payload_limits=ServerPayloadLimits.from_config(limits_config),
+        )
+        return TestClient(app)
+
+    return make_client
+
+
+def test_limits_from_config_with_tool_overrides():
+    limits = ServerPayloadLimits.from_config(
+        {
+            "maxRequestSize": 100,
+            "tools": {
+                "fetch": {"maxResponseSize": 10, "oversizedResponse": "truncate"}
+            },
+        },
+        PayloadLimits(max_response_size=1000),
+    )
+    assert limits.for_tool("other") == PayloadLimits(
+        max_request_size=100, max_response_size=1000
+    )
+    assert limits.for_tool("fetch") == PayloadLimits(
+        max_request_size=100, max_response_size=10, oversized_response="truncate"
+    )
+
+    with pytest.raises(ValueError):
+        PayloadLimits.from_config({"oversizedResponse": "drop"})
+
+
+def test_truncate_tool_result():
+    result = truncate_tool_result(text_result("a" * 8, "b" * 8), 10)
+    texts = [content.text for content in result.content]
+    assert texts[0] == "a" * 8
+    assert texts[1].startswith("bb\n[mcpo: response truncated, 6 bytes omitted]")
+
+
+def test_truncate_drops_structured_content():
+    result = text_result("a" * 20).model_copy(
+        update={"structuredContent": {"text": "a" * 20}}
+    )
+    assert truncate_tool_result(result, 10).structuredContent is None
+
+
+def test_result_size():
+    blob = types.EmbeddedResource(
+        type="resource",
+        resource=types.BlobResourceContents(
+            uri="file:///data.bin", mimeType="application/octet-stream", blob="A" * 1000
+        ),
+    )
+    assert get_result_size(types.CallToolResult(content=[blob])) > 1000
+
+    # Structured content is returned instead of the text content
+    result = text_result("{}").model_copy(
+        update={"structuredContent": {"items": ["a" * 1000]}}
+    )
+    assert get_result_size(result) > 1000
+
+
+def test_failed_spill_leaves_no_file(tmp_path):
+    def process_content(content):
+        if content == "bad":
+            raise ValueError("Cannot convert")
+        return content
+
+    with pytest.raises(ValueError):
+        spill_tool_result(["ok", "bad"], process_content, str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.anyio
+async def test_request_over_limit_is_rejected(make_client):
+    client = await make_client(text_result("ok"), {"maxRequestSize": 20})
+
+    assert client.post("/fetch", json={"url": "http://a"}).status_code == 200
+    response = client.post("/fetch", json={"url": "http://" + "a" * 100})
+    assert response.status_code == 413
+
+
+@pytest.mark.anyio
+async def test_oversized_response_is_spilled(make_client, tmp_path):
+    payload = {"items": list(range(1000))}
+    client = await make_client(
+        text_result(json.dumps(payload)),
+        {"maxResponseSize": 100, "spillDirectory": str(tmp_path)},
+    )
+
+    response = client.post("/fetch", json={})
+    assert response.status_code == 200
+    assert response.json() == payload
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.anyio
+async def test_oversized_response_is_truncated(make_client):
+    client = await make_client(
+        text_result("x" * 1000),
+        {"maxResponseSize": 100, "oversizedResponse": "truncate"},
+    )
+
+    response = client.post("/fetch", json={})
+    assert response.status_code == 200
+    assert response.json().startswith("x" * 100 + "\n[mcpo: response truncated")
+
+
+@pytest.mark.anyio
+async def test_oversized_embedded_resource_is_spilled(make_client, tmp_path):
+    blob = "A" * 10_000
+    result = types.CallToolResult(
+        content=[
+            types.EmbeddedResource(
+                type="resource",
+                resource=types.BlobResourceContents(
+                    uri="file:///data.bin",
+                    mimeType="application/octet-stream",
+                    blob=blob,
+                ),
+            )
+        ]
+    )
+    client = await make_client(
+        result, {"maxResponseSize": 100, "spillDirectory": str(tmp_path)}
+    )
+    response = client.post("/fetch", json={})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert blob in response.text
+
+    client = await make_client(
+        result, {"maxResponseSize": 100, "oversizedResponse": "truncate"}
+    )
+    response = client.post("/fetch", json={})
+    assert blob not in response.text
+    assert "response truncated" in response.text
@@ -0,0 +1,102 @@
+import os
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mcp import types
+
+from mcpo.utils.health import ServerStatus
+from mcpo.utils.memory import MemoryProfiler, add_memory_routes, get_app_memory
+
+NESTED_TOOL = types.Tool(
+    name="create_user",
+    description="Create a user",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "address": {
+                "type": "object",
+                "properties": {"city": {"type": "string"}},
+            },
+        },
+    },
+    outputSchema={
+        "type": "object",
+        "properties": {"id": {"type": "integer"}},
+    },
+)
+
+
+@pytest.fixture
+def profiler():
+    profiler = MemoryProfiler(max_snapshots=2)
+    yield profiler
+    if tracemalloc.is_tracing():
+        profiler.stop()
+
+
+@pytest.fixture
+def make_client(make_app, fake_session, profiler):
+    async def make_client():
+        server = await make_app(fake_session(tools=[NESTED_TOOL]))
+        server.state.server_name = "users"
+        server.state.status = ServerStatus()
+        server.state.status.set_ready(pid=os.getpid())
+        app = FastAPI()
+        add_memory_routes(app, [server], profiler)
+        return TestClient(app)
+
+    return make_client
+
+
+@pytest.mark.anyio
+async def test_app_memory_counts_models_and_routes(make_app, fake_session):
+    server = await make_app(fake_session(tools=[NESTED_TOOL]))
+    memory = get_app_memory(server)
+    assert memory["tool_routes"] == 1
+    # Form model, its nested address model and the response model
+    assert memory["models"] == 3
+    assert memory["rss"] is None
+
+
+@pytest.mark.anyio
+async def test_memory_summary(make_client):
+    client = await make_client()
+    memory = client.get("/memory").json()
+    assert memory["rss"] > 0
+    assert memory["tracemalloc"]["tracing"] is False
+    server = memory["servers"]["users"]
+    assert server["pid"] == os.getpid()
+    assert server["rss"] > 0
+
+
+@pytest.mark.anyio
+async def test_snapshots_and_diffs(make_client):
+    client = await make_client()
+    assert client.post("/memory/snapshots").status_code == 409
+
+    assert client.post("/memory/tracemalloc/start").json()["tracing"] is True
+    first = client.post("/memory/snapshots", params={"top": 5}).json()
+    assert first["id"] == 1
+    assert len(first["allocations"]) <= 5
+
+    leak = [bytearray(1024) for _ in range(1000)]
+    diff = client.post("/memory/snapshots", params={"compare_to": 1}).json()
+    assert diff["compared_to"] == 1
+    assert any(
+        "test_memory.py" in allocation["location"][0]
+        and allocation["size_diff"] >= 1024 * 1000
+        for allocation in diff["allocations"]
+    )
+    del leak
+
+    # Only the last two snapshots are kept
+    client.post("/memory/snapshots")
+    response = client.post("/memory/snapshots", params={"compare_to": 1})
+    assert response.status_code == 404
+    response = client.post("/memory/snapshots", params={"group_by": "module"})
+    assert response.status_code == 422
+
+    assert client.post("/memory/tracemalloc/stop").json()["tracing"] is False
@@ -0,0 +1,105 @@
+import httpx
+import pytest
+from mcp import types
+
+from mcpo.utils.limits import PayloadLimits, ServerPayloadLimits
+from mcpo.utils.main import is_text_output
+
+ADD_TOOL = types.Tool(
+    name="add",
+    description="Add two numbers",
+    inputSchema={
+        "type": "object",
+        "properties": {"a": {"type": "integer"}, "b": {"type": "integer"}},
+    },
+    outputSchema={
+        "type": "object",
+        "properties": {"result": {"type": "integer"}},
+        "required": ["result"],
+        "x-fastmcp-wrap-result": True,
+    },
+)
+
+GREET_TOOL = types.Tool(
+    name="greet",
+    description="Greet someone",
+    inputSchema={"type": "object", "properties": {"name": {"type": "string"}}},
+    outputSchema={
+        "type": "object",
+        "properties": {"result": {"type": "string"}},
+        "x-fastmcp-wrap-result": True,
+    },
+)
+
+
+def text_result(text, structured=None):
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=text)],
+        structuredContent=structured,
+    )
+
+
+async def post(app, path, body):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        return await client.post(path, json=body)
+
+
+def test_is_text_output():
+    assert is_text_output(GREET_TOOL.outputSchema)
+    assert is_text_output({"type": "string"})
+    assert not is_text_output(ADD_TOOL.outputSchema)
+    assert not is_text_output(None)
+
+
+@pytest.mark.anyio
+async def test_structured_content_is_returned(make_app, fake_session):
+    session = fake_session(result=text_result("3", {"result": 3}), tools=[ADD_TOOL])
+    app = await make_app(session)
+    response = await post(app, "/add", {"a": 1, "b": 2})
+    assert response.status_code == 200
+    assert response.json() == {"result": 3}
+
+
+@pytest.mark.anyio
+async def test_text_is_not_parsed_for_string_output(make_app, fake_session):
+    session = fake_session(result=text_result("42"), tools=[GREET_TOOL])
+    app = await make_app(session)
+    assert (await post(app, "/greet", {"name": "x"})).json() == "42"
+
+    session = fake_session(result=text_result("42"))
+    app = await make_app(session)
+    assert (await post(app, "/echo", {"text": "x"})).json() == 42
+
+
+@pytest.mark.anyio
+async def test_spilled_text_is_not_parsed_for_string_output(
+    make_app, fake_session, tmp_path
+):
+    limits = ServerPayloadLimits(
+        default=PayloadLimits(max_response_size=10, spill_directory=str(tmp_path))
+    )
+    text = "[" + "4" * 20 + "]"
+    session = fake_session(result=text_result(text), tools=[GREET_TOOL])
+    app = await make_app(session, payload_limits=limits)
+    # Spilled or not, the text is returned as is
+    assert (await post(app, "/greet", {"name": "x"})).json() == text
+
+
+@pytest.mark.anyio
+async def test_output_is_only_validated_when_configured(make_app, fake_session):
+    session = fake_session(
+        result=text_result("x", {"result": "not a number"}), tools=[ADD_TOOL]
+    )
+    app = await make_app(session)
+    response = await post(app, "/add", {"a": 1, "b": 2})
+    assert response.json() == {"result": "not a number"}
+
+    app = await make_app(session, validate_output=True)
+    response = await post(app, "/add", {"a": 1, "b": 2})
+    assert response.status_code == 502
+    assert response.json()["detail"]["errors"][0]["loc"] == ["result"]
+
+    session.result = text_result("3", {"result": 3})
+    assert (await post(app, "/add", {"a": 1, "b": 2})).json() == {"result": 3}
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+
+import mcpo.main
+from mcpo.main import connect_affinity_session
+from mcpo.utils.affinity import AffinityPool, AffinitySettings
+from mcpo.utils.health import ServerStatus
+from mcpo.utils.process import (
+    ProcessLimits,
+    apply_limits,
+    get_process_cpu_time,
+    list_process_tree,
+    supervise_server,
+)
+
+resource = pytest.importorskip("resource")
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="Reads process stats from /proc"
+)
+
+SLEEP = ["sleep", "30"]
+
+
+def test_limits_from_config():
+    limits = ProcessLimits.from_config(
+        {"maxRss": 1024, "nice": 5, "cpuAffinity": [0], "inheritEnv": False}
+    )
+    assert limits.enabled
+    assert (limits.max_rss, limits.nice, limits.cpu_affinity) == (1024, 5, (0,))
+    assert not limits.inherit_env
+    assert not ProcessLimits.from_config(None).enabled
+
+
+@pytest.mark.anyio
+async def test_process_tree_and_limits():
+    process = await asyncio.create_subprocess_exec("sh", "-c", "sleep 30 & wait")
+    try:
+        for _ in range(50):
+            pids = list_process_tree(process.pid)
+            if len(pids) == 2:
+                break
+            await asyncio.sleep(0.02)
+        assert pids[0] == process.pid and len(pids) == 2
+        assert get_process_cpu_time(pids[1]) >= 0
+
+        apply_limits(pids[1], ProcessLimits(max_open_files=64, nice=7))
+        assert resource.prlimit(pids[1], resource.RLIMIT_NOFILE) == (64, 64)
+        assert os.getpriority(os.PRIO_PROCESS, pids[1]) == 7
+    finally:
+        process.kill()
+        await process.wait()
+
+
+@pytest.fixture
+def connect(fake_session):
+    """Connect to a sleeping subprocess, counting the sessions opened."""
+    sessions = []
+
+    @asynccontextmanager
+    async def connect():
+        process = await asyncio.create_subprocess_exec(*SLEEP)
+        session = fake_session()
+        sessions.append(session)
+        try:
+            yield session, process.pid
+        finally:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+
+    connect.sessions = sessions
+    return connect
+
+
+@pytest.mark.anyio
+async def test_restart_when_over_limit(connect):
+    status = ServerStatus()
+    restarted = []
+    limits = ProcessLimits(
+        enabled=True, max_rss=1, check_interval=0.05, max_restart_delay=0.05
+    )
+    async with supervise_server(
+        "sleepy", limits, connect, status, on_restart=[lambda: restarted.append(1)]
+    ) as (session, pid):
+        assert session.session is connect.sessions[0]
+        while status.process.restarts < 2:
+            await asyncio.sleep(0.02)
+        assert restarted
+        # The session follows the server to its new process
+        assert session.session is not connect.sessions[0]
+        assert status.pid != pid
+        process = status.to_dict()["process"]
+        assert process["last_restart_reason"].startswith("RSS of")
+        assert process["limits"]["max_rss"] == 1
+
+
+@pytest.mark.anyio
+async def test_no_restart(connect):
+    status = ServerStatus()
+    status.set_ready()
+    limits = ProcessLimits(enabled=True, check_interval=0.05, restart=False)
+    async with supervise_server("sleepy", limits, connect, status) as (_, pid):
+        os.kill(pid, 9)
+        while status.state != "failed":
+            await asyncio.sleep(0.02)
+        assert status.error == "exited"
+        assert len(connect.sessions) == 1
+        usage = status.process.to_dict()
+        assert usage["processes"] == 1 and usage["rss"] > 0
+
+
+@pytest.mark.anyio
+async def test_affinity_sessions_are_supervised(connect, monkeypatch):
+    monkeypatch.setattr(mcpo.main, "connect_server", lambda app: connect())
+    app = FastAPI(title="sleepy")
+    app.state.process_limits = ProcessLimits(
+        enabled=True, max_open_files=64, check_interval=0.05, restart=False
+    )
+    pool = AffinityPool(
+        AffinitySettings(enabled=True),
+        lambda entry: connect_affinity_session(app, entry),
+    )
+    try:
+        async with pool.session("a"):
+            pass
+        entry = pool.sessions["a"]
+        assert resource.prlimit(entry.pid, resource.RLIMIT_NOFILE) == (64, 64)
+        assert pool.to_dict()["processes"]["a"]["limits"]["max_open_files"] == 64
+
+        # A server that exits for good closes its session, so the key gets a new one
+        os.kill(entry.pid, 9)
+        while not entry.closed:
+            await asyncio.sleep(0.02)
+        async with pool.session("a"):
+            pass
+        assert pool.sessions["a"] is not entry
+        assert len(connect.sessions) == 2
+    finally:
+        await pool.close()
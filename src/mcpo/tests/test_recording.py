@@ -0,0 +1,134 @@
+import httpx
+import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from mcpo.replay import ReplayBackend, create_stub_server, drive, load_recording
+from mcpo.utils.recording import (
+    REDACTED,
+    RecordingSettings,
+    TrafficLog,
+    TrafficRecorder,
+    redact,
+)
+
+
+def text_result(text, structured=None):
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=text)],
+        structuredContent=structured,
+    )
+
+
+@pytest.fixture(params=["traffic.jsonl", "traffic.jsonl.gz"])
+def log_path(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+async def record_traffic(make_app, session, path, settings=None):
+    """Send a few calls through an app recording to `path`."""
+    log = TrafficLog(path)
+    recorder = TrafficRecorder(log, settings or RecordingSettings(enabled=True), "s")
+    app = await make_app(session, recorder=recorder)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.post("/echo", json={"text": "one"})
+        await client.post("/echo", json={"text": "two"})
+    log.close()
+
+
+def test_settings_from_config():
+    settings = RecordingSettings.from_config(
+        {"sampleRate": 0.5, "redact": ["Customer_ID"], "redactText": True},
+        RecordingSettings(enabled=True),
+    )
+    assert settings.enabled and settings.redact_text
+    assert settings.sample_rate == 0.5
+    assert "customer_id" in settings.redact and "password" in settings.redact
+    assert not RecordingSettings.from_config({"enabled": False}, settings).enabled
+
+
+def test_redact():
+    value = {"user": "a", "Password": "p", "nested": [{"x_api_key": "k", "n": 1}]}
+    assert redact(value, ("password", "api_key")) == {
+        "user": "a",
+        "Password": REDACTED,
+        "nested": [{"x_api_key": REDACTED, "n": 1}],
+    }
+
+
+@pytest.mark.anyio
+async def test_calls_are_recorded(make_app, fake_session, log_path):
+    session = fake_session(result=text_result("hello", {"token": "t", "n": 1}))
+    await record_traffic(make_app, session, log_path)
+
+    recording = load_recording(log_path)
+    assert [tool["name"] for tool in recording.tools["s"]] == ["echo"]
+    assert [call["arguments"] for call in recording.calls] == [
+        {"text": "one"},
+        {"text": "two"},
+    ]
+    result = recording.calls[0]["result"]
+    assert result["structuredContent"] == {"token": REDACTED, "n": 1}
+    assert result["content"][0]["text"] == "hello"
+    assert recording.calls[0]["latency"] >= 0
+
+
+@pytest.mark.anyio
+async def test_sampling_and_text_redaction(make_app, fake_session, log_path):
+    await record_traffic(
+        make_app,
+        fake_session(result=text_result("hello")),
+        log_path,
+        RecordingSettings(enabled=True, sample_rate=0),
+    )
+    assert load_recording(log_path).calls == []
+
+    await record_traffic(
+        make_app,
+        fake_session(result=text_result("hello")),
+        log_path,
+        RecordingSettings(enabled=True, redact_text=True),
+    )
+    calls = load_recording(log_path).calls
+    assert calls[0]["result"]["content"][0]["text"] == "xxxxx"
+
+
+@pytest.mark.anyio
+async def test_backend_replays_results_and_errors(make_app, fake_session, log_path):
+    session = fake_session(result=text_result("first"))
+    await record_traffic(make_app, session, log_path)
+    session.error = McpError(types.ErrorData(code=-32602, message="bad"))
+    await record_traffic(make_app, session, log_path)
+
+    backend = ReplayBackend(load_recording(log_path), "s", speed=0)
+    assert [tool.name for tool in backend.tools] == ["echo"]
+    result = await backend.call_tool("echo", {"text": "one"})
+    assert result.content[0].text == "first"
+    with pytest.raises(McpError) as exc_info:
+        await backend.call_tool("echo", {"text": "one"})
+    assert exc_info.value.error.message == "bad"
+    # Unknown arguments fall back to any recorded call of the tool
+    assert await backend.call_tool("echo", {"text": "other"})
+    with pytest.raises(McpError):
+        await backend.call_tool("missing", {})
+
+
+@pytest.mark.anyio
+async def test_replay_through_stub_server(make_app, fake_session, log_path):
+    await record_traffic(make_app, fake_session(result=text_result("42")), log_path)
+    recording = load_recording(log_path)
+
+    stub = create_stub_server(ReplayBackend(recording, "s", speed=0))
+    async with create_connected_server_and_client_session(stub) as session:
+        app = await make_app(session)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            report = await drive(client, recording, "s", repeat=3, speed=0)
+
+    assert report.requests == 6
+    assert report.mismatches == 0
+    assert set(report.to_dict()["latency"]) == {"p50", "p95", "p99"}
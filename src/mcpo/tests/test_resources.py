@@ -0,0 +1,242 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from mcpo.main import create_dynamic_endpoints, get_message_handler
+from mcpo.utils.main import process_tool_content
+from mcpo.utils.resources import (
+    RESOURCE_NOT_FOUND,
+    ResourceCache,
+    ResourceSettings,
+    setup_resource_cache,
+)
+from mcpo.utils.sharing import SessionView, SharedServer
+
+
+@pytest.fixture
+def resource_session(fake_session):
+    class ResourceSession(fake_session):
+        """Serves `resources` by URI, counting reads and subscriptions."""
+
+        def __init__(self, subscribe=True, delay=0, **kwargs):
+            super().__init__(**kwargs)
+            self.subscribe = subscribe
+            self.delay = delay
+            self.resources = {"file:///notes.txt": "first", "file:///big.txt": "x" * 80}
+            self.reads = []
+            self.subscriptions = []
+
+        async def initialize(self):
+            result = await super().initialize()
+            result.capabilities = types.ServerCapabilities(
+                resources=types.ResourcesCapability(subscribe=self.subscribe),
+                prompts=types.PromptsCapability(),
+            )
+            return result
+
+        async def list_resources(self, cursor=None):
+            return types.ListResourcesResult(
+                resources=[
+                    types.Resource(uri=uri, name=uri.rsplit("/", 1)[-1])
+                    for uri in self.resources
+                ]
+            )
+
+        async def read_resource(self, uri):
+            self.reads.append(uri)
+            await asyncio.sleep(self.delay)
+            if uri not in self.resources:
+                raise McpError(
+                    types.ErrorData(code=RESOURCE_NOT_FOUND, message="Not found")
+                )
+            return types.ReadResourceResult(
+                contents=[
+                    types.TextResourceContents(
+                        uri=uri, mimeType="text/plain", text=self.resources[uri]
+                    )
+                ]
+            )
+
+        async def subscribe_resource(self, uri):
+            self.subscriptions.append(uri)
+
+        async def unsubscribe_resource(self, uri):
+            self.subscriptions.remove(uri)
+
+        async def get_prompt(self, name, arguments=None):
+            return types.GetPromptResult(
+                messages=[
+                    types.PromptMessage(
+                        role="user",
+                        content=types.TextContent(
+                            type="text", text=f"Review {arguments['file']}"
+                        ),
+                    )
+                ]
+            )
+
+    return ResourceSession
+
+
+@pytest.fixture
+def make_client(resource_session):
+    async def make_client(settings=ResourceSettings(enabled=True), **kwargs):
+        app = FastAPI()
+        app.state.session = resource_session(**kwargs)
+        setup_resource_cache(app, settings)
+        await create_dynamic_endpoints(app)
+        return app, httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    return make_client
+
+
+def test_embedded_resources():
+    text = types.EmbeddedResource(
+        type="resource",
+        resource=types.TextResourceContents(
+            uri="file:///data.json", mimeType="application/json", text='{"a": 1}'
+        ),
+    )
+    assert process_tool_content(text) == {
+        "uri": "file:///data.json",
+        "mimeType": "application/json",
+        "text": {"a": 1},
+    }
+    blob = types.EmbeddedResource(
+        type="resource",
+        resource=types.BlobResourceContents(uri="file:///logo.png", blob="iVBO"),
+    )
+    assert process_tool_content(blob) == {"uri": "file:///logo.png", "blob": "iVBO"}
+
+
+@pytest.mark.anyio
+async def test_reads_are_cached_until_updated(make_client):
+    app, client = await make_client()
+    session = app.state.session
+    async with client:
+        for _ in range(3):
+            response = await client.get(
+                "/resources/read", params={"uri": "file:///notes.txt"}
+            )
+            assert response.json()["contents"][0]["text"] == "first"
+        assert session.reads == ["file:///notes.txt"]
+        assert session.subscriptions == ["file:///notes.txt"]
+
+        session.resources["file:///notes.txt"] = "second"
+        await get_message_handler(app)(
+            types.ServerNotification(
+                types.ResourceUpdatedNotification(
+                    params=types.ResourceUpdatedNotificationParams(
+                        uri="file:///notes.txt"
+                    )
+                )
+            )
+        )
+        response = await client.get(
+            "/resources/read", params={"uri": "file:///notes.txt"}
+        )
+        assert response.json()["contents"][0]["text"] == "second"
+
+        stats = (await client.get("/resources/cache")).json()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 2, 1)
+
+
+@pytest.mark.anyio
+async def test_cache_size_bound(make_client):
+    app, client = await make_client(ResourceSettings(enabled=True, cache_size=100))
+    session = app.state.session
+    async with client:
+        await client.get("/resources/read", params={"uri": "file:///notes.txt"})
+        await client.get("/resources/read", params={"uri": "file:///big.txt"})
+        # 5 + 80 bytes fit, so both are cached
+        assert session.subscriptions == ["file:///notes.txt", "file:///big.txt"]
+
+        session.resources["file:///other.txt"] = "y" * 50
+        await client.get("/resources/read", params={"uri": "file:///other.txt"})
+        stats = (await client.get("/resources/cache")).json()
+    # The least recently read resources are evicted and unsubscribed from
+    assert stats["evictions"] == 2
+    assert session.subscriptions == ["file:///other.txt"]
+
+
+@pytest.mark.anyio
+async def test_no_caching_without_subscriptions_or_ttl(resource_session):
+    session = resource_session(subscribe=False)
+    cache = ResourceCache(ResourceSettings(enabled=True))
+    await cache.read(session, "file:///notes.txt")
+    await cache.read(session, "file:///notes.txt")
+    assert len(session.reads) == 2
+
+    cache = ResourceCache(ResourceSettings(enabled=True, ttl=60))
+    await cache.read(session, "file:///notes.txt")
+    await cache.read(session, "file:///notes.txt")
+    assert len(session.reads) == 3
+    assert session.subscriptions == []
+
+
+@pytest.mark.anyio
+async def test_shared_session_subscriptions(resource_session):
+    shared = SharedServer("shared")
+    shared.session = session = resource_session()
+    views = [SessionView(session, shared=shared) for _ in range(2)]
+    caches = [
+        ResourceCache(ResourceSettings(enabled=True, cache_size=80)) for _ in views
+    ]
+    for view, cache in zip(views, caches):
+        cache.subscribe = True
+        shared.handlers[view] = cache.listener
+        await cache.read(view, "file:///notes.txt")
+    assert session.subscriptions == ["file:///notes.txt"]
+
+    # The first app evicts the resource, the second still gets its updates
+    await caches[0].read(views[0], "file:///big.txt")
+    assert "file:///notes.txt" not in caches[0].entries
+    assert session.subscriptions == ["file:///notes.txt", "file:///big.txt"]
+    await shared.message_handler(
+        types.ResourceUpdatedNotification(
+            params=types.ResourceUpdatedNotificationParams(uri="file:///notes.txt")
+        )
+    )
+    assert caches[1].invalidations == 1
+
+    await caches[1].unsubscribe(views[1], "file:///notes.txt")
+    assert session.subscriptions == ["file:///big.txt"]
+    assert shared.subscriptions == {"file:///big.txt": 1}
+
+
+@pytest.mark.anyio
+async def test_concurrent_reads_share_request(resource_session):
+    session = resource_session(delay=0.05)
+    cache = ResourceCache(ResourceSettings(enabled=True))
+    cache.subscribe = True
+    results = await asyncio.gather(
+        *(cache.read(session, "file:///notes.txt") for _ in range(5))
+    )
+    assert len(session.reads) == 1
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.anyio
+async def test_listing_prompts_and_errors(make_client):
+    _, client = await make_client()
+    async with client:
+        resources = (await client.get("/resources")).json()["resources"]
+        assert [resource["name"] for resource in resources] == [
+            "notes.txt",
+            "big.txt",
+        ]
+
+        response = await client.get(
+            "/resources/read", params={"uri": "file:///missing.txt"}
+        )
+        assert response.status_code == 404
+
+        response = await client.post("/prompts/review", json={"file": "main.py"})
+        message = response.json()["messages"][0]
+        assert message["content"]["text"] == "Review main.py"
@@ -0,0 +1,148 @@
+import asyncio
+
+import anyio
+import httpx
+import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, INTERNAL_ERROR, ErrorData
+
+from mcpo.utils.retry import (
+    RetryBudget,
+    RetryPolicy,
+    RetrySettings,
+    ServerRetryPolicies,
+    is_transport_error,
+)
+
+
+def make_tool(name="search", **annotations):
+    return types.Tool(
+        name=name,
+        inputSchema={"type": "object", "properties": {}},
+        annotations=types.ToolAnnotations(**annotations) if annotations else None,
+    )
+
+
+def make_policy(budget=None, **config):
+    settings = RetrySettings.from_config({"backoff": 0, **config})
+    return RetryPolicy(settings, budget or RetryBudget(0.1, 10))
+
+
+class FlakyCall:
+    """Fails with `errors` in order, then returns "ok"."""
+
+    def __init__(self, *errors, delays=()):
+        self.errors = list(errors)
+        self.delays = list(delays)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delays:
+            await asyncio.sleep(self.delays.pop(0))
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_transport_errors():
+    assert is_transport_error(McpError(ErrorData(code=CONNECTION_CLOSED, message="")))
+    assert is_transport_error(httpx.ConnectError("refused"))
+    assert is_transport_error(anyio.ClosedResourceError())
+    assert not is_transport_error(McpError(ErrorData(code=INTERNAL_ERROR, message="")))
+    assert not is_transport_error(ValueError())
+
+
+def test_only_idempotent_tools_get_a_policy():
+    policies = ServerRetryPolicies.from_config(
+        {"maxRetries": 2, "tools": {"write": {"idempotent": True}}}
+    )
+    assert policies.for_tool(make_tool(readOnlyHint=True))
+    assert policies.for_tool(make_tool(idempotentHint=True))
+    assert policies.for_tool(make_tool("write"))
+    assert policies.for_tool(make_tool(destructiveHint=True)) is None
+    assert policies.for_tool(make_tool()) is None
+    assert (
+        ServerRetryPolicies.from_config({}).for_tool(make_tool(readOnlyHint=True))
+        is None
+    )
+
+
+@pytest.mark.anyio
+async def test_retries_transport_errors():
+    policy = make_policy(maxRetries=2)
+    call = FlakyCall(httpx.ConnectError("refused"), anyio.BrokenResourceError())
+    assert await policy.call(call) == "ok"
+    assert call.calls == 3
+    assert policy.budget.retries == 2
+
+
+@pytest.mark.anyio
+async def test_does_not_retry_other_errors():
+    policy = make_policy(maxRetries=2)
+    call = FlakyCall(McpError(ErrorData(code=INTERNAL_ERROR, message="boom")))
+    with pytest.raises(McpError):
+        await policy.call(call)
+    assert call.calls == 1
+
+
+@pytest.mark.anyio
+async def test_retry_budget_is_capped():
+    budget = RetryBudget(ratio=0, burst=1)
+    policy = make_policy(budget, maxRetries=5)
+    call = FlakyCall(*[httpx.ConnectError("refused")] * 3)
+    with pytest.raises(httpx.ConnectError):
+        await policy.call(call)
+    assert call.calls == 2
+    assert budget.exhausted == 1
+
+
+@pytest.mark.anyio
+async def test_hedges_slow_calls():
+    policy = make_policy(hedge=True, hedgeMinSamples=1, hedgeMinDelay=0.01)
+    assert policy.get_hedge_delay() is None
+    policy.latency.record(0.01)
+
+    call = FlakyCall(delays=[10, 0])
+    assert await asyncio.wait_for(policy.call(call), timeout=1) == "ok"
+    assert call.calls == 2
+    assert policy.budget.hedges == 1
+
+
+@pytest.mark.anyio
+async def test_hedge_waits_for_first_success():
+    policy = make_policy(hedge=True, hedgeMinSamples=1, hedgeMinDelay=0.01)
+    policy.latency.record(0.01)
+
+    call = FlakyCall(
+        McpError(ErrorData(code=INTERNAL_ERROR, message="")), delays=[0.05, 0]
+    )
+    # The hedge fails first, the original call still wins
+    assert await policy.call(call) == "ok"
+    assert call.calls == 2
+
+
+@pytest.mark.anyio
+async def test_tool_calls_are_retried(make_app, fake_session):
+    tool = make_tool("echo", readOnlyHint=True)
+    session = fake_session(tools=[tool])
+    errors = [McpError(ErrorData(code=CONNECTION_CLOSED, message="closed"))]
+    call_tool = session.call_tool
+
+    async def flaky_call_tool(*args, **kwargs):
+        if errors:
+            session.calls.append(args)
+            raise errors.pop()
+        return await call_tool(*args, **kwargs)
+
+    session.call_tool = flaky_call_tool
+    policies = ServerRetryPolicies.from_config({"maxRetries": 1, "backoff": 0})
+    app = await make_app(session, retry_policies=policies)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post("/echo", json={})
+    assert response.status_code == 200
+    assert len(session.calls) == 2
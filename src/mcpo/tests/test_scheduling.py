@@ -0,0 +1,154 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from mcpo.utils.scheduling import (
+    FairScheduler,
+    PriorityClass,
+    SchedulerSettings,
+    add_scheduler_routes,
+)
+
+
+def make_scheduler(max_concurrent=1, **config):
+    return FairScheduler(
+        SchedulerSettings.from_config({"maxConcurrent": max_concurrent, **config})
+    )
+
+
+async def run_calls(scheduler, requests):
+    """Queue `(client_id, tool_name)` calls behind a held slot, return the admission order."""
+    order = []
+    blocker = await scheduler.acquire("blocker", "tool")
+
+    async def call(client_id, tool_name):
+        ticket = await scheduler.acquire(client_id, tool_name)
+        order.append(client_id)
+        await asyncio.sleep(0)
+        scheduler.release(ticket)
+
+    tasks = [asyncio.create_task(call(*request)) for request in requests]
+    await asyncio.sleep(0)
+    scheduler.release(blocker)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_settings_from_config():
+    settings = SchedulerSettings.from_config(
+        {
+            "maxConcurrent": 4,
+            "clientHeader": "X-Team",
+            "defaultClass": "interactive",
+            "classes": {"interactive": {"weight": 4}, "bulk": {"maxQueue": 10}},
+            "clients": {"batch": "bulk"},
+            "tools": {"export": "bulk"},
+        }
+    )
+    assert settings.enabled
+    assert settings.client_header == "X-Team"
+    assert settings.classes["interactive"] == PriorityClass(weight=4)
+    assert settings.classes["bulk"] == PriorityClass(weight=1.0, max_queue=10)
+    assert not SchedulerSettings().enabled
+
+    with pytest.raises(ValueError):
+        SchedulerSettings.from_config({"clients": {"batch": "missing"}})
+    with pytest.raises(ValueError):
+        SchedulerSettings.from_config({"classes": {"bulk": {"weight": 0}}})
+
+
+@pytest.mark.anyio
+async def test_clients_share_slots_fairly():
+    scheduler = make_scheduler()
+    order = await run_calls(scheduler, [("a", "tool")] * 4 + [("b", "tool")] * 2)
+    assert order == ["a", "b", "a", "b", "a", "a"]
+
+
+@pytest.mark.anyio
+async def test_weighted_classes():
+    scheduler = make_scheduler(
+        classes={"interactive": {"weight": 3}, "bulk": {"weight": 1}},
+        defaultClass="interactive",
+        clients={"bulk": "bulk"},
+    )
+    order = await run_calls(
+        scheduler, [("bulk", "tool")] * 4 + [("interactive", "tool")] * 4
+    )
+    assert order[:5].count("interactive") == 4
+
+    metrics = scheduler.to_dict()["classes"]
+    assert metrics["bulk"]["admitted"] == 4
+    assert metrics["interactive"]["queued"] == 0
+    assert metrics["interactive"]["active"] == 0
+
+
+def test_tool_priority_class():
+    scheduler = make_scheduler(classes={"bulk": {}}, tools={"export": "bulk"})
+    assert scheduler.get_class("a", "export") == "bulk"
+    assert scheduler.get_class("a", "search") == "default"
+
+
+@pytest.mark.anyio
+async def test_full_queue_is_rejected():
+    scheduler = make_scheduler(classes={"default": {"maxQueue": 1}})
+    ticket = await scheduler.acquire("a", "tool")
+    waiter = asyncio.create_task(scheduler.acquire("a", "tool"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await scheduler.acquire("b", "tool")
+    assert exc_info.value.status_code == 429
+    assert scheduler.to_dict()["classes"]["default"]["rejected"] == 1
+
+    scheduler.release(ticket)
+    scheduler.release(await waiter)
+    assert scheduler.active == 0
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_leaves_queue():
+    scheduler = make_scheduler()
+    ticket = await scheduler.acquire("a", "tool")
+    waiter = asyncio.create_task(scheduler.acquire("b", "tool"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.to_dict()["queued"] == 0
+    scheduler.release(ticket)
+    assert scheduler.active == 0
+
+
+@pytest.mark.anyio
+async def test_tool_calls_are_scheduled(make_app, fake_session):
+    wait = asyncio.Event()
+    session = fake_session(wait=wait)
+    app = await make_app(session, scheduler=make_scheduler())
+    add_scheduler_routes(app)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        calls = [
+            asyncio.create_task(
+                client.post("/echo", json={}, headers={"X-Client-ID": client_id})
+            )
+            for client_id in ("a", "b")
+        ]
+        for _ in range(100):
+            metrics = (await client.get("/scheduler")).json()
+            if metrics["queued"]:
+                break
+            await asyncio.sleep(0.01)
+        assert metrics["active"] == 1
+        assert metrics["queued"] == 1
+        assert len(session.calls) == 1
+
+        wait.set()
+        responses = await asyncio.gather(*calls)
+        assert [response.status_code for response in responses] == [200, 200]
+        assert len(session.calls) == 2
+        assert (await client.get("/scheduler")).json()["active"] == 0
@@ -0,0 +1,174 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mcp import types
+
+from mcpo.utils.search import ToolIndex, ToolScope, add_tool_search_routes, tokenize
+
+
+def make_tool(name, description, *parameters):
+    return types.Tool(
+        name=name,
+        description=description,
+        inputSchema={
+            "type": "object",
+            "properties": {parameter: {"type": "string"} for parameter in parameters},
+        },
+    )
+
+
+WEATHER_TOOLS = [
+    make_tool("get_weather", "Current weather conditions for a city", "city"),
+    make_tool("get_forecast", "Weather forecast for the next days", "city", "days"),
+]
+FILE_TOOLS = [
+    make_tool("readFile", "Read a file from disk", "path"),
+    make_tool("list_directory", "List the files in a directory", "path"),
+]
+
+
+def test_tokenize():
+    assert tokenize("getCurrentTime") == ["get", "current", "time"]
+    assert tokenize("list_files for the HTTPServer") == [
+        "list",
+        "files",
+        "http",
+        "server",
+    ]
+
+
+def test_search_ranks_and_filters():
+    index = ToolIndex()
+    index.add_server("weather", WEATHER_TOOLS, path="/weather", tags=["web"])
+    index.add_server("files", FILE_TOOLS, path="/files")
+
+    names = [entry.name for entry, _ in index.search("city weather")]
+    assert names == ["get_weather", "get_forecast"]
+    # Names count for more than descriptions, and prefixes match too
+    assert index.search("file")[0][0].name == "readFile"
+    assert [entry.name for entry, _ in index.search("direct")] == ["list_directory"]
+
+    assert index.search("path", server="weather") == []
+    assert len(index.search(tag="web")) == 2
+    assert len(index.search(scope=ToolScope(servers=("files",)))) == 2
+    assert index.search(limit=1)[0][0].path == "/files/list_directory"
+
+    version = index.version
+    index.remove_server("weather")
+    assert index.version > version
+    assert index.search("weather") == []
+    assert "city" not in index.postings
+
+
+@pytest.fixture
+def make_client(make_app, fake_session):
+    async def make_client(scopes=None):
+        index = ToolIndex()
+        servers = []
+        for name, tools, tags in (
+            ("weather", WEATHER_TOOLS, ("web",)),
+            ("files", FILE_TOOLS, ()),
+        ):
+            servers.append(
+                await make_app(
+                    fake_session(tools=tools),
+                    server_name=name,
+                    mount_path=f"/{name}",
+                    tags=tags,
+                    tool_index=index,
+                )
+            )
+        app = FastAPI()
+        add_tool_search_routes(app, servers, index, scopes)
+        return index, TestClient(app)
+
+    return make_client
+
+
+@pytest.mark.anyio
+async def test_search_endpoint(make_client):
+    _, client = await make_client(
+        scopes={"indexer": ToolScope.from_config({"servers": ["files"]})}
+    )
+    tools = client.get("/tools/search", params={"q": "forecast days"}).json()["tools"]
+    assert tools[0]["name"] == "get_forecast"
+    assert tools[0]["path"] == "/weather/get_forecast"
+    assert tools[0]["parameters"] == ["city", "days"]
+
+    tools = client.get("/tools/search", headers={"X-Client-ID": "indexer"}).json()[
+        "tools"
+    ]
+    assert {tool["server"] for tool in tools} == {"files"}
+    assert client.get("/tools/search", params={"limit": 0}).status_code == 422
+
+
+@pytest.mark.anyio
+async def test_api_key_scope_cannot_be_widened(make_client):
+    _, client = await make_client(
+        scopes={
+            "weather-key": ToolScope.from_config({"servers": ["weather"]}),
+            "web": ToolScope.from_config({"tags": ["web"]}),
+            "indexer": ToolScope.from_config({"servers": ["files"]}),
+        }
+    )
+
+    def servers(client_id=None, path="/tools/search"):
+        headers = {"Authorization": "Bearer weather-key"}
+        if client_id:
+            headers["X-Client-ID"] = client_id
+        response = client.get(path, headers=headers).json()
+        if "paths" in response:
+            return {path.split("/")[1] for path in response["paths"]}
+        return {tool["server"] for tool in response["tools"]}
+
+    assert servers() == {"weather"}
+    # Unknown or wider client IDs keep the API key's scope
+    assert servers("anyone") == servers("anyone", "/tools/openapi.json") == {"weather"}
+    assert servers("web") == {"weather"}
+    # Client IDs narrow it
+    assert servers("indexer") == servers("indexer", "/tools/openapi.json") == set()
+
+
+@pytest.mark.anyio
+async def test_openapi_slice(make_client):
+    index, client = await make_client()
+    document = client.get("/tools/openapi.json", params={"q": "weather"}).json()
+    assert set(document["paths"]) == {"/weather/get_weather", "/weather/get_forecast"}
+    operation = document["paths"]["/weather/get_weather"]["post"]
+    assert operation["tags"] == ["web"]
+    schemas = document["components"]["schemas"]
+    assert "get_weather_form_model" in schemas
+    assert "readFile_form_model" not in schemas
+
+    # Slices are cached per filter until the index changes
+    assert client.get("/tools/openapi.json", params={"tag": "web"}).json() == (
+        client.get("/tools/openapi.json", params={"tag": "web"}).json()
+    )
+    index.remove_server("weather")
+    document = client.get("/tools/openapi.json", params={"q": "weather"}).json()
+    assert document["paths"] == {}
+
+
+@pytest.mark.anyio
+async def test_openapi_slice_renames_conflicting_schemas(make_app, fake_session):
+    index = ToolIndex()
+    servers = [
+        await make_app(
+            fake_session(tools=[make_tool("search", "Search", *parameters)]),
+            server_name=name,
+            mount_path=f"/{name}",
+            tool_index=index,
+        )
+        for name, parameters in (("web", ("query",)), ("code", ("pattern",)))
+    ]
+    app = FastAPI()
+    add_tool_search_routes(app, servers, index)
+    document = TestClient(app).get("/tools/openapi.json").json()
+
+    schemas = document["components"]["schemas"]
+    assert "search_form_model" in schemas
+    assert "web__search_form_model" in schemas
+    body = document["paths"]["/web/search"]["post"]["requestBody"]
+    assert body["content"]["application/json"]["schema"]["$ref"].endswith(
+        "/web__search_form_model"
+    )
@@ -0,0 +1,89 @@
+import base64
+
+import httpx
+import pytest
+from mcp import types
+
+msgpack = pytest.importorskip("msgpack")
+cbor2 = pytest.importorskip("cbor2")
+
+PIXEL = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+IMAGE_RESULT = types.CallToolResult(
+    content=[
+        types.TextContent(type="text", text='{"ok": true}'),
+        types.ImageContent(
+            type="image", data=base64.b64encode(PIXEL).decode(), mimeType="image/png"
+        ),
+    ]
+)
+
+NUMBER_TOOL = types.Tool(
+    name="square",
+    inputSchema={
+        "type": "object",
+        "properties": {"x": {"type": "integer"}, "blob": {"type": "string"}},
+        "required": ["x"],
+    },
+)
+
+
+@pytest.fixture
+async def client(make_app, fake_session):
+    session = fake_session(result=IMAGE_RESULT, tools=[NUMBER_TOOL])
+    app = await make_app(session)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        client.session = session
+        yield client
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "media_type, encode, decode",
+    [
+        ("application/msgpack", msgpack.packb, msgpack.unpackb),
+        ("application/cbor", cbor2.dumps, cbor2.loads),
+    ],
+)
+async def test_binary_request_and_response(client, media_type, encode, decode):
+    response = await client.post(
+        "/square",
+        content=encode({"x": 3, "blob": PIXEL}),
+        headers={"Content-Type": media_type, "Accept": media_type},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    # Images are sent as bytes instead of a base64 data URI
+    assert decode(response.content) == [
+        {"ok": True},
+        {"mimeType": "image/png", "data": PIXEL},
+    ]
+    # Bytes arguments reach the tool as base64, like in a JSON request
+    _, arguments, _ = client.session.calls[0]
+    assert arguments == {"x": 3, "blob": base64.b64encode(PIXEL).decode()}
+
+
+@pytest.mark.anyio
+async def test_json_stays_the_default(client):
+    for accept in (None, "*/*", "application/json, application/msgpack;q=0.5"):
+        response = await client.post(
+            "/square", json={"x": 3}, headers={"Accept": accept} if accept else {}
+        )
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()[1].startswith("data:image/png;base64,")
+
+
+@pytest.mark.anyio
+async def test_binary_requests_are_validated(client):
+    headers = {"Content-Type": "application/msgpack"}
+    response = await client.post(
+        "/square", content=msgpack.packb({"x": "three"}), headers=headers
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "x"]
+
+    response = await client.post("/square", content=b"\xc1", headers=headers)
+    assert response.status_code == 400
+    assert not client.session.calls
@@ -0,0 +1,126 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+import mcpo.main
+from mcpo.main import lifespan
+from mcpo.utils.health import ServerStatus
+from mcpo.utils.sharing import SessionView, SharedSessions, get_launch_key
+from mcpo.utils.shutdown import run_server_lifespans
+
+TOOLS = [
+    types.Tool(name=name, inputSchema={"type": "object", "properties": {}})
+    for name in ("read", "write", "delete")
+]
+
+
+def make_server(name, command="server", allowed_tools=None, shared_sessions=None):
+    app = FastAPI(title=name, lifespan=lifespan)
+    app.state.server_name = name
+    app.state.command = command
+    app.state.args = ["--stdio"]
+    app.state.env = {"LOG_LEVEL": "info"}
+    app.state.status = ServerStatus()
+    app.state.allowed_tools = allowed_tools
+    app.state.shared_sessions = shared_sessions
+    return app
+
+
+@pytest.fixture
+def connections(monkeypatch, fake_session):
+    """Sessions opened by `connect_server`, with their message handlers."""
+    connections = []
+
+    class CountingSession(fake_session):
+        initialized = 0
+
+        async def initialize(self):
+            self.initialized += 1
+            return await super().initialize()
+
+    @asynccontextmanager
+    async def connect_server(app, message_handler=None):
+        connection = [CountingSession(tools=TOOLS), message_handler, "open"]
+        connections.append(connection)
+        try:
+            yield connection[0], 1234
+        finally:
+            connection[2] = "closed"
+
+    monkeypatch.setattr(mcpo.main, "connect_server", connect_server)
+    return connections
+
+
+def test_launch_key():
+    assert get_launch_key(make_server("a")) == get_launch_key(make_server("b"))
+    assert get_launch_key(make_server("a")) != get_launch_key(
+        make_server("b", command="other")
+    )
+    app = make_server("c")
+    app.state.server_type = "sse"
+    assert get_launch_key(app) is None
+
+
+@pytest.mark.anyio
+async def test_session_view_allowlist(fake_session):
+    view = SessionView(fake_session(tools=TOOLS), allowed_tools=["read"])
+    assert [tool.name for tool in (await view.list_tools()).tools] == ["read"]
+    await view.call_tool("read", {})
+    with pytest.raises(McpError) as exc_info:
+        await view.call_tool("delete", {})
+    assert exc_info.value.error.code == types.INVALID_PARAMS
+    assert view.session.calls == [("read", {}, {})]
+
+
+@pytest.mark.anyio
+async def test_identical_servers_share_a_session(connections):
+    shared_sessions = SharedSessions()
+    readers = make_server(
+        "readers", allowed_tools=["read"], shared_sessions=shared_sessions
+    )
+    writers = make_server(
+        "writers", allowed_tools=["read", "write"], shared_sessions=shared_sessions
+    )
+    other = make_server("other", command="other", shared_sessions=shared_sessions)
+    listened = []
+    for app in (readers, writers):
+
+        async def listener(notification, name=app.title):
+            listened.append(name)
+
+        app.state.notification_listeners = [listener]
+
+    async with run_server_lifespans([readers, writers, other]):
+        assert len(connections) == 2
+        session, message_handler, _ = connections[0]
+        assert session.initialized == 1
+        assert readers.state.session.session is writers.state.session.session
+        assert readers.state.status.pid == writers.state.status.pid == 1234
+
+        assert [tool.name for tool in readers.state.tools] == ["read"]
+        assert [tool.name for tool in writers.state.tools] == ["read", "write"]
+        assert TestClient(readers).post("/write", json={}).status_code == 404
+        assert TestClient(writers).post("/write", json={}).status_code == 200
+
+        await message_handler(
+            types.ServerNotification(types.ToolListChangedNotification())
+        )
+        assert sorted(listened) == ["readers", "writers"]
+    assert [state for _, _, state in connections] == ["closed", "closed"]
+
+
+@pytest.mark.anyio
+async def test_shared_session_stays_open_until_released(connections):
+    shared_sessions = SharedSessions()
+    apps = [make_server(name, shared_sessions=shared_sessions) for name in "ab"]
+    async with lifespan(apps[0]):
+        async with lifespan(apps[1]):
+            pass
+        assert connections[0][2] == "open"
+        assert shared_sessions.servers
+    assert connections[0][2] == "closed"
+    assert not shared_sessions.servers
@@ -0,0 +1,182 @@
+import asyncio
+import socket
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from mcpo.utils.health import ServerStatus, add_health_routes
+from mcpo.utils.shutdown import (
+    DrainMiddleware,
+    DrainState,
+    DrainingServer,
+    create_listening_socket,
+    run_server_lifespans,
+)
+
+
+def make_server(name, required=True):
+    app = FastAPI(title=name)
+    app.state.server_name = name
+    app.state.status = ServerStatus(required=required)
+    return app
+
+
+@pytest.mark.anyio
+async def test_wait_idle():
+    server = make_server("time")
+    server.state.status.call_started()
+    drain = DrainState(timeout=1)
+    drain.start()
+
+    async def finish():
+        await asyncio.sleep(0.1)
+        server.state.status.call_finished(success=True)
+
+    finishing = asyncio.create_task(finish())
+    assert await drain.wait_idle([server]) is True
+    await finishing
+
+    server.state.status.call_started()
+    drain = DrainState(timeout=0.1)
+    drain.start()
+    assert await drain.wait_idle([server]) is False
+    assert drain.remaining() == 0
+
+
+def test_draining_rejects_requests():
+    server = make_server("time")
+    server.state.status.set_ready()
+    app = FastAPI()
+    drain = app.state.drain = DrainState(timeout=30)
+    add_health_routes(app, [server])
+    app.add_middleware(DrainMiddleware, drain=drain)
+
+    @app.get("/echo")
+    async def echo():
+        return {"ok": True}
+
+    @app.websocket("/ws")
+    async def ws(websocket):
+        await websocket.accept()
+
+    client = TestClient(app)
+    assert client.get("/echo").status_code == 200
+    assert client.get("/readyz").status_code == 200
+
+    drain.start()
+    response = client.get("/echo")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "draining"
+    assert client.get("/healthz").status_code == 200
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/ws") as websocket:
+            websocket.receive_text()
+    assert exc_info.value.code == 1012
+
+
+def make_lifespan_app(name, events, required=True, fail=False, delay=0):
+    @asynccontextmanager
+    async def lifespan(app):
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("boom")
+        events.append(f"start {name}")
+        yield
+        await asyncio.sleep(0.1)
+        events.append(f"stop {name}")
+
+    app = make_server(name, required)
+    app.router.lifespan_context = lifespan
+    return app
+
+
+@pytest.mark.anyio
+async def test_server_lifespans_start_concurrently():
+    events = []
+    apps = [make_lifespan_app(name, events, delay=0.1) for name in ("a", "b", "c")]
+    started = time.monotonic()
+    async with run_server_lifespans(apps):
+        assert time.monotonic() - started < 0.25
+        assert sorted(events) == ["start a", "start b", "start c"]
+
+
+@pytest.mark.anyio
+async def test_server_lifespans_stop_in_parallel():
+    events = []
+    apps = [make_lifespan_app(name, events) for name in ("a", "b", "c")]
+    apps.append(make_lifespan_app("d", events, required=False, fail=True))
+    async with run_server_lifespans(apps):
+        assert events == ["start a", "start b", "start c"]
+        assert apps[3].state.status.state == "failed"
+        started = time.monotonic()
+    assert time.monotonic() - started < 0.25
+    assert sorted(events[3:]) == ["stop a", "stop b", "stop c"]
+
+    events.clear()
+    apps = [make_lifespan_app("a", events), make_lifespan_app("b", events, fail=True)]
+    with pytest.raises(RuntimeError):
+        async with run_server_lifespans(apps):
+            pass
+    # Servers that started are still shut down
+    assert events == ["start a", "stop a"]
+
+
+def test_listening_socket():
+    sock = create_listening_socket("127.0.0.1", 0, reuse_port=True)
+    try:
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT)
+        port = sock.getsockname()[1]
+        # A second process can bind the same port while the first still listens
+        sock.listen()
+        other = create_listening_socket("127.0.0.1", port, reuse_port=True)
+        other.close()
+
+        inherited = create_listening_socket("127.0.0.1", 0, fd=sock.detach())
+        assert inherited.getsockname()[1] == port
+        inherited.close()
+    finally:
+        sock.close()
+
+
+@pytest.mark.anyio
+async def test_shutdown_waits_for_tool_calls(make_app, fake_session):
+    release = asyncio.Event()
+    server = await make_app(fake_session(wait=release), status=ServerStatus())
+    server.state.server_name = "echo"
+    sock = create_listening_socket("127.0.0.1", 0)
+    port = sock.getsockname()[1]
+
+    drain = DrainState(timeout=5)
+    config = uvicorn.Config(server, lifespan="off", log_level="warning")
+    uvicorn_server = DrainingServer(config, drain, [server])
+    serving = asyncio.create_task(uvicorn_server.serve(sockets=[sock]))
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        call = asyncio.create_task(client.post("/echo", json={"text": "hi"}))
+        while server.state.status.in_flight == 0:
+            await asyncio.sleep(0.01)
+
+        uvicorn_server.should_exit = True
+        await asyncio.sleep(0.3)
+        # Listening stopped, but the running call is not cut off
+        assert drain.draining
+        assert not call.done()
+        with pytest.raises(httpx.ConnectError):
+            async with httpx.AsyncClient() as other:
+                await other.post(f"http://127.0.0.1:{port}/echo", json={})
+
+        release.set()
+        response = await call
+    assert response.status_code == 200
+    await asyncio.wait_for(serving, 5)
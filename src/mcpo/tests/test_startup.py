@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from mcpo.utils.startup import StartupReport, measure
+
+
+@pytest.mark.anyio
+async def test_server_phases_are_measured(make_app, fake_session):
+    report = StartupReport()
+    with measure(report, "imports"):
+        pass
+    await make_app(fake_session(), server_name="time", startup_report=report)
+
+    assert set(report.phases) == {"imports"}
+    assert set(report.servers["time"]) == {"initialize", "list_tools", "models"}
+
+    report.ready = 1.5
+    lines = report.format().splitlines()
+    assert lines[0] == "Startup report, ready after 1.500s:"
+    assert lines[1].split()[0] == "imports"
+    assert lines[2].split() == [
+        "server",
+        "spawn",
+        "initialize",
+        "list_tools",
+        "models",
+        "total",
+    ]
+    row = lines[3].split()
+    assert row[:2] == ["time", "-"]
+    assert float(row[-1][:-1]) == pytest.approx(
+        sum(report.servers["time"].values()), abs=0.001
+    )
+
+
+@pytest.mark.anyio
+async def test_logged_once_started(caplog):
+    report = StartupReport()
+    server = SimpleNamespace(started=False, should_exit=False)
+    with caplog.at_level(logging.INFO, logger="mcpo.utils.startup"):
+        logging_task = asyncio.create_task(report.log_when_started(server))
+        await asyncio.sleep(0.05)
+        assert report.ready is None
+        server.started = True
+        await logging_task
+    assert report.ready > 0
+    assert "Startup report" in caplog.text
+
+    # Nothing is logged when startup fails
+    report = StartupReport()
+    await report.log_when_started(SimpleNamespace(started=False, should_exit=True))
+    assert report.ready is None
+
+
+def test_measure_without_report():
+    with measure(None, "imports"):
+        pass
@@ -0,0 +1,146 @@
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from mcpo.utils.tracing import (
+    _propagate_meta_to_headers,
+    configure_tracing,
+    get_trace_meta,
+)
+
+sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    configure_tracing(True, tracer_provider=provider)
+    yield exporter
+    configure_tracing(False)
+
+
+@pytest.fixture
+def make_client(make_app):
+    async def make_client(session):
+        return TestClient(await make_app(session, server_name="fake_server"))
+
+    return make_client
+
+
+@pytest.mark.anyio
+async def test_tool_call_spans(exporter, make_client, fake_session):
+    session = fake_session(
+        result=types.CallToolResult(
+            content=[types.TextContent(type="text", text='{"text": "hi"}')]
+        )
+    )
+    client = await make_client(session)
+
+    response = client.post("/echo", json={"text": "hi"})
+    assert response.status_code == 200
+    assert response.json() == {"text": "hi"}
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {
+        "POST /echo",
+        "mcpo.validate",
+        "mcp.call_tool",
+        "mcpo.process_response",
+    }
+
+    request_span = spans["POST /echo"]
+    assert request_span.attributes["mcpo.server.name"] == "fake_server"
+    assert request_span.attributes["mcp.tool.name"] == "echo"
+    assert request_span.attributes["mcpo.request.size"] > 0
+    assert request_span.attributes["mcpo.response.size"] > 0
+    for name in ("mcpo.validate", "mcp.call_tool", "mcpo.process_response"):
+        assert spans[name].parent.span_id == request_span.context.span_id
+
+    # Trace context is forwarded to the MCP server through `_meta`
+    _, _, kwargs = session.calls[0]
+    meta = kwargs["meta"]
+    trace_id = format(request_span.context.trace_id, "032x")
+    assert trace_id in meta["traceparent"]
+
+
+@pytest.mark.anyio
+async def test_incoming_trace_context_is_continued(exporter, make_client, fake_session):
+    session = fake_session(result=types.CallToolResult(content=[]))
+    client = await make_client(session)
+
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    client.post("/echo", json={"text": "hi"}, headers={"traceparent": traceparent})
+
+    request_span = next(
+        span for span in exporter.get_finished_spans() if span.name == "POST /echo"
+    )
+    assert (
+        format(request_span.context.trace_id, "032x")
+        == "0af7651916cd43dd8448eb211c80319c"
+    )
+
+
+@pytest.mark.anyio
+async def test_mcp_error_code_recorded(exporter, make_client, fake_session):
+    session = fake_session(
+        error=McpError(
+            types.ErrorData(code=types.INVALID_PARAMS, message="bad arguments")
+        )
+    )
+    client = await make_client(session)
+
+    response = client.post("/echo", json={"text": "hi"})
+    assert response.status_code == 422
+
+    request_span = next(
+        span for span in exporter.get_finished_spans() if span.name == "POST /echo"
+    )
+    assert request_span.attributes["mcp.error.code"] == types.INVALID_PARAMS
+
+
+@pytest.mark.anyio
+async def test_validation_failure_ends_validation_span(
+    exporter, make_client, fake_session
+):
+    client = await make_client(fake_session())
+
+    response = client.post("/echo", json={"text": ["not", "a", "string"]})
+    assert response.status_code == 422
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert not spans["mcpo.validate"].status.is_ok
+
+
+@pytest.mark.anyio
+async def test_trace_meta_propagated_to_http_headers(exporter):
+    with sdk_trace.TracerProvider().get_tracer("test").start_as_current_span("x"):
+        meta = get_trace_meta()
+
+    request = httpx.Request(
+        "POST",
+        "http://backend/mcp",
+        content=json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "tools/call",
+                "params": {"name": "echo", "_meta": meta},
+            }
+        ),
+    )
+    await _propagate_meta_to_headers(request)
+    assert request.headers["traceparent"] == meta["traceparent"]
+
+
+def test_tracing_disabled_by_default():
+    assert get_trace_meta() is None
@@ -0,0 +1,92 @@
+import httpx
+import pytest
+
+from mcpo.utils.transport import (
+    TransportPool,
+    TransportSettings,
+    get_http_client_factory,
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def test_transport_settings_from_config():
+    settings = TransportSettings.from_config(
+        {
+            "maxConnections": 10,
+            "maxKeepaliveConnections": 5,
+            "keepaliveExpiry": 60,
+            "http2": True,
+            "connectTimeout": 2,
+            "readTimeout": 15,
+        }
+    )
+    assert settings.get_limits() == httpx.Limits(
+        max_connections=10, max_keepalive_connections=5, keepalive_expiry=60
+    )
+    assert settings.http2 is True
+
+    timeout = settings.get_timeout(httpx.Timeout(5, read=None))
+    assert timeout.connect == 2
+    assert timeout.read == 15
+    assert timeout.write == 5
+
+
+def test_transport_settings_keep_transport_timeouts_by_default():
+    timeout = TransportSettings.from_config(None).get_timeout(
+        httpx.Timeout(5, read=None)
+    )
+    assert timeout == httpx.Timeout(5, read=None)
+
+
+@pytest.mark.anyio
+async def test_transport_shared_per_origin():
+    pool = TransportPool()
+    settings = TransportSettings()
+
+    first = pool.acquire("https://example.com/a/mcp/", settings)
+    second = pool.acquire("https://example.com/b/sse", settings)
+    other = pool.acquire("https://other.example.com/mcp/", settings)
+
+    assert first._transport is second._transport
+    assert first._transport is not other._transport
+    assert len(pool) == 2
+
+    await first.aclose()
+    await first.aclose()  # closing twice releases a single reference
+    assert len(pool) == 2
+
+    await second.aclose()
+    await other.aclose()
+    assert len(pool) == 0
+
+
+@pytest.mark.anyio
+async def test_unshared_transport_settings():
+    pool = TransportPool()
+    settings = TransportSettings(shared=False)
+
+    first = pool.acquire("https://example.com/a/mcp/", settings)
+    second = pool.acquire("https://example.com/b/mcp/", settings)
+    assert first._transport is not second._transport
+
+    await first.aclose()
+    await second.aclose()
+    assert len(pool) == 0
+
+
+@pytest.mark.anyio
+async def test_http_client_factory_releases_transport():
+    pool = TransportPool()
+    factory = get_http_client_factory(
+        "http://127.0.0.1:8001/sse", TransportSettings(read_timeout=10), pool
+    )
+
+    async with factory(headers={"X-Test": "1"}) as client:
+        assert client.headers["X-Test"] == "1"
+        assert client.timeout.read == 10
+        assert len(pool) == 1
+    assert len(pool) == 0
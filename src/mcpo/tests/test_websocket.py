@@ -0,0 +1,209 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mcp import types
+from starlette.websockets import WebSocketDisconnect
+
+from mcpo.utils.auth import get_verify_api_key
+from mcpo.utils.websocket import (
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    SERVER_ERROR,
+    WS_POLICY_VIOLATION,
+    ToolCallSocket,
+    add_main_websocket_route,
+    add_server_websocket_route,
+)
+
+SLEEP_TOOL = types.Tool(
+    name="sleep",
+    description="Sleep, then echo the text",
+    inputSchema={
+        "type": "object",
+        "properties": {"text": {"type": "string"}, "delay": {"type": "number"}},
+        "required": ["text"],
+    },
+)
+
+
+def tool_call(request_id, text, delay=0, **params):
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {
+            "name": "sleep",
+            "arguments": {"text": text, "delay": delay},
+            **params,
+        },
+    }
+
+
+@pytest.fixture
+def make_server(make_app, fake_session):
+    class SleepSession(fake_session):
+        async def call_tool(self, name, arguments=None, **kwargs):
+            # Echo the text after `delay`, so calls finish out of order
+            self.result = types.CallToolResult(
+                content=[types.TextContent(type="text", text=arguments["text"])]
+            )
+            result = await super().call_tool(name, arguments, **kwargs)
+            await asyncio.sleep(arguments.get("delay", 0))
+            return result
+
+    async def make_server(name="sleepy", api_dependency=None):
+        server = await make_app(SleepSession(tools=[SLEEP_TOOL]), server_name=name)
+        add_server_websocket_route(server, api_dependency=api_dependency)
+        return server
+
+    return make_server
+
+
+@pytest.mark.anyio
+async def test_responses_arrive_as_calls_finish(make_server):
+    client = TestClient(await make_server())
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json(tool_call(1, "slow", delay=0.2))
+        ws.send_json(tool_call(2, "fast"))
+        first, second = ws.receive_json(), ws.receive_json()
+    assert (first["id"], first["result"]) == (2, "fast")
+    assert (second["id"], second["result"]) == (1, "slow")
+
+
+@pytest.mark.anyio
+async def test_errors(make_server):
+    client = TestClient(await make_server())
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["error"]["code"] == PARSE_ERROR
+
+        ws.send_json({"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {}})
+        assert ws.receive_json()["error"]["code"] == METHOD_NOT_FOUND
+
+        call = tool_call(2, "x")
+        call["params"]["arguments"] = {"delay": 1}
+        ws.send_json(call)
+        error = ws.receive_json()["error"]
+        assert error["code"] == INVALID_PARAMS
+        assert error["data"][0]["loc"] == ["text"]
+
+
+@pytest.mark.anyio
+async def test_progress_notifications(make_server):
+    client = TestClient(await make_server())
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json(tool_call(1, "done", progress=True))
+        progress = ws.receive_json()
+        assert progress["method"] == "notifications/progress"
+        assert progress["params"] == {
+            "requestId": 1,
+            "progress": 1,
+            "total": 2,
+            "message": "halfway",
+        }
+        assert ws.receive_json()["result"] == "done"
+
+
+@pytest.mark.anyio
+async def test_cancel_call(make_server):
+    client = TestClient(await make_server())
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json(tool_call("slow", "x", delay=10))
+        ws.send_json(
+            {
+                "jsonrpc": "2.0",
+                "method": "notifications/cancelled",
+                "params": {"requestId": "slow"},
+            }
+        )
+        response = ws.receive_json()
+    assert response["id"] == "slow"
+    assert response["error"]["message"] == "Cancelled"
+
+
+@pytest.mark.anyio
+async def test_calls_over_the_limit_are_rejected():
+    release = asyncio.Event()
+
+    class Caller:
+        def validate(self, arguments):
+            return arguments
+
+        async def call(self, websocket, args, progress_callback=None):
+            await release.wait()
+            return args["text"]
+
+    class FakeWebSocket:
+        sent = []
+
+        async def send_json(self, message):
+            self.sent.append(message)
+
+    websocket = FakeWebSocket()
+    socket = ToolCallSocket(
+        websocket, lambda server: {"sleep": Caller()}, max_in_flight=1
+    )
+    await socket.handle(json.dumps(tool_call(1, "first")))
+    await asyncio.sleep(0)
+    # Reading goes on while the call runs, so it can be cancelled
+    await socket.handle(json.dumps(tool_call(2, "second")))
+    error = websocket.sent.pop()
+    assert (error["id"], error["error"]["code"]) == (2, SERVER_ERROR)
+    assert error["error"]["data"]["status"] == 429
+
+    await socket.handle(
+        json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "method": "notifications/cancelled",
+                "params": {"requestId": 1},
+            }
+        )
+    )
+    await asyncio.gather(*socket.calls.values(), return_exceptions=True)
+    assert websocket.sent.pop()["error"]["message"] == "Cancelled"
+
+    release.set()
+    await socket.handle(json.dumps(tool_call(3, "third")))
+    await asyncio.gather(*socket.calls.values())
+    assert websocket.sent.pop() == {"jsonrpc": "2.0", "id": 3, "result": "third"}
+
+
+@pytest.mark.anyio
+async def test_authentication(make_server):
+    client = TestClient(await make_server(api_dependency=get_verify_api_key("secret")))
+    with client.websocket_connect(
+        "/ws", headers={"Authorization": "Bearer secret"}
+    ) as ws:
+        ws.send_json(tool_call(1, "ok"))
+        assert ws.receive_json()["result"] == "ok"
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"id": 0, "method": "authenticate", "params": {"token": "secret"}})
+        assert ws.receive_json()["result"] == {"authenticated": True}
+        ws.send_json(tool_call(1, "ok"))
+        assert ws.receive_json()["result"] == "ok"
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"id": 0, "method": "authenticate", "params": {"token": "no"}})
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_json()
+    assert exc_info.value.code == WS_POLICY_VIOLATION
+
+
+@pytest.mark.anyio
+async def test_main_endpoint_routes_by_server(make_server):
+    servers = [await make_server("a"), await make_server("b")]
+    app = FastAPI()
+    add_main_websocket_route(app, servers)
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json(tool_call(1, "hi", server="b"))
+        assert ws.receive_json()["result"] == "hi"
+        ws.send_json(tool_call(2, "hi", server="c"))
+        assert ws.receive_json()["error"]["code"] == METHOD_NOT_FOUND
+    assert len(servers[1].state.session.calls) == 1
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from mcp import ClientSession
+
+from mcpo.utils.retry import is_transport_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AFFINITY_HEADER = "X-Session-ID"
+
+
+@dataclass(frozen=True)
+class AffinitySettings:
+    """Settings of the dedicated backend sessions of a server."""
+
+    enabled: bool = False
+    header: str = DEFAULT_AFFINITY_HEADER
+    max_sessions: int = 16
+    idle_ttl: float = 300.0
+    max_concurrent: int = 1
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "AffinitySettings" = None
+    ) -> "AffinitySettings":
+        """Apply an `affinity` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", bool(config) or defaults.enabled)),
+            header=config.get("header", defaults.header),
+            max_sessions=config.get("maxSessions", defaults.max_sessions),
+            idle_ttl=config.get("idleTtl", defaults.idle_ttl),
+            max_concurrent=config.get("maxConcurrent", defaults.max_concurrent),
+        )
+
+
+class AffinitySession:
+    """
+    A backend session dedicated to one affinity key.
+
+    The session is opened and closed by its own task, since the MCP client
+    contexts must be exited by the task that entered them. It is opened by
+    `open_session(entry)`, which may run it under a ProcessSupervisor with
+    the entry as its status.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        open_session: Callable[
+            ["AffinitySession"], AsyncContextManager[Tuple[ClientSession, Any]]
+        ],
+        max_concurrent: int,
+    ):
+        self.key = key
+        self.session: Optional[ClientSession] = None
+        self.pid: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        # The ProcessSupervisor of the session, if it has process limits
+        self.process = None
+        self.last_used = time.monotonic()
+        self.in_flight = 0
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.ready = asyncio.Event()
+        self.closing = asyncio.Event()
+        self.task = asyncio.create_task(self.run(open_session))
+
+    @property
+    def closed(self) -> bool:
+        return self.task.done()
+
+    async def run(self, open_session):
+        try:
+            async with open_session(self) as (session, pid):
+                await session.initialize()
+                self.session, self.pid = session, pid
+                self.ready.set()
+                await self.closing.wait()
+        except Exception as e:
+            logger.error(f"Affinity session '{self.key}' failed: {e}")
+            self.error = e
+        finally:
+            self.session = None
+            self.ready.set()
+
+    def set_ready(self, pid: Optional[int] = None):
+        """Called by the supervisor once it restarted the server."""
+        self.pid = pid
+
+    def set_failed(self, error: BaseException):
+        """Called by the supervisor when the server exited for good."""
+        logger.error(f"Affinity session '{self.key}' failed: {error}")
+        self.error = error
+        self.closing.set()
+
+    async def wait_ready(self) -> ClientSession:
+        await self.ready.wait()
+        if self.session is None:
+            raise HTTPException(
+                status_code=502,
+                detail={
+                    "message": "Failed to start a dedicated MCP session",
+                    "error": str(self.error),
+                },
+            )
+        return self.session
+
+    async def close(self):
+        self.closing.set()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+def caused_by_transport_error(error: Optional[BaseException]) -> bool:
+    """Whether `error`, or an error it was raised from or while handling, is a transport error."""
+    while error is not None:
+        if is_transport_error(error):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class AffinityPool:
+    """
+    Dedicated backend sessions keyed by a client-supplied header.
+
+    Sessions are opened on first use, closed after `idle_ttl` seconds without
+    calls, and the least recently used idle session is closed to make room
+    once `max_sessions` are open. Each session runs at most `max_concurrent`
+    calls at once.
+    """
+
+    def __init__(
+        self,
+        settings: AffinitySettings,
+        open_session: Callable[
+            [AffinitySession], AsyncContextManager[Tuple[ClientSession, Any]]
+        ],
+    ):
+        self.settings = settings
+        self.open_session = open_session
+        self.sessions: "OrderedDict[str, AffinitySession]" = OrderedDict()
+        self.sweeper: Optional[asyncio.Task] = None
+
+    def get_key(self, request: Request) -> Optional[str]:
+        return request.headers.get(self.settings.header) or None
+
+    def start(self):
+        """Start closing idle sessions in the background."""
+        self.sweeper = asyncio.create_task(self.sweep())
+
+    async def sweep(self):
+        interval = max(1.0, min(self.settings.idle_ttl / 2, 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self.close_idle()
+
+    async def close_idle(self):
+        await asyncio.gather(*(entry.close() for entry in self.pop_idle()))
+
+    def pop_idle(self) -> List[AffinitySession]:
+        """Forget closed sessions and those idle for `idle_ttl`, returning them."""
+        now = time.monotonic()
+        expired = [
+            entry
+            for entry in self.sessions.values()
+            if entry.closed
+            or (entry.in_flight == 0 and now - entry.last_used > self.settings.idle_ttl)
+        ]
+        for entry in expired:
+            del self.sessions[entry.key]
+        return expired
+
+    async def remove(self, entry: AffinitySession):
+        if self.sessions.get(entry.key) is entry:
+            del self.sessions[entry.key]
+        await entry.close()
+
+    async def get_entry(self, key: str) -> AffinitySession:
+        """
+        Return the session of `key`, with one more call in flight so it is
+        not evicted, opening it if needed.
+        """
+        entry = self.sessions.get(key)
+        if entry is not None and not entry.closed:
+            self.sessions.move_to_end(key)
+            entry.in_flight += 1
+            return entry
+
+        # Checking capacity and reserving the slot do not await, so concurrent
+        # requests cannot both take the last slot
+        evicted = self.pop_idle()
+        if len(self.sessions) >= self.settings.max_sessions:
+            lru = next(
+                (old for old in self.sessions.values() if old.in_flight == 0),
+                None,
+            )
+            if lru is None:
+                await asyncio.gather(*(old.close() for old in evicted))
+                raise HTTPException(
+                    status_code=503,
+                    detail={"message": "Too many active affinity sessions"},
+                )
+            del self.sessions[lru.key]
+            evicted.append(lru)
+        entry = AffinitySession(key, self.open_session, self.settings.max_concurrent)
+        entry.in_flight += 1
+        self.sessions[key] = entry
+
+        await asyncio.gather(*(old.close() for old in evicted))
+        return entry
+
+    @asynccontextmanager
+    async def session(self, key: str):
+        """
+        Lease the dedicated session of `key`, opening it if needed. A session
+        whose call fails with a transport error is closed, so the next call
+        with the key opens a new one.
+        """
+        entry = await self.get_entry(key)
+        try:
+            session = await entry.wait_ready()
+            async with entry.semaphore:
+                yield session
+        except Exception as e:
+            if caused_by_transport_error(e):
+                logger.warning(f"Affinity session '{key}' failed: {e}")
+                await self.remove(entry)
+            raise
+        finally:
+            entry.in_flight -= 1
+            entry.last_used = time.monotonic()
+
+    async def close(self):
+        if self.sweeper:
+            self.sweeper.cancel()
+        entries = list(self.sessions.values())
+        self.sessions.clear()
+        await asyncio.gather(*(entry.close() for entry in entries))
+
+    def to_dict(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.settings.max_sessions,
+            "pids": [entry.pid for entry in self.sessions.values() if entry.pid],
+            "processes": {
+                entry.key: entry.process.to_dict()
+                for entry in self.sessions.values()
+                if entry.process
+            },
+        }
@@ -1,14 +1,10 @@
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from fastapi import Depends, Header, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 import base64
 
-from passlib.context import CryptContext
-from datetime import UTC, datetime, timedelta
-
-import jwt
-from typing import Optional, Union, List, Dict
+from typing import Optional
 
 
 ALGORITHM = "HS256"
@@ -36,19 +32,65 @@ def get_verify_api_key(api_key: str):
     return verify_api_key
 
 
+def get_admin_router(api_dependency=None) -> APIRouter:
+    """
+    Router for mcpo's own endpoints (status, jobs, resources, ...), behind the
+    API key dependency if one is given.
+
+    The routes are left out of the OpenAPI schema: clients turn every operation
+    in it into a tool, and these endpoints are for operators, not models.
+    """
+    return APIRouter(
+        include_in_schema=False,
+        dependencies=[Depends(api_dependency)] if api_dependency else [],
+    )
+
+
+def get_bearer_token(request: Request) -> Optional[str]:
+    """Return the bearer token (API key) of a request, if it has one."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if credentials and scheme.lower() == "bearer":
+        return credentials
+    return None
+
+
+async def check_bearer_token(api_dependency, token: Optional[str]) -> Optional[HTTPException]:
+    """
+    Run an API key dependency outside of a route, such as for WebSocket or MCP
+    connections, returning the error it raised if any.
+    """
+    try:
+        await api_dependency(
+            authorization=(
+                HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+                if token
+                else None
+            )
+        )
+    except HTTPException as e:
+        return e
+    return None
+
+
 class APIKeyMiddleware(BaseHTTPMiddleware):
     """
     Middleware that enforces Basic or Bearer token authentication for all requests.
     """
-    def __init__(self, app, api_key: str):
+    def __init__(self, app, api_key: str, exempt_paths=()):
         super().__init__(app)
         self.api_key = api_key
+        self.exempt_paths = exempt_paths
 
     async def dispatch(self, request: Request, call_next):
         # Skip authentication for OPTIONS requests
         if request.method == "OPTIONS":
             return await call_next(request)
 
+        # Skip authentication for health checks
+        if request.url.path in self.exempt_paths:
+            return await call_next(request)
+
         # Get authorization header
         authorization = request.headers.get("Authorization")
 
@@ -105,6 +147,9 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
             )
 
 
+# The JWT helpers are disabled, so jwt and datetime are not imported (it slows down
+# startup). Import them in the helpers if they are enabled again.
+#
 # def create_token(data: dict, expires_delta: Union[timedelta, None] = None) -> str:
 #     payload = data.copy()
 
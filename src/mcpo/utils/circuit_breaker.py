@@ -0,0 +1,216 @@
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+
+@dataclass(frozen=True)
+class CircuitBreakerSettings:
+    """
+    Thresholds of a circuit breaker.
+
+    The breaker opens once at least `minimum_calls` of the last `window_size`
+    calls have completed and either the share of failed calls reaches
+    `error_rate_threshold` or the share of calls slower than
+    `slow_call_threshold` seconds reaches `slow_call_rate_threshold`.
+    """
+
+    enabled: bool = False
+    window_size: int = 20
+    minimum_calls: int = 10
+    error_rate_threshold: float = 0.5
+    slow_call_threshold: Optional[float] = None
+    slow_call_rate_threshold: float = 0.5
+    open_duration: float = 30.0
+    half_open_probes: int = 1
+    per_tool: bool = False
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "CircuitBreakerSettings" = None
+    ) -> "CircuitBreakerSettings":
+        """Apply a `circuitBreaker` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", bool(config) or defaults.enabled)),
+            window_size=config.get("windowSize", defaults.window_size),
+            minimum_calls=config.get("minimumCalls", defaults.minimum_calls),
+            error_rate_threshold=config.get(
+                "errorRateThreshold", defaults.error_rate_threshold
+            ),
+            slow_call_threshold=config.get(
+                "slowCallThreshold", defaults.slow_call_threshold
+            ),
+            slow_call_rate_threshold=config.get(
+                "slowCallRateThreshold", defaults.slow_call_rate_threshold
+            ),
+            open_duration=config.get("openDuration", defaults.open_duration),
+            half_open_probes=config.get("halfOpenProbes", defaults.half_open_probes),
+            per_tool=config.get("perTool", defaults.per_tool),
+        )
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for calls to one MCP server or tool.
+
+    While open, calls are rejected with 503. After `open_duration` the breaker
+    lets `half_open_probes` calls through; it closes once they all succeed and
+    opens again as soon as one fails or is slow.
+    """
+
+    def __init__(self, settings: CircuitBreakerSettings, clock=time.monotonic):
+        self.settings = settings
+        self.clock = clock
+        self.state = "closed"
+        self.outcomes = deque(maxlen=settings.window_size)
+        self.opened_at: Optional[float] = None
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def get_state(self) -> str:
+        if self.state == "open":
+            if self.clock() - self.opened_at >= self.settings.open_duration:
+                return "half_open"
+        return self.state
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or raise 503, returning whether the call is a half-open probe.
+
+        Every admitted call must be followed by `record`.
+        """
+        state = self.get_state()
+        if state == "half_open" and self.state == "open":
+            self.state = "half_open"
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+
+        if state == "closed":
+            return False
+        if state == "half_open" and self.probes_in_flight < (
+            self.settings.half_open_probes
+        ):
+            self.probes_in_flight += 1
+            return True
+
+        self.rejected += 1
+        retry_after = 1
+        if state == "open":
+            remaining = self.settings.open_duration - (self.clock() - self.opened_at)
+            retry_after = max(1, math.ceil(remaining))
+        raise HTTPException(
+            status_code=503,
+            detail={"message": "Circuit breaker is open, the MCP server is failing"},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def record(self, probe: bool, failed: Optional[bool], duration: float = 0.0):
+        """Record the outcome of an admitted call; `failed=None` if it never ran."""
+        if probe:
+            self.probes_in_flight -= 1
+        if failed is None:
+            return
+
+        threshold = self.settings.slow_call_threshold
+        slow = threshold is not None and duration >= threshold
+
+        if self.state == "half_open":
+            if failed or slow:
+                self.trip()
+            elif probe:
+                self.probe_successes += 1
+                if self.probe_successes >= self.settings.half_open_probes:
+                    self.state = "closed"
+                    self.outcomes.clear()
+            return
+        if self.state == "open":
+            # Calls admitted before the breaker opened
+            return
+
+        self.outcomes.append((failed, slow))
+        if len(self.outcomes) < self.settings.minimum_calls:
+            return
+        error_rate, slow_rate = self.get_rates()
+        if error_rate >= self.settings.error_rate_threshold or (
+            threshold is not None
+            and slow_rate >= self.settings.slow_call_rate_threshold
+        ):
+            self.trip()
+
+    def trip(self):
+        self.state = "open"
+        self.opened_at = self.clock()
+        self.times_opened += 1
+        self.outcomes.clear()
+
+    def get_rates(self):
+        if not self.outcomes:
+            return 0.0, 0.0
+        calls = len(self.outcomes)
+        failures = sum(1 for failed, _ in self.outcomes if failed)
+        slow_calls = sum(1 for _, slow in self.outcomes if slow)
+        return failures / calls, slow_calls / calls
+
+    def to_dict(self) -> dict:
+        error_rate, slow_rate = self.get_rates()
+        return {
+            "state": self.get_state(),
+            "calls": len(self.outcomes),
+            "error_rate": error_rate,
+            "slow_call_rate": slow_rate,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+@dataclass
+class ServerCircuitBreakers:
+    """
+    Circuit breakers of a server. Tools share the server's breaker unless
+    `per_tool` is set or they have their own settings.
+    """
+
+    default: CircuitBreakerSettings = field(default_factory=CircuitBreakerSettings)
+    tools: Dict[str, CircuitBreakerSettings] = field(default_factory=dict)
+    breakers: Dict[Optional[str], CircuitBreaker] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: CircuitBreakerSettings = None
+    ) -> "ServerCircuitBreakers":
+        config = config or {}
+        default = CircuitBreakerSettings.from_config(config, defaults)
+        tools = {
+            tool_name: CircuitBreakerSettings.from_config(tool_config, default)
+            for tool_name, tool_config in (config.get("tools") or {}).items()
+        }
+        return cls(default=default, tools=tools)
+
+    def for_tool(self, tool_name: str) -> Optional[CircuitBreaker]:
+        settings = self.tools.get(tool_name, self.default)
+        if not settings.enabled:
+            return None
+        key = tool_name if settings.per_tool or tool_name in self.tools else None
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(settings)
+        return self.breakers[key]
+
+    def to_dict(self) -> dict:
+        return {
+            tool_name or "*": breaker.to_dict()
+            for tool_name, breaker in self.breakers.items()
+        }
+
+
+def get_circuit_breaker(app, tool_name: str) -> Optional[CircuitBreaker]:
+    breakers = getattr(app.state, "circuit_breakers", None)
+    if breakers is None:
+        return None
+    return breakers.for_tool(tool_name)
@@ -0,0 +1,388 @@
+import importlib.util
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# brotli and zstandard are optional dependencies, only imported once a request
+# or response is compressed with them
+brotli = None
+zstandard = None
+
+
+# Compressed request bodies are inflated in chunks of this size, and rejected
+# once they inflate past the middleware's limit, MAX_DECOMPRESSED_SIZE by default
+DECOMPRESSED_CHUNK_SIZE = 64 * 1024
+MAX_DECOMPRESSED_SIZE = 100 * 1024 * 1024
+
+# Media types that are already compressed and not worth compressing again
+INCOMPRESSIBLE_MEDIA_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/x-brotli",
+    "application/octet-stream",
+    "text/event-stream",
+)
+
+
+def _import_brotli():
+    global brotli
+
+    if brotli is None:
+        import brotli
+    return brotli
+
+
+def _import_zstandard():
+    global zstandard
+
+    if zstandard is None:
+        import zstandard
+    return zstandard
+
+
+class GzipCodec:
+    def __init__(self, level: Optional[int] = None):
+        self.level = 6 if level is None else max(1, min(level, 9))
+
+    def compressor(self):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush,
+        )
+
+    def decompressor(self):
+        return GzipInflater()
+
+
+class BrotliCodec:
+    def __init__(self, level: Optional[int] = None):
+        self.level = 4 if level is None else max(0, min(level, 11))
+
+    def compressor(self):
+        compressor = _import_brotli().Compressor(quality=self.level)
+        return compressor.process, compressor.flush, compressor.finish
+
+    def decompressor(self):
+        return BrotliInflater()
+
+
+class ZstdCodec:
+    def __init__(self, level: Optional[int] = None):
+        self.level = 3 if level is None else max(1, min(level, 22))
+
+    def compressor(self):
+        zstd = _import_zstandard()
+        compressor = zstd.ZstdCompressor(level=self.level).compressobj()
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zstd.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush,
+        )
+
+    def decompressor(self):
+        return ZstdInflater()
+
+
+class GzipInflater:
+    """
+    Inflaters decompress incrementally: each call returns about `max_length`
+    bytes at most, and `decompress(b"", ...)` continues with the rest of the
+    input while `pending`.
+    """
+
+    def __init__(self):
+        self.decompressor = zlib.decompressobj(47)  # gzip or zlib header
+        # zlib may hold back output without input left when the output is full
+        self.full = False
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.decompressor.unconsumed_tail) or (
+            self.full and not self.decompressor.eof
+        )
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        data = self.decompressor.unconsumed_tail + data
+        output = self.decompressor.decompress(data, max_length)
+        self.full = len(output) == max_length
+        return output
+
+
+class BrotliInflater:
+    def __init__(self):
+        self.decompressor = _import_brotli().Decompressor()
+        self.input = b""
+        # Output held back by the limit comes with the next calls
+        self.full = False
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.input) or (self.full and not self.decompressor.is_finished())
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        self.input += data
+        # Input is only accepted once the output of the last call is drained
+        data = b""
+        if self.input and not self.full and self.decompressor.can_accept_more_data():
+            data, self.input = self.input, b""
+        output = self.decompressor.process(data, output_buffer_limit=max_length)
+        self.full = len(output) >= max_length
+        return output
+
+
+class ZstdInflater:
+    # zstandard cannot limit its output, so input is fed in slices. A zstd
+    # block inflates to at most 128 KiB, so a slice yields at most ~2 MiB.
+    INPUT_SLICE = 64
+
+    def __init__(self):
+        self.decompressor = _import_zstandard().ZstdDecompressor().decompressobj()
+        self.input = b""
+        self.offset = 0
+
+    @property
+    def pending(self) -> bool:
+        return self.offset < len(self.input)
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        if data:
+            self.input = self.input[self.offset :] + data
+            self.offset = 0
+        output = bytearray()
+        while self.pending and len(output) < max_length:
+            end = self.offset + self.INPUT_SLICE
+            output += self.decompressor.decompress(self.input[self.offset : end])
+            self.offset = end
+        return bytes(output)
+
+
+def get_available_codecs(level: Optional[int] = None) -> Dict[str, object]:
+    """Return the supported codecs keyed by content-coding, in order of preference."""
+    codecs = {}
+    # Checking for the packages does not import them
+    if importlib.util.find_spec("zstandard") is not None:
+        codecs["zstd"] = ZstdCodec(level)
+    if importlib.util.find_spec("brotli") is not None:
+        codecs["br"] = BrotliCodec(level)
+    codecs["gzip"] = GzipCodec(level)
+    return codecs
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into a mapping of coding to q-value."""
+    accepted = {}
+    for item in value.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, param_value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(param_value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def select_encoding(accept_encoding: str, codings: List[str]) -> Optional[str]:
+    """Pick the supported coding with the highest q-value, preferring `codings` order on ties."""
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in codings:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Negotiate response compression (zstd, br or gzip) from Accept-Encoding and
+    decompress request bodies sent with a Content-Encoding.
+
+    Responses smaller than `minimum_size`, already encoded, or of an already
+    compressed media type are sent as-is.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        level: Optional[int] = None,
+        max_request_size: int = MAX_DECOMPRESSED_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.codecs = get_available_codecs(level)
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+
+        content_encoding = headers.get("content-encoding", "").strip().lower()
+        if content_encoding and content_encoding != "identity":
+            codec = self.codecs.get(content_encoding)
+            if codec is None:
+                response = PlainTextResponse(
+                    f"Unsupported Content-Encoding: {content_encoding}",
+                    status_code=415,
+                    headers={"Accept-Encoding": ", ".join(self.codecs)},
+                )
+                await response(scope, receive, send)
+                return
+            scope, receive = self.decompress_request(scope, receive, codec)
+
+        encoding = select_encoding(
+            headers.get("accept-encoding", ""), list(self.codecs)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(
+            self.app, encoding, self.codecs[encoding], self.minimum_size
+        )
+        await responder(scope, receive, send)
+
+    def decompress_request(self, scope: Scope, receive: Receive, codec):
+        """
+        Decompress the request body in chunks of at most DECOMPRESSED_CHUNK_SIZE,
+        so size limits downstream see it grow, rejecting it with 413 once it
+        inflates past `max_request_size`.
+        """
+        decompressor = codec.decompressor()
+        max_request_size = self.max_request_size
+        received_all = False
+        size = 0
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (key, value)
+            for key, value in scope["headers"]
+            if key not in (b"content-encoding", b"content-length")
+        ]
+
+        async def receive_decompressed() -> Message:
+            nonlocal received_all, size
+            while True:
+                data = b""
+                if not decompressor.pending and not received_all:
+                    message = await receive()
+                    if message["type"] != "http.request":
+                        return message
+                    data = message.get("body", b"")
+                    received_all = not message.get("more_body", False)
+                try:
+                    body = decompressor.decompress(data, DECOMPRESSED_CHUNK_SIZE)
+                except Exception:
+                    raise HTTPException(
+                        status_code=400, detail="Invalid compressed request body"
+                    )
+                size += len(body)
+                if size > max_request_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Decompressed request body exceeds the limit of {max_request_size} bytes",
+                    )
+                more_body = decompressor.pending or not received_all
+                if body or not more_body:
+                    return {
+                        "type": "http.request",
+                        "body": body,
+                        "more_body": more_body,
+                    }
+
+        return scope, receive_decompressed
+
+
+class CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, codec, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.codec = codec
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.compress = None
+        self.flush = None
+        self.finish = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Wait for the first body chunk to decide whether to compress
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = "content-encoding" in headers or content_type.startswith(
+                INCOMPRESSIBLE_MEDIA_TYPES
+            )
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            if not more_body and len(body) < self.minimum_size:
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.compress, self.flush, self.finish = self.codec.compressor()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                body = self.compress(body) + self.flush()
+            else:
+                body = self.compress(body) + self.finish()
+                headers["Content-Length"] = str(len(body))
+            await self.send(self.initial_message)
+            await self.send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+            return
+
+        body = self.compress(body)
+        body += self.flush() if more_body else self.finish()
+        await self.send(
+            {"type": "http.response.body", "body": body, "more_body": more_body}
+        )
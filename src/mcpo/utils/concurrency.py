@@ -0,0 +1,176 @@
+import math
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+CONCURRENCY_ALGORITHMS = ("gradient", "aimd")
+
+
+@dataclass(frozen=True)
+class ConcurrencySettings:
+    """Settings of the adaptive concurrency limit of a server."""
+
+    enabled: bool = False
+    algorithm: str = "gradient"
+    initial_limit: int = 10
+    min_limit: int = 1
+    max_limit: int = 200
+    # Factor applied to the limit on an error, or a slow call for AIMD
+    backoff_ratio: float = 0.9
+    # AIMD: calls slower than this (in seconds) count as a drop
+    timeout: float = 5.0
+    # Gradient: latency increase tolerated before the limit shrinks
+    tolerance: float = 1.5
+    # Gradient: weight of each new estimate in the limit
+    smoothing: float = 0.2
+    # Gradient: number of samples averaged into the baseline latency
+    long_window: int = 600
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "ConcurrencySettings" = None
+    ) -> "ConcurrencySettings":
+        """Apply a `concurrency` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        algorithm = config.get("algorithm", defaults.algorithm)
+        if algorithm not in CONCURRENCY_ALGORITHMS:
+            raise ValueError(
+                f"Invalid concurrency algorithm '{algorithm}', "
+                f"expected one of {CONCURRENCY_ALGORITHMS}"
+            )
+        settings = cls(
+            enabled=bool(config.get("enabled", bool(config) or defaults.enabled)),
+            algorithm=algorithm,
+            initial_limit=config.get("initialLimit", defaults.initial_limit),
+            min_limit=config.get("minLimit", defaults.min_limit),
+            max_limit=config.get("maxLimit", defaults.max_limit),
+            backoff_ratio=config.get("backoffRatio", defaults.backoff_ratio),
+            timeout=config.get("timeout", defaults.timeout),
+            tolerance=config.get("tolerance", defaults.tolerance),
+            smoothing=config.get("smoothing", defaults.smoothing),
+            long_window=config.get("longWindow", defaults.long_window),
+        )
+        if not 1 <= settings.min_limit <= settings.max_limit:
+            raise ValueError(
+                f"Invalid concurrency limits {settings.min_limit}..{settings.max_limit}"
+            )
+        return settings
+
+
+class AdaptiveLimit(ABC):
+    """
+    A concurrency limit adjusted from the latency and errors of finished calls.
+
+    Subclasses compute the next estimate in `adjust`. The estimate is kept as
+    a float so small steps accumulate, and `limit` rounds it down.
+    """
+
+    algorithm = ""
+
+    def __init__(self, settings: ConcurrencySettings):
+        self.settings = settings
+        self.estimate = float(
+            min(max(settings.initial_limit, settings.min_limit), settings.max_limit)
+        )
+        self.samples = 0
+        self.drops = 0
+        self.last_latency: Optional[float] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self.estimate)
+
+    def update(self, latency: float, in_flight: int, failed: bool):
+        """Record a finished call; `in_flight` counts the calls running with it."""
+        self.samples += 1
+        self.last_latency = latency
+        if failed:
+            self.drops += 1
+            estimate = self.estimate * self.settings.backoff_ratio
+        else:
+            estimate = self.adjust(latency, in_flight)
+        self.estimate = min(
+            max(estimate, self.settings.min_limit), self.settings.max_limit
+        )
+
+    @abstractmethod
+    def adjust(self, latency: float, in_flight: int) -> float:
+        """Return the next estimate after a successful call."""
+
+    def app_limited(self, in_flight: int) -> bool:
+        # Growing the limit while it is far from being reached would let it
+        # run away without any evidence the server copes
+        return in_flight * 2 < self.estimate
+
+    def to_dict(self) -> dict:
+        return {
+            "algorithm": self.algorithm,
+            "limit": self.limit,
+            "min_limit": self.settings.min_limit,
+            "max_limit": self.settings.max_limit,
+            "samples": self.samples,
+            "drops": self.drops,
+            "last_latency": self.last_latency,
+        }
+
+
+class AIMDLimit(AdaptiveLimit):
+    """Grow the limit by one per successful call, shrink it on errors or slow calls."""
+
+    algorithm = "aimd"
+
+    def adjust(self, latency: float, in_flight: int) -> float:
+        if latency > self.settings.timeout:
+            self.drops += 1
+            return self.estimate * self.settings.backoff_ratio
+        if self.app_limited(in_flight):
+            return self.estimate
+        return self.estimate + 1
+
+
+class GradientLimit(AdaptiveLimit):
+    """
+    Scale the limit by the ratio of the baseline latency to the current one.
+
+    The baseline is a long moving average of latency. While calls are no
+    slower than `tolerance` times the baseline, the limit grows by a queue
+    allowance of sqrt(limit); once they are, it shrinks by up to half, which
+    keeps the server near the concurrency where latency starts to climb.
+    """
+
+    algorithm = "gradient"
+
+    def __init__(self, settings: ConcurrencySettings):
+        super().__init__(settings)
+        self.baseline: Optional[float] = None
+
+    def adjust(self, latency: float, in_flight: int) -> float:
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) / self.settings.long_window
+            if self.baseline > 2 * latency:
+                # Latency has recovered from a spike; let the baseline follow
+                # it down faster than the long average would
+                self.baseline *= 0.95
+        if self.app_limited(in_flight):
+            return self.estimate
+
+        gradient = max(
+            0.5, min(1.0, self.settings.tolerance * self.baseline / max(latency, 1e-9))
+        )
+        target = self.estimate * gradient + math.sqrt(self.estimate)
+        smoothing = self.settings.smoothing
+        return self.estimate * (1 - smoothing) + target * smoothing
+
+    def to_dict(self) -> dict:
+        return {**super().to_dict(), "baseline_latency": self.baseline}
+
+
+def create_adaptive_limit(settings: ConcurrencySettings) -> Optional[AdaptiveLimit]:
+    if not settings.enabled:
+        return None
+    if settings.algorithm == "aimd":
+        return AIMDLimit(settings)
+    return GradientLimit(settings)
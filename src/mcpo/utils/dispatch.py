@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional, Tuple
+
+from starlette.routing import BaseRoute, Match, Mount, Route, Router, get_route_path
+from starlette.types import Receive, Scope, Send
+
+
+class DispatchRouter:
+    """
+    Resolve a router's static routes and mounts through a dict instead of
+    Starlette's linear scan over every route.
+
+    Installed in place of the router's own entry point; requests that do not
+    resolve to a static path or mount fall back to the regular matching, so
+    405s, path parameters and redirects behave as before. Static routes are
+    only indexed when no earlier dynamic route or mount matches them, and a
+    mount is skipped when one of the few dynamic routes before it matches,
+    which keeps the first-match order of the linear scan.
+    """
+
+    def __init__(self, router: Router):
+        self.router = router
+        self.fallback = router.middleware_stack
+        self.indexed_count = -1
+        self.routes: Dict[str, BaseRoute] = {}
+        self.mounts: Dict[str, Tuple[Mount, List[BaseRoute]]] = {}
+
+    def build_index(self):
+        routes: Dict[str, BaseRoute] = {}
+        mounts: Dict[str, Tuple[Mount, List[BaseRoute]]] = {}
+        dynamic: List[BaseRoute] = []
+        for route in self.router.routes:
+            if isinstance(route, Mount) and not route.param_convertors:
+                if route.path not in mounts:
+                    mounts[route.path] = (route, list(dynamic))
+                dynamic.append(route)
+            elif isinstance(route, Route) and not route.param_convertors:
+                if route.path not in routes and not self.shadowed(route.path, dynamic):
+                    routes[route.path] = route
+            else:
+                dynamic.append(route)
+        self.routes, self.mounts = routes, mounts
+        self.indexed_count = len(self.router.routes)
+
+    @staticmethod
+    def shadowed(path: str, dynamic: List[BaseRoute]) -> bool:
+        return any(route.path_regex.match(path) for route in dynamic)
+
+    def resolve(self, scope: Scope) -> Optional[BaseRoute]:
+        path = get_route_path(scope)
+        route = self.routes.get(path)
+        if route is not None:
+            return route
+
+        # Try every prefix of the path, so the cost depends on the path depth
+        # rather than on the number of mounts
+        index = path.find("/", 1)
+        while True:
+            entry = self.mounts.get(path if index == -1 else path[:index])
+            if entry is not None:
+                mount, preceding = entry
+                if any(route.matches(scope)[0] != Match.NONE for route in preceding):
+                    return None
+                return mount
+            if index == -1:
+                return None
+            index = path.find("/", index + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            if len(self.router.routes) != self.indexed_count:
+                # Tool routes are added once the MCP session is initialized
+                self.build_index()
+            route = self.resolve(scope)
+            if route is not None:
+                match, child_scope = route.matches(scope)
+                if match == Match.FULL:
+                    scope.setdefault("router", self.router)
+                    scope.update(child_scope)
+                    await route.handle(scope, receive, send)
+                    return
+        await self.fallback(scope, receive, send)
+
+
+def install_dispatch_router(app):
+    """Route the app's requests through a `DispatchRouter`."""
+    app.router.middleware_stack = DispatchRouter(app.router)
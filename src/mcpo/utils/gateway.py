@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from mcp import types
+from mcp.server.lowlevel import NotificationOptions, Server
+from mcp.server.session import ServerSession
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from pydantic import ValidationError
+from starlette.requests import HTTPConnection
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+
+from mcpo.utils.auth import check_bearer_token
+from mcpo.utils.circuit_breaker import get_circuit_breaker
+from mcpo.utils.limits import get_payload_limits
+from mcpo.utils.main import add_notification_listener, call_tool_endpoint
+from mcpo.utils.retry import get_retry_policy
+from mcpo.utils.scheduling import get_client_id
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_PATH = "/mcp"
+DEFAULT_SEPARATOR = "__"
+
+
+class GatewayServer(Server):
+    """MCP server announcing that its tool list changes as backends change theirs."""
+
+    def create_initialization_options(self, notification_options=None, **kwargs):
+        return super().create_initialization_options(
+            notification_options or NotificationOptions(tools_changed=True), **kwargs
+        )
+
+
+class McpGateway:
+    """
+    A single streamable HTTP MCP server in front of the sessions of every server app.
+
+    Tools are listed under `<server><separator><tool>` and calls are routed to
+    the backend session of that server, so clients share one connection and
+    backends are shared across clients. Calls go through the same limits,
+    scheduling and circuit breakers as the tool routes. The merged tool list is cached until a
+    backend announces that its tools changed.
+    """
+
+    def __init__(self, servers: List[FastAPI], separator: str = DEFAULT_SEPARATOR):
+        self.servers = servers
+        self.separator = separator
+        # Tools of each server, fetched again when the server's list changed
+        self.server_tools: Dict[FastAPI, List[types.Tool]] = {}
+        self.stale = set()
+        self.tools: Optional[List[types.Tool]] = None
+        self.routes: Dict[str, Tuple[FastAPI, str]] = {}
+        # Client sessions to forward notifications to, dropped as they close
+        self.clients: "weakref.WeakSet[ServerSession]" = weakref.WeakSet()
+
+        self.server = GatewayServer("mcpo")
+        self.server.list_tools()(self.list_tools)
+        self.server.call_tool(validate_input=False)(self.call_tool)
+        self.server.set_logging_level()(self.set_logging_level)
+        self.session_manager = StreamableHTTPSessionManager(self.server)
+
+        for server in servers:
+            add_notification_listener(server, self.make_listener(server))
+
+    @asynccontextmanager
+    async def run(self):
+        async with self.session_manager.run():
+            yield
+
+    async def close_streams(self):
+        """End every client session, so their open event streams complete."""
+        transports = getattr(self.session_manager, "_server_instances", {})
+        for transport in list(transports.values()):
+            if not transport.is_terminated:
+                await transport.terminate()
+
+    def tool_name(self, server: FastAPI, name: str) -> str:
+        server_name = getattr(server.state, "server_name", None)
+        return f"{server_name}{self.separator}{name}" if server_name else name
+
+    def track_client(self):
+        self.clients.add(self.server.request_context.session)
+
+    async def fetch_tools(self, server: FastAPI) -> List[types.Tool]:
+        if server not in self.stale and server in self.server_tools:
+            return self.server_tools[server]
+        tools = getattr(server.state, "tools", None)
+        if server in self.stale or tools is None:
+            session = getattr(server.state, "session", None)
+            if session is None:
+                # Listed again once the server is connected
+                self.stale.add(server)
+                return []
+            tools = (await session.list_tools()).tools
+        self.stale.discard(server)
+        self.server_tools[server] = tools
+        return tools
+
+    async def list_tools(self) -> List[types.Tool]:
+        self.track_client()
+        if self.tools is not None:
+            return self.tools
+
+        results = await asyncio.gather(
+            *(self.fetch_tools(server) for server in self.servers),
+            return_exceptions=True,
+        )
+        tools, routes = [], {}
+        for server, result in zip(self.servers, results):
+            if isinstance(result, BaseException):
+                # A failed backend is left out rather than failing the whole list
+                logger.warning(
+                    f"Failed to list tools of '{self.tool_name(server, '')}': {result}"
+                )
+                self.stale.add(server)
+                continue
+            for tool in result:
+                name = self.tool_name(server, tool.name)
+                tools.append(tool.model_copy(update={"name": name}))
+                routes[name] = (server, tool.name)
+        self.routes = routes
+        if not self.stale:
+            self.tools = tools
+        return tools
+
+    async def call_tool(self, name: str, arguments: dict) -> types.CallToolResult:
+        self.track_client()
+        if name not in self.routes:
+            await self.list_tools()
+        if name not in self.routes:
+            raise ValueError(f"Unknown tool '{name}'")
+        server, tool_name = self.routes[name]
+        session = getattr(server.state, "session", None)
+        if session is None:
+            raise RuntimeError(f"MCP server of tool '{name}' is not connected")
+
+        context = self.server.request_context
+        progress_token = context.meta.progressToken if context.meta else None
+        progress_callback = None
+        if progress_token is not None:
+
+            async def progress_callback(progress, total, message=None):
+                await context.session.send_progress_notification(
+                    progress_token,
+                    progress,
+                    total,
+                    message,
+                    related_request_id=context.request_id,
+                )
+
+        # The client ID and affinity headers come from the client's HTTP request
+        connection = context.request or HTTPConnection({"type": "http", "headers": []})
+        caller = (getattr(server.state, "tool_callers", None) or {}).get(tool_name)
+        try:
+            if caller is not None:
+                # The same call path as the tool's route, with its limits,
+                # scheduling, circuit breaker, retries and recording
+                try:
+                    args = caller.validate(arguments)
+                except ValidationError as e:
+                    raise ValueError(f"Invalid arguments for '{name}': {e}")
+                return await caller.call(connection, args, progress_callback, raw=True)
+            # Tools listed after the server started have no route
+            return await self.call_unrouted_tool(
+                server, session, tool_name, arguments, connection, progress_callback
+            )
+        except HTTPException as e:
+            message = e.detail.get("message") if isinstance(e.detail, dict) else None
+            return types.CallToolResult(
+                content=[types.TextContent(type="text", text=message or str(e.detail))],
+                isError=True,
+            )
+
+    async def call_unrouted_tool(
+        self,
+        server: FastAPI,
+        session,
+        tool_name: str,
+        arguments: dict,
+        connection: HTTPConnection,
+        progress_callback,
+    ) -> types.CallToolResult:
+        """Call a tool without a route under the server's limits."""
+        scheduler = getattr(server.state, "scheduler", None)
+        tool = next(
+            (
+                tool
+                for tool in self.server_tools.get(server, [])
+                if tool.name == tool_name
+            ),
+            None,
+        )
+        return await call_tool_endpoint(
+            session,
+            tool_name,
+            arguments,
+            get_payload_limits(server, tool_name),
+            getattr(server.state, "status", None),
+            progress_callback,
+            scheduler=scheduler,
+            client_id=(
+                get_client_id(connection, scheduler.settings.client_header)
+                if scheduler
+                else None
+            ),
+            breaker=get_circuit_breaker(server, tool_name),
+            retry=get_retry_policy(server, tool) if tool else None,
+            recorder=getattr(server.state, "recorder", None),
+            raw=True,
+        )
+
+    async def set_logging_level(self, level: types.LoggingLevel):
+        self.track_client()
+        for server in self.servers:
+            session = getattr(server.state, "session", None)
+            if session is None:
+                continue
+            try:
+                await session.set_logging_level(level)
+            except Exception as e:
+                logger.debug(f"Failed to set logging level of a server: {e}")
+
+    def make_listener(self, server: FastAPI):
+        async def listener(notification):
+            if isinstance(notification, types.ToolListChangedNotification):
+                # Listing the tools from here would block the backend session,
+                # so they are fetched again on the next tools/list instead
+                self.stale.add(server)
+                self.tools = None
+            elif isinstance(notification, types.LoggingMessageNotification):
+                server_name = getattr(server.state, "server_name", None)
+                if server_name:
+                    params = notification.params
+                    notification = notification.model_copy(
+                        update={
+                            "params": params.model_copy(
+                                update={
+                                    "logger": (
+                                        f"{server_name}.{params.logger}"
+                                        if params.logger
+                                        else server_name
+                                    )
+                                }
+                            )
+                        }
+                    )
+            else:
+                return
+            await self.broadcast(notification)
+
+        return listener
+
+    async def broadcast(self, notification):
+        for client in list(self.clients):
+            try:
+                await client.send_notification(types.ServerNotification(notification))
+            except Exception:
+                self.clients.discard(client)
+
+
+class GatewayEndpoint:
+    """ASGI endpoint checking the API key before handing requests to the gateway."""
+
+    def __init__(self, gateway: McpGateway, api_dependency=None):
+        self.gateway = gateway
+        self.api_dependency = api_dependency
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if self.api_dependency:
+            connection = HTTPConnection(scope)
+            scheme, _, token = connection.headers.get("authorization", "").partition(
+                " "
+            )
+            error = await check_bearer_token(
+                self.api_dependency, token if scheme.lower() == "bearer" else None
+            )
+            if error is not None:
+                response = JSONResponse(
+                    {"detail": error.detail},
+                    status_code=error.status_code,
+                    headers=error.headers,
+                )
+                await response(scope, receive, send)
+                return
+        await self.gateway.session_manager.handle_request(scope, receive, send)
+
+
+def add_gateway_route(
+    app: FastAPI,
+    servers: List[FastAPI],
+    api_dependency=None,
+    separator: str = DEFAULT_SEPARATOR,
+) -> McpGateway:
+    """
+    Serve the tools of all servers as one streamable HTTP MCP server.
+
+    The gateway's session manager runs in the app's lifespan, from `app.state.gateway`.
+    """
+    gateway = app.state.gateway = McpGateway(servers, separator)
+    app.router.routes.append(
+        Route(
+            GATEWAY_PATH,
+            GatewayEndpoint(gateway, api_dependency),
+            methods=["GET", "POST", "DELETE"],
+            include_in_schema=False,
+        )
+    )
+    return gateway
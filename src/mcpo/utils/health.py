@@ -0,0 +1,218 @@
+import glob
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+from mcpo.utils.auth import get_admin_router
+
+# Environment variable used to find the subprocess of a stdio server
+SERVER_ID_ENV = "MCPO_SERVER_ID"
+
+HEALTH_PATHS = ("/healthz", "/readyz")
+
+
+def list_child_pids(pid: Optional[int] = None) -> List[int]:
+    """Return the PIDs of the direct children of `pid` or this process (Linux only)."""
+    pids = []
+    for path in glob.glob(f"/proc/{pid or os.getpid()}/task/*/children"):
+        try:
+            with open(path) as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def find_child_process(server_id: str) -> Optional[int]:
+    """Find the child process that was started with `MCPO_SERVER_ID=server_id`."""
+    needle = f"{SERVER_ID_ENV}={server_id}".encode()
+    for pid in list_child_pids():
+        try:
+            with open(f"/proc/{pid}/environ", "rb") as f:
+                environ = f.read().split(b"\0")
+        except OSError:
+            continue
+        if needle in environ:
+            return pid
+    return None
+
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The state field follows the parenthesised command name
+            state = f.read().rsplit(")", 1)[1].split()[0]
+        return state not in ("Z", "X")
+    except (OSError, IndexError):
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_process_rss(pid: int) -> Optional[int]:
+    """Resident set size of a process in bytes, read from /proc."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class ServerStatus:
+    """Lifecycle and call statistics of a single MCP server, cheap to read."""
+
+    def __init__(self, required: bool = True):
+        self.required = required
+        self.state = "starting"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.pid: Optional[int] = None
+        self.tool_count = 0
+        self.last_list_tools: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[float] = None
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        # Optional ServerCircuitBreakers, AffinityPool, AdaptiveLimit and
+        # ProcessSupervisor of the server
+        self.circuit_breakers = None
+        self.affinity = None
+        self.concurrency_limit = None
+        self.process = None
+        self.idempotency = None
+
+    def set_ready(self, pid: Optional[int] = None):
+        self.state = "ready"
+        self.error = None
+        self.started_at = time.time()
+        self.pid = pid
+
+    def set_failed(self, error: BaseException):
+        self.state = "failed"
+        self.error = str(error) or type(error).__name__
+
+    def set_stopped(self):
+        self.state = "stopped"
+
+    def tools_listed(self, tool_count: int):
+        self.tool_count = tool_count
+        self.last_list_tools = time.time()
+
+    def call_started(self):
+        self.in_flight += 1
+        self.calls += 1
+
+    def call_finished(self, success: bool):
+        self.in_flight -= 1
+        if success:
+            self.last_success = time.time()
+        else:
+            self.errors += 1
+            self.last_error = time.time()
+
+    def get_state(self) -> str:
+        if self.state == "ready" and self.pid is not None:
+            if not is_process_alive(self.pid):
+                return "exited"
+        return self.state
+
+    @property
+    def is_ready(self) -> bool:
+        return self.get_state() == "ready"
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.get_state(),
+            "required": self.required,
+            "error": self.error,
+            "started_at": self.started_at,
+            "pid": self.pid,
+            "rss": get_process_rss(self.pid) if self.pid is not None else None,
+            "tool_count": self.tool_count,
+            "last_list_tools": self.last_list_tools,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "errors": self.errors,
+            "circuit_breakers": (
+                self.circuit_breakers.to_dict() if self.circuit_breakers else None
+            ),
+            "affinity": self.affinity.to_dict() if self.affinity else None,
+            "concurrency_limit": (
+                self.concurrency_limit.to_dict() if self.concurrency_limit else None
+            ),
+            "process": self.process.to_dict() if self.process else None,
+            "idempotency": self.idempotency.to_dict() if self.idempotency else None,
+        }
+
+
+def get_server_statuses(servers: Iterable[FastAPI]) -> Dict[str, ServerStatus]:
+    statuses = {}
+    for server in servers:
+        status = getattr(server.state, "status", None)
+        if status is not None:
+            name = getattr(server.state, "server_name", None) or server.title
+            statuses[name] = status
+    return statuses
+
+
+def add_health_routes(app: FastAPI, servers: List[FastAPI], api_dependency=None):
+    """
+    Add liveness, readiness and status endpoints to the main app.
+
+    `servers` is read on every request, so apps can be added after the routes.
+    Liveness and readiness are left open for load balancers and orchestrators.
+    """
+    probes = get_admin_router()
+
+    @probes.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @probes.get("/readyz")
+    async def readyz():
+        statuses = get_server_statuses(servers)
+        ready = all(status.is_ready for status in statuses.values() if status.required)
+        # Set when the server is shutting down, so load balancers stop sending traffic
+        drain = getattr(app.state, "drain", None)
+        draining = drain is not None and drain.draining
+        return JSONResponse(
+            status_code=200 if ready and not draining else 503,
+            content={
+                "status": (
+                    "draining" if draining else "ready" if ready else "not ready"
+                ),
+                "servers": {
+                    name: status.get_state() for name, status in statuses.items()
+                },
+            },
+        )
+
+    router = get_admin_router(api_dependency)
+
+    @router.get("/status")
+    async def get_status():
+        return {
+            name: status.to_dict()
+            for name, status in get_server_statuses(servers).items()
+        }
+
+    @router.get("/status/{server_name}")
+    async def get_server_status(server_name: str):
+        status = get_server_statuses(servers).get(server_name)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Server not found")
+        return status.to_dict()
+
+    app.include_router(probes)
+    app.include_router(router)
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+
+from mcpo.utils.auth import get_bearer_token
+
+DEFAULT_IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Errors raised before the tool runs (queue full, circuit open, ...) are not
+# kept, so a retry with the same key can still run it
+RETRYABLE_STATUS_CODES = (429, 503)
+
+
+@dataclass(frozen=True)
+class IdempotencySettings:
+    """Settings of the idempotency keys of a server's tool endpoints."""
+
+    enabled: bool = False
+    header: str = DEFAULT_IDEMPOTENCY_HEADER
+    max_keys: int = 10000
+    ttl: float = 3600.0
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "IdempotencySettings" = None
+    ) -> "IdempotencySettings":
+        """Apply an `idempotency` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", bool(config) or defaults.enabled)),
+            header=config.get("header", defaults.header),
+            max_keys=config.get("maxKeys", defaults.max_keys),
+            ttl=config.get("ttl", defaults.ttl),
+        )
+
+
+def get_fingerprint(payload: Any) -> str:
+    """Hash of a JSON payload that does not depend on the order of its keys."""
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class IdempotencyEntry:
+    def __init__(self, fingerprint: str, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.created_at = time.monotonic()
+        # Spilled results are kept on disk until the entry expires
+        self.result_path: Optional[str] = None
+        # Requests waiting for or sending the result, and whether the entry
+        # was dropped from the store, so its file goes once they are done
+        self.users = 0
+        self.removed = False
+
+
+class IdempotencyStore:
+    """
+    Outcomes of tool calls made with an idempotency key, for one server.
+
+    The first request with a key runs the call in its own task, so it finishes
+    even if that client disconnects. Requests repeating the key, while the call
+    runs or for `ttl` seconds after, get its outcome instead of calling the
+    tool again. Once `max_keys` keys are kept, the oldest finished one is dropped.
+    """
+
+    def __init__(self, settings: IdempotencySettings):
+        self.settings = settings
+        # Keyed by API key, tool name and idempotency key
+        self.entries: "OrderedDict[tuple, IdempotencyEntry]" = OrderedDict()
+        # Dropped entries whose spilled result is still being sent
+        self.removed: Set[IdempotencyEntry] = set()
+
+    def get_key(self, request: Request) -> Optional[str]:
+        return request.headers.get(self.settings.header) or None
+
+    async def run(
+        self,
+        request: Request,
+        tool_name: str,
+        key: str,
+        payload: Any,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Run `call()` once per API key, tool and idempotency key, returning its
+        result and whether it is a replay of an earlier request.
+
+        Raises 422 when the key was used with a different `payload`. Errors
+        replayed from an earlier request carry the `Idempotent-Replayed` header.
+        """
+        self.evict_expired()
+        entry_key = (get_bearer_token(request), tool_name, key)
+        fingerprint = get_fingerprint(payload)
+        entry = self.entries.get(entry_key)
+        replayed = entry is not None
+        if entry is None:
+            while len(self.entries) >= self.settings.max_keys:
+                oldest = next(
+                    (
+                        old_key
+                        for old_key, old in self.entries.items()
+                        if old.task.done()
+                    ),
+                    None,
+                )
+                if oldest is None:
+                    raise HTTPException(
+                        status_code=503,
+                        detail={"message": "Too many idempotent calls in flight"},
+                    )
+                self.remove(oldest)
+            entry = IdempotencyEntry(fingerprint, asyncio.create_task(call()))
+            self.entries[entry_key] = entry
+            entry.task.add_done_callback(lambda _: self.finished(entry_key, entry))
+        elif entry.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "message": f"{self.settings.header} was already used with different arguments"
+                },
+            )
+
+        entry.users += 1
+        sending_file = False
+        try:
+            # Shielded, so a disconnecting client does not cancel the call for others
+            try:
+                result = await asyncio.shield(entry.task)
+            except HTTPException as e:
+                if not replayed:
+                    raise
+                # A new exception, since the stored one is raised for every replay
+                raise HTTPException(
+                    status_code=e.status_code,
+                    detail=e.detail,
+                    headers={**(e.headers or {}), REPLAYED_HEADER: "true"},
+                ) from e
+            if isinstance(result, FileResponse):
+                # A spilled result is sent to every request with the key, so its
+                # file is kept until the entry expires and the last one is sent
+                result = FileResponse(
+                    entry.result_path,
+                    media_type="application/json",
+                    background=BackgroundTask(self.release, entry),
+                )
+                sending_file = True
+            return result, replayed
+        finally:
+            if not sending_file:
+                self.release(entry)
+
+    def finished(self, entry_key, entry: IdempotencyEntry):
+        """
+        Keep the spilled file of a result, even if no request is left to send
+        it, and forget a key if its call was cancelled or rejected before it ran.
+        """
+        if entry.task.cancelled():
+            keep = False
+        else:
+            error = entry.task.exception()
+            keep = error is None or (
+                isinstance(error, HTTPException)
+                and error.status_code not in RETRYABLE_STATUS_CODES
+            )
+            if error is None and isinstance(entry.task.result(), FileResponse):
+                entry.result_path = entry.task.result().path
+                if entry.removed:
+                    self.delete_unused_result(entry)
+        if not keep and self.entries.get(entry_key) is entry:
+            del self.entries[entry_key]
+
+    def release(self, entry: IdempotencyEntry):
+        """Called once a request is done waiting for or sending the result."""
+        entry.users -= 1
+        if entry.removed:
+            self.delete_unused_result(entry)
+
+    def evict_expired(self):
+        expires_before = time.monotonic() - self.settings.ttl
+        while self.entries:
+            entry_key, entry = next(iter(self.entries.items()))
+            if entry.created_at > expires_before:
+                break
+            self.remove(entry_key)
+
+    def remove(self, entry_key):
+        """Drop a key; its spilled file is deleted once no request is sending it."""
+        entry = self.entries.pop(entry_key)
+        entry.removed = True
+        self.removed.add(entry)
+        self.delete_unused_result(entry)
+
+    def delete_unused_result(self, entry: IdempotencyEntry):
+        if entry.users > 0:
+            return
+        self.delete_result(entry)
+        if entry.task.done():
+            self.removed.discard(entry)
+
+    def delete_result(self, entry: IdempotencyEntry):
+        if entry.result_path and os.path.exists(entry.result_path):
+            os.unlink(entry.result_path)
+        entry.result_path = None
+
+    async def close(self):
+        """Cancel calls in flight and delete kept results, e.g. when the server shuts down."""
+        entries = [*self.entries.values(), *self.removed]
+        tasks = [entry.task for entry in entries if not entry.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for entry in entries:
+            self.delete_result(entry)
+        self.entries.clear()
+        self.removed.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            "keys": len(self.entries),
+            "in_flight": sum(
+                1 for entry in self.entries.values() if not entry.task.done()
+            ),
+        }
@@ -0,0 +1,328 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from mcpo.utils.auth import get_admin_router
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+@dataclass(frozen=True)
+class JobSettings:
+    """Settings of the asynchronous job mode of a server."""
+
+    enabled: bool = False
+    max_concurrent: int = 8
+    max_jobs: int = 1000
+    ttl: float = 3600.0
+    persist_directory: Optional[str] = None
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "JobSettings" = None
+    ) -> "JobSettings":
+        """Apply a `jobs` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", defaults.enabled)),
+            max_concurrent=config.get("maxConcurrent", defaults.max_concurrent),
+            max_jobs=config.get("maxJobs", defaults.max_jobs),
+            ttl=config.get("ttl", defaults.ttl),
+            persist_directory=config.get(
+                "persistDirectory", defaults.persist_directory
+            ),
+        )
+
+
+class Job:
+    def __init__(self, tool_name: str, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.tool_name = tool_name
+        self.state = "pending"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Optional[float] = None
+        self.total: Optional[float] = None
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.result_path: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.error: Any = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    async def report_progress(
+        self, progress: float, total: Optional[float], message: Optional[str] = None
+    ):
+        """Progress callback passed to `session.call_tool`."""
+        self.progress = progress
+        self.total = total
+        self.message = message
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "tool": self.tool_name,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "total": self.total,
+            "message": self.message,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        job = cls(data["tool"], job_id=data["id"])
+        for key in (
+            "state",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "progress",
+            "total",
+            "message",
+            "error_status",
+            "error",
+            "result_path",
+        ):
+            setattr(job, key, data.get(key))
+        return job
+
+
+class JobStore:
+    """
+    Bounded store of asynchronous tool calls for one server.
+
+    Finished jobs are kept for `ttl` seconds. With a persist directory, finished
+    jobs are written to disk and their results are read back on demand.
+    """
+
+    def __init__(self, settings: JobSettings):
+        self.settings = settings
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        if settings.persist_directory:
+            os.makedirs(settings.persist_directory, exist_ok=True)
+            self.load()
+
+    @property
+    def running(self) -> int:
+        return sum(1 for job in self.jobs.values() if not job.finished)
+
+    def submit(
+        self,
+        tool_name: str,
+        call: Callable[[Callable[..., Awaitable[None]]], Awaitable[Any]],
+    ) -> Job:
+        """
+        Start `call(progress_callback)` in the background and return its job.
+
+        Raises 429 when the server already runs `max_concurrent` jobs and 503
+        when the store is full of unfinished jobs.
+        """
+        self.evict_expired()
+        if self.running >= self.settings.max_concurrent:
+            raise HTTPException(
+                status_code=429,
+                detail={"message": "Too many concurrent jobs for this server"},
+            )
+        while len(self.jobs) >= self.settings.max_jobs:
+            oldest = next((job for job in self.jobs.values() if job.finished), None)
+            if oldest is None:
+                raise HTTPException(
+                    status_code=503, detail={"message": "Job store is full"}
+                )
+            self.remove(oldest)
+
+        job = Job(tool_name)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self.run(job, call))
+        return job
+
+    async def run(self, job: Job, call):
+        job.state = "running"
+        job.started_at = time.time()
+        try:
+            result = await call(job.report_progress)
+            if isinstance(result, FileResponse):
+                # Spilled results are already on disk, keep the file until expiry
+                job.result_path = result.path
+            else:
+                job.result = jsonable_encoder(result)
+            job.state = "succeeded"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+        except HTTPException as e:
+            job.state = "failed"
+            job.error_status = e.status_code
+            job.error = e.detail
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            job.state = "failed"
+            job.error_status = 500
+            job.error = {"message": "Unexpected error", "error": str(e)}
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            if self.settings.persist_directory:
+                await run_in_threadpool(self.persist, job)
+
+    def get(self, job_id: str) -> Job:
+        self.evict_expired()
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.task is not None:
+            job.task.cancel()
+            if job.state == "pending":
+                # The task never started, so `run` will not record the outcome
+                job.state = "cancelled"
+                job.finished_at = time.time()
+                job.task = None
+        return job
+
+    def evict_expired(self):
+        now = time.time()
+        for job in list(self.jobs.values()):
+            if job.finished and job.finished_at + self.settings.ttl < now:
+                self.remove(job)
+
+    def remove(self, job: Job):
+        self.jobs.pop(job.id, None)
+        for path in (job.result_path, self.get_metadata_path(job.id)):
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+    async def close(self):
+        """
+        Cancel unfinished jobs, e.g. when the server shuts down, and delete
+        spilled results unless they are persisted.
+        """
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.settings.persist_directory:
+            return
+        for job in self.jobs.values():
+            if job.result_path and os.path.exists(job.result_path):
+                os.unlink(job.result_path)
+            job.result_path = None
+
+    def get_metadata_path(self, job_id: str) -> Optional[str]:
+        if not self.settings.persist_directory:
+            return None
+        return os.path.join(self.settings.persist_directory, f"{job_id}.meta.json")
+
+    def persist(self, job: Job):
+        directory = self.settings.persist_directory
+        try:
+            if job.state == "succeeded":
+                result_path = os.path.join(directory, f"{job.id}.json")
+                if job.result_path:
+                    shutil.move(job.result_path, result_path)
+                else:
+                    with open(result_path, "w") as f:
+                        json.dump(job.result, f)
+                job.result_path = result_path
+                job.result = None
+
+            with open(self.get_metadata_path(job.id), "w") as f:
+                json.dump(
+                    {
+                        **job.to_dict(),
+                        "error_status": job.error_status,
+                        "error": job.error,
+                        "result_path": job.result_path,
+                    },
+                    f,
+                )
+        except OSError:
+            logger.exception(f"Failed to persist job {job.id}")
+
+    def load(self):
+        """Load finished jobs persisted by a previous run."""
+        directory = self.settings.persist_directory
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".meta.json"):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            job = Job.from_dict(data)
+            if not job.finished:
+                continue
+            self.jobs[job.id] = job
+        self.evict_expired()
+
+    def get_result_response(self, job_id: str):
+        job = self.get(job_id)
+        if job.state == "succeeded":
+            if job.result_path:
+                return FileResponse(job.result_path, media_type="application/json")
+            return JSONResponse(content=job.result)
+        if job.state == "failed":
+            return JSONResponse(
+                status_code=job.error_status or 500, content={"detail": job.error}
+            )
+        return JSONResponse(status_code=409, content=job.to_dict())
+
+
+def is_async_request(request: Request) -> bool:
+    return request.query_params.get("async", "").lower() in ("1", "true", "yes")
+
+
+def job_accepted_response(request: Request, job: Job) -> JSONResponse:
+    location = f"{request.scope.get('root_path', '')}/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        content=job.to_dict(),
+        headers={"Location": location},
+    )
+
+
+def add_job_routes(app: FastAPI, api_dependency=None):
+    """
+    Add status, result and cancel endpoints for the app's job store.
+    """
+    router = get_admin_router(api_dependency)
+
+    @router.get("/jobs/{job_id}")
+    async def get_job(job_id: str):
+        return app.state.jobs.get(job_id).to_dict()
+
+    @router.get("/jobs/{job_id}/result")
+    async def get_job_result(job_id: str):
+        return app.state.jobs.get_result_response(job_id)
+
+    @router.delete("/jobs/{job_id}")
+    async def cancel_job(job_id: str):
+        return app.state.jobs.cancel(job_id).to_dict()
+
+    app.include_router(router)
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse
+from mcp import types
+from mcp.types import CallToolResult
+from starlette.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+OVERSIZED_RESPONSE_MODES = ("spill", "truncate")
+
+TRUNCATION_MARKER = "\n[mcpo: response truncated, {omitted} bytes omitted]"
+
+
+@dataclass(frozen=True)
+class PayloadLimits:
+    """Size limits (in bytes) for a tool's request body and result."""
+
+    max_request_size: Optional[int] = None
+    max_response_size: Optional[int] = None
+    oversized_response: str = "spill"
+    spill_directory: Optional[str] = None
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "PayloadLimits" = None
+    ) -> "PayloadLimits":
+        """Apply a `limits` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        oversized_response = config.get(
+            "oversizedResponse", defaults.oversized_response
+        )
+        if oversized_response not in OVERSIZED_RESPONSE_MODES:
+            raise ValueError(
+                f"Invalid oversizedResponse '{oversized_response}', "
+                f"expected one of {OVERSIZED_RESPONSE_MODES}"
+            )
+        return cls(
+            max_request_size=config.get("maxRequestSize", defaults.max_request_size),
+            max_response_size=config.get("maxResponseSize", defaults.max_response_size),
+            oversized_response=oversized_response,
+            spill_directory=config.get("spillDirectory", defaults.spill_directory),
+        )
+
+
+@dataclass
+class ServerPayloadLimits:
+    """Payload limits of a server, with optional per-tool overrides."""
+
+    default: PayloadLimits = field(default_factory=PayloadLimits)
+    tools: Dict[str, PayloadLimits] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: PayloadLimits = None
+    ) -> "ServerPayloadLimits":
+        config = config or {}
+        default = PayloadLimits.from_config(config, defaults)
+        tools = {
+            tool_name: PayloadLimits.from_config(tool_config, default)
+            for tool_name, tool_config in (config.get("tools") or {}).items()
+        }
+        return cls(default=default, tools=tools)
+
+    def for_tool(self, tool_name: str) -> PayloadLimits:
+        return self.tools.get(tool_name, self.default)
+
+
+def get_payload_limits(app, tool_name: str) -> PayloadLimits:
+    server_limits = getattr(app.state, "payload_limits", None)
+    if server_limits is None:
+        return PayloadLimits()
+    return server_limits.for_tool(tool_name)
+
+
+class LimitedRequest(Request):
+    """Request whose body is rejected with 413 once it grows past `max_body_size`."""
+
+    def __init__(self, scope, receive, max_body_size: int):
+        super().__init__(scope, receive)
+        self.max_body_size = max_body_size
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            content_length = self.headers.get("content-length")
+            if content_length and content_length.isdigit():
+                if int(content_length) > self.max_body_size:
+                    raise request_too_large(self.max_body_size)
+
+            chunks: List[bytes] = []
+            size = 0
+            async for chunk in self.stream():
+                size += len(chunk)
+                if size > self.max_body_size:
+                    raise request_too_large(self.max_body_size)
+                chunks.append(chunk)
+            self._body = b"".join(chunks)
+        return self._body
+
+
+def request_too_large(max_body_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail={"message": f"Request body exceeds the limit of {max_body_size} bytes"},
+    )
+
+
+def get_content_size(content) -> int:
+    """Approximate the encoded size of a content item without copying it."""
+    if isinstance(content, types.TextContent):
+        return len(content.text)
+    if isinstance(content, types.ImageContent):
+        return len(content.data) + len(content.mimeType) + 20
+    if isinstance(content, types.EmbeddedResource):
+        resource = content.resource
+        if isinstance(resource, types.TextResourceContents):
+            size = len(resource.text)
+        else:
+            size = len(resource.blob)
+        return size + len(str(resource.uri)) + len(resource.mimeType or "") + 40
+    return 0
+
+
+def get_structured_size(value: Any) -> int:
+    """Approximate the JSON size of structured content without encoding it."""
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(
+            len(str(key)) + 4 + get_structured_size(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return 2 + sum(get_structured_size(item) + 1 for item in value)
+    return len(str(value))
+
+
+def get_result_size(result: CallToolResult) -> int:
+    # Structured content, when present, is what the endpoint returns
+    if result.structuredContent is not None:
+        return get_structured_size(result.structuredContent)
+    return sum(get_content_size(content) for content in result.content)
+
+
+def truncate_tool_result(result: CallToolResult, max_size: int) -> CallToolResult:
+    """Cut text content down to `max_size` in total, marking where it was cut."""
+    remaining = max_size
+    omitted = 0
+    contents = []
+    for content in result.content:
+        size = get_content_size(content)
+        if size <= remaining:
+            contents.append(content)
+            remaining -= size
+            continue
+        omitted += size - max(remaining, 0)
+        if isinstance(content, types.TextContent) and remaining > 0:
+            contents.append(
+                content.model_copy(update={"text": content.text[:remaining]})
+            )
+        remaining = 0
+
+    if contents and isinstance(contents[-1], types.TextContent):
+        marker = TRUNCATION_MARKER.format(omitted=omitted)
+        contents[-1] = contents[-1].model_copy(
+            update={"text": contents[-1].text + marker}
+        )
+    else:
+        contents.append(
+            types.TextContent(
+                type="text", text=TRUNCATION_MARKER.format(omitted=omitted).strip()
+            )
+        )
+    # Structured content cannot be cut, so the truncated text is returned instead
+    return result.model_copy(update={"content": contents, "structuredContent": None})
+
+
+def spill_tool_result(
+    contents: list, process_content, directory: Optional[str] = None
+) -> FileResponse:
+    """
+    Write an oversized result to a temporary file and stream it back.
+
+    Content items are converted and written one at a time, so the full JSON
+    document is never built in memory. The file is removed once it has been sent.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", prefix="mcpo-", dir=directory, delete=False
+    ) as f:
+        path = f.name
+        try:
+            if len(contents) != 1:
+                f.write("[")
+            for i, content in enumerate(contents):
+                if i:
+                    f.write(",")
+                json.dump(process_content(content), f)
+            if len(contents) != 1:
+                f.write("]")
+        except BaseException:
+            # Do not leave a partial file behind
+            f.close()
+            os.unlink(path)
+            raise
+
+    logger.info(f"Spilled oversized tool response to {path}")
+    return FileResponse(
+        path,
+        media_type="application/json",
+        background=BackgroundTask(os.unlink, path),
+    )
@@ -1,8 +1,26 @@
 import json
+import time
 import traceback
-from typing import Any, Dict, ForwardRef, List, Optional, Type, Union
+from contextlib import nullcontext
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Dict,
+    ForwardRef,
+    List,
+    Optional,
+    Type,
+    Union,
+)
 
-from fastapi import HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
 
 from mcp import ClientSession, types
 from mcp.types import (
@@ -16,9 +34,43 @@ from mcp.types import (
 
 from mcp.shared.exceptions import McpError
 
-from pydantic import Field, create_model
+from pydantic import BaseModel, Field, ValidationError, create_model
 from pydantic.fields import FieldInfo
 
+from mcpo.utils.affinity import AffinityPool
+from mcpo.utils.circuit_breaker import CircuitBreaker
+from mcpo.utils.health import ServerStatus
+from mcpo.utils.idempotency import REPLAYED_HEADER, IdempotencyStore
+from mcpo.utils.jobs import Job, JobStore, is_async_request, job_accepted_response
+from mcpo.utils.limits import (
+    LimitedRequest,
+    PayloadLimits,
+    get_payload_limits,
+    get_result_size,
+    spill_tool_result,
+    truncate_tool_result,
+)
+from mcpo.utils.recording import TrafficRecorder
+from mcpo.utils.retry import RetryPolicy
+from mcpo.utils.scheduling import FairScheduler, get_client_id
+from mcpo.utils.serialization import (
+    BinaryContent,
+    decode_request,
+    encode_response,
+    get_request_format,
+    get_response_format,
+)
+from mcpo.utils.tracing import (
+    end_validation_span,
+    get_trace_meta,
+    is_tracing_enabled,
+    set_current_span_attribute,
+    set_span_attribute,
+    start_request_span,
+    start_span,
+    start_validation_span,
+)
+
 MCP_ERROR_TO_HTTP_STATUS = {
     PARSE_ERROR: 400,
     INVALID_REQUEST: 400,
@@ -28,25 +80,88 @@ MCP_ERROR_TO_HTTP_STATUS = {
 }
 
 
-def process_tool_response(result: CallToolResult) -> list:
+SUPPORTED_CONTENT_TYPES = (
+    types.TextContent,
+    types.ImageContent,
+    types.EmbeddedResource,
+)
+
+
+def process_tool_content(content, parse_text: bool = True) -> Any:
+    """Convert a single MCP content item into its response value"""
+    if isinstance(content, types.TextContent):
+        text = content.text
+        if parse_text and isinstance(text, str):
+            try:
+                text = json.loads(text)
+            except json.JSONDecodeError:
+                pass
+        return text
+    elif isinstance(content, types.ImageContent):
+        return BinaryContent(
+            f"data:{content.mimeType};base64,{content.data}",
+            content.data,
+            content.mimeType,
+        )
+    elif isinstance(content, types.EmbeddedResource):
+        return process_resource_contents(content.resource, parse_text)
+
+
+def process_resource_contents(contents, parse_text: bool = True) -> dict:
+    """Convert the contents of an embedded or read resource into its response value"""
+    value = {"uri": str(contents.uri)}
+    if contents.mimeType:
+        value["mimeType"] = contents.mimeType
+    if isinstance(contents, types.TextResourceContents):
+        text = contents.text
+        if parse_text and contents.mimeType == "application/json":
+            try:
+                text = json.loads(text)
+            except json.JSONDecodeError:
+                pass
+        value["text"] = text
+    else:
+        value["blob"] = BinaryContent(contents.blob, contents.blob)
+    return value
+
+
+def process_tool_response(result: CallToolResult, parse_text: bool = True) -> list:
     """Universal response processor for all tool endpoints"""
-    response = []
-    for content in result.content:
-        if isinstance(content, types.TextContent):
-            text = content.text
-            if isinstance(text, str):
-                try:
-                    text = json.loads(text)
-                except json.JSONDecodeError:
-                    pass
-            response.append(text)
-        elif isinstance(content, types.ImageContent):
-            image_data = f"data:{content.mimeType};base64,{content.data}"
-            response.append(image_data)
-        elif isinstance(content, types.EmbeddedResource):
-            # TODO: Handle embedded resources
-            response.append("Embedded resource not supported yet.")
-    return response
+    return [
+        process_tool_content(content, parse_text)
+        for content in result.content
+        if isinstance(content, SUPPORTED_CONTENT_TYPES)
+    ]
+
+
+def is_text_output(output_schema: Optional[dict]) -> bool:
+    """
+    Whether a tool's output schema says its result is a plain string, in which
+    case text content is returned as is instead of being parsed as JSON.
+    """
+    if not output_schema:
+        return False
+    if output_schema.get("type") == "string":
+        return True
+    # FastMCP wraps non-object results in {"result": ...}
+    if output_schema.get("x-fastmcp-wrap-result"):
+        result_schema = output_schema.get("properties", {}).get("result", {})
+        return result_schema.get("type") == "string"
+    return False
+
+
+def validate_tool_output(response_model: Type[BaseModel], data: Any):
+    """Raise 502 if a tool's output does not match its output schema."""
+    try:
+        response_model.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=502,
+            detail={
+                "message": "Tool output does not match its output schema",
+                "errors": e.errors(include_url=False, include_context=False),
+            },
+        )
 
 
 def name_needs_alias(name: str) -> bool:
@@ -242,128 +357,360 @@ def get_model_fields(form_model_name, properties, required_fields, schema_defs=N
     return model_fields
 
 
+def add_notification_listener(app: FastAPI, listener):
+    """Call `listener` with each notification the app's MCP server sends."""
+    listeners = getattr(app.state, "notification_listeners", None)
+    if listeners is None:
+        listeners = app.state.notification_listeners = []
+    listeners.append(listener)
+
+
+@dataclass(frozen=True)
+class ToolCaller:
+    """
+    Validation and call path of a tool endpoint, for callers other than its
+    HTTP route such as the WebSocket endpoint.
+    """
+
+    form_model: Optional[Type[BaseModel]]
+    call: Callable[..., Coroutine[Any, Any, Any]]
+
+    def validate(self, arguments: Optional[dict]) -> dict:
+        """Validate arguments like the route does, raising `ValidationError`."""
+        if self.form_model is None:
+            return {}
+        form_data = self.form_model.model_validate(arguments or {})
+        return form_data.model_dump(exclude_none=True, by_alias=True)
+
+
+class ToolRoute(APIRoute):
+    """APIRoute used for tool endpoints, wrapping each request with instrumentation."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+        tool_name = self.path.lstrip("/")
+
+        async def tool_route_handler(request: Request) -> Response:
+            limits = get_payload_limits(request.app, tool_name)
+            if limits.max_request_size is not None:
+                request = LimitedRequest(
+                    request.scope, request.receive, limits.max_request_size
+                )
+            body_format = get_request_format(request)
+            if body_format:
+                request = await decode_request(request, body_format)
+
+            if not is_tracing_enabled():
+                return await route_handler(request)
+
+            server_name = (
+                getattr(request.app.state, "server_name", None) or request.app.title
+            )
+            with start_request_span(request, server_name, tool_name) as span:
+                start_validation_span(request)
+                try:
+                    response = await route_handler(request)
+                except Exception as e:
+                    end_validation_span(request, error=e)
+                    raise
+                end_validation_span(request)
+                set_span_attribute(
+                    span, "http.response.status_code", response.status_code
+                )
+                body = getattr(response, "body", None)
+                if body is not None:
+                    set_span_attribute(span, "mcpo.response.size", len(body))
+                return response
+
+        return tool_route_handler
+
+
+async def call_tool_endpoint(
+    session: ClientSession,
+    endpoint_name: str,
+    args: dict,
+    limits: Optional[PayloadLimits] = None,
+    status: Optional[ServerStatus] = None,
+    progress_callback=None,
+    scheduler: Optional[FairScheduler] = None,
+    client_id: Optional[str] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    retry: Optional[RetryPolicy] = None,
+    parse_text: bool = True,
+    recorder: Optional[TrafficRecorder] = None,
+    raw: bool = False,
+):
+    """
+    Call a tool on the MCP session and convert the result into an HTTP response body.
+
+    With `raw`, the CallToolResult is returned instead, for MCP clients: tool
+    errors are left in it, and results over `max_response_size` are truncated
+    since there is no file to spill them to.
+    """
+    probe = breaker.before_call() if breaker else False
+    try:
+        ticket = (
+            await scheduler.acquire(client_id, endpoint_name) if scheduler else None
+        )
+    except BaseException:
+        if breaker:
+            breaker.record(probe, None)
+        raise
+    if status:
+        status.call_started()
+    success = False
+    # Whether the MCP server failed, None while it has not answered
+    backend_failed = None
+    call_started_at = None
+    record = recorder is not None and recorder.sampled()
+
+    def send_call():
+        return session.call_tool(
+            endpoint_name,
+            arguments=args,
+            progress_callback=progress_callback,
+            meta=get_trace_meta(),
+        )
+
+    try:
+        with start_span(
+            "mcp.call_tool", {"mcp.tool.name": endpoint_name}, kind="client"
+        ) as span:
+            call_started_at = time.monotonic()
+            result = await (retry.call(send_call) if retry else send_call())
+            backend_failed = False
+            set_span_attribute(span, "mcp.tool.is_error", result.isError)
+        if record:
+            recorder.record_call(
+                endpoint_name,
+                args,
+                time.monotonic() - call_started_at,
+                result=result,
+            )
+        success = not result.isError
+
+        if raw:
+            max_size = limits.max_response_size if limits else None
+            if max_size is not None and get_result_size(result) > max_size:
+                result = truncate_tool_result(result, max_size)
+            return result
+
+        if result.isError:
+            error_message = "Unknown tool execution error"
+            if result.content:
+                if isinstance(result.content[0], types.TextContent):
+                    error_message = result.content[0].text
+            detail = {"message": error_message}
+            raise HTTPException(
+                status_code=500,
+                detail=detail,
+            )
+
+        with start_span("mcpo.process_response") as span:
+            max_size = limits.max_response_size if limits else None
+            if max_size is not None:
+                result_size = get_result_size(result)
+                set_span_attribute(span, "mcpo.result.size", result_size)
+                if result_size > max_size:
+                    set_span_attribute(
+                        span, "mcpo.result.oversized", limits.oversized_response
+                    )
+                    if limits.oversized_response == "truncate":
+                        result = truncate_tool_result(result, max_size)
+                    elif result.structuredContent is not None:
+                        return await run_in_threadpool(
+                            spill_tool_result,
+                            [result.structuredContent],
+                            lambda data: data,
+                            limits.spill_directory,
+                        )
+                    else:
+                        return await run_in_threadpool(
+                            spill_tool_result,
+                            [
+                                content
+                                for content in result.content
+                                if isinstance(content, SUPPORTED_CONTENT_TYPES)
+                            ],
+                            partial(process_tool_content, parse_text=parse_text),
+                            limits.spill_directory,
+                        )
+
+            # Structured content is already the parsed result, so the text
+            # content (its serialized copy) does not need to be parsed again
+            if result.structuredContent is not None:
+                return result.structuredContent
+
+            response_data = process_tool_response(result, parse_text)
+            final_response = (
+                response_data[0] if len(response_data) == 1 else response_data
+            )
+        return final_response
+
+    except McpError as e:
+        print(f"MCP Error calling {endpoint_name}: {traceback.format_exc()}")
+        set_current_span_attribute("mcp.error.code", e.error.code)
+        status_code = MCP_ERROR_TO_HTTP_STATUS.get(e.error.code, 500)
+        backend_failed = status_code >= 500
+        if record:
+            recorder.record_call(
+                endpoint_name, args, time.monotonic() - call_started_at, error=e
+            )
+        # Propagate the error received from MCP as an HTTP exception
+        raise HTTPException(
+            status_code=status_code,
+            detail=(
+                {"message": e.error.message, "data": e.error.data}
+                if e.error.data is not None
+                else {"message": e.error.message}
+            ),
+        )
+    except Exception as e:
+        print(f"Unexpected error calling {endpoint_name}: {traceback.format_exc()}")
+        if backend_failed is None:
+            backend_failed = True
+        raise HTTPException(
+            status_code=500,
+            detail={"message": "Unexpected error", "error": str(e)},
+        )
+    finally:
+        if status:
+            status.call_finished(success)
+        duration = time.monotonic() - call_started_at if call_started_at else None
+        if ticket:
+            scheduler.release(ticket, duration, backend_failed)
+        if breaker:
+            breaker.record(probe, backend_failed, duration or 0.0)
+
+
 def get_tool_handler(
     session,
     endpoint_name,
     form_model_fields,
     response_model_fields=None,
+    limits: Optional[PayloadLimits] = None,
+    status: Optional[ServerStatus] = None,
+    jobs: Optional[JobStore] = None,
+    scheduler: Optional[FairScheduler] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    retry: Optional[RetryPolicy] = None,
+    affinity: Optional[AffinityPool] = None,
+    validate_output: bool = False,
+    parse_text: bool = True,
+    recorder: Optional[TrafficRecorder] = None,
+    callers: Optional[Dict[str, ToolCaller]] = None,
+    idempotency: Optional[IdempotencyStore] = None,
 ):
+    ResponseModel = (
+        create_model(f"{endpoint_name}_response_model", **response_model_fields)
+        if response_model_fields
+        else Any
+    )
+
+    async def call(
+        connection: HTTPConnection, args: dict, progress_callback=None, raw=False
+    ):
+        """
+        Call the tool for a request, WebSocket or MCP gateway connection,
+        returning the CallToolResult with `raw`.
+        """
+        client_id = (
+            get_client_id(connection, scheduler.settings.client_header)
+            if scheduler
+            else None
+        )
+        affinity_key = affinity.get_key(connection) if affinity else None
+        async with (
+            affinity.session(affinity_key) if affinity_key else nullcontext(session)
+        ) as call_session:
+            result = await call_tool_endpoint(
+                call_session,
+                endpoint_name,
+                args,
+                limits,
+                status,
+                progress_callback,
+                scheduler=scheduler,
+                client_id=client_id,
+                breaker=breaker,
+                retry=retry,
+                parse_text=parse_text,
+                recorder=recorder,
+                raw=raw,
+            )
+        if (
+            not raw
+            and validate_output
+            and response_model_fields
+            and not isinstance(result, Response)
+        ):
+            validate_tool_output(ResponseModel, result)
+        return result
+
+    async def submit(request: Request, args: dict):
+        """Call the tool, or start a job for it if the request asks for one."""
+        if jobs and is_async_request(request):
+            return jobs.submit(endpoint_name, partial(call, request, args))
+        return await call(request, args)
+
+    async def dispatch(request: Request, args: dict):
+        """Submit the call, once per idempotency key if the request has one."""
+        key = idempotency.get_key(request) if idempotency else None
+        if key is None:
+            result = await submit(request, args)
+            replayed = False
+        else:
+            result, replayed = await idempotency.run(
+                request,
+                endpoint_name,
+                key,
+                {"arguments": args, "async": bool(jobs and is_async_request(request))},
+                partial(submit, request, args),
+            )
+        if isinstance(result, Job):
+            result = job_accepted_response(request, result)
+        elif not isinstance(result, Response):
+            body_format = get_response_format(request)
+            if body_format:
+                result = encode_response(result, body_format)
+            elif response_model_fields or replayed:
+                # The response model documents the output; returning a response
+                # skips FastAPI validating and re-serializing the result through it
+                result = JSONResponse(result)
+        if replayed:
+            result.headers[REPLAYED_HEADER] = "true"
+        return result
+
     if form_model_fields:
         FormModel = create_model(f"{endpoint_name}_form_model", **form_model_fields)
-        ResponseModel = (
-            create_model(f"{endpoint_name}_response_model", **response_model_fields)
-            if response_model_fields
-            else Any
-        )
 
         def make_endpoint_func(
             endpoint_name: str, FormModel, session: ClientSession
         ):  # Parameterized endpoint
-            async def tool(form_data: FormModel) -> ResponseModel:
+            async def tool(request: Request, form_data: FormModel) -> ResponseModel:
+                end_validation_span(request)
                 args = form_data.model_dump(exclude_none=True, by_alias=True)
                 print(f"Calling endpoint: {endpoint_name}, with args: {args}")
-                try:
-                    result = await session.call_tool(endpoint_name, arguments=args)
-
-                    if result.isError:
-                        error_message = "Unknown tool execution error"
-                        error_data = None  # Initialize error_data
-                        if result.content:
-                            if isinstance(result.content[0], types.TextContent):
-                                error_message = result.content[0].text
-                        detail = {"message": error_message}
-                        if error_data is not None:
-                            detail["data"] = error_data
-                        raise HTTPException(
-                            status_code=500,
-                            detail=detail,
-                        )
-
-                    response_data = process_tool_response(result)
-                    final_response = (
-                        response_data[0] if len(response_data) == 1 else response_data
-                    )
-                    return final_response
-
-                except McpError as e:
-                    print(
-                        f"MCP Error calling {endpoint_name}: {traceback.format_exc()}"
-                    )
-                    status_code = MCP_ERROR_TO_HTTP_STATUS.get(e.error.code, 500)
-                    raise HTTPException(
-                        status_code=status_code,
-                        detail=(
-                            {"message": e.error.message, "data": e.error.data}
-                            if e.error.data is not None
-                            else {"message": e.error.message}
-                        ),
-                    )
-                except Exception as e:
-                    print(
-                        f"Unexpected error calling {endpoint_name}: {traceback.format_exc()}"
-                    )
-                    raise HTTPException(
-                        status_code=500,
-                        detail={"message": "Unexpected error", "error": str(e)},
-                    )
+                return await dispatch(request, args)
 
             return tool
 
         tool_handler = make_endpoint_func(endpoint_name, FormModel, session)
     else:
+        FormModel = None
 
         def make_endpoint_func_no_args(
             endpoint_name: str, session: ClientSession
         ):  # Parameterless endpoint
-            async def tool():  # No parameters
+            async def tool(request: Request):  # No parameters
+                end_validation_span(request)
                 print(f"Calling endpoint: {endpoint_name}, with no args")
-                try:
-                    result = await session.call_tool(
-                        endpoint_name, arguments={}
-                    )  # Empty dict
-
-                    if result.isError:
-                        error_message = "Unknown tool execution error"
-                        if result.content:
-                            if isinstance(result.content[0], types.TextContent):
-                                error_message = result.content[0].text
-                        detail = {"message": error_message}
-                        raise HTTPException(
-                            status_code=500,
-                            detail=detail,
-                        )
-
-                    response_data = process_tool_response(result)
-                    final_response = (
-                        response_data[0] if len(response_data) == 1 else response_data
-                    )
-                    return final_response
-
-                except McpError as e:
-                    print(
-                        f"MCP Error calling {endpoint_name}: {traceback.format_exc()}"
-                    )
-                    status_code = MCP_ERROR_TO_HTTP_STATUS.get(e.error.code, 500)
-                    # Propagate the error received from MCP as an HTTP exception
-                    raise HTTPException(
-                        status_code=status_code,
-                        detail=(
-                            {"message": e.error.message, "data": e.error.data}
-                            if e.error.data is not None
-                            else {"message": e.error.message}
-                        ),
-                    )
-                except Exception as e:
-                    print(
-                        f"Unexpected error calling {endpoint_name}: {traceback.format_exc()}"
-                    )
-                    raise HTTPException(
-                        status_code=500,
-                        detail={"message": "Unexpected error", "error": str(e)},
-                    )
+                return await dispatch(request, {})  # Empty dict
 
             return tool
 
         tool_handler = make_endpoint_func_no_args(endpoint_name, session)
 
+    if callers is not None:
+        callers[endpoint_name] = ToolCaller(FormModel, call)
     return tool_handler
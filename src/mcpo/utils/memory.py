@@ -0,0 +1,235 @@
+import gc
+import os
+import time
+import tracemalloc
+import typing
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from mcpo.utils.auth import get_admin_router
+from mcpo.utils.health import get_process_rss, list_child_pids
+from mcpo.utils.main import ToolRoute
+
+SNAPSHOT_GROUPINGS = ("lineno", "filename", "traceback")
+
+# Allocations made by tracemalloc itself or by the import machinery are noise
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def collect_models(annotation: Any, seen: Set[type]):
+    """Add the Pydantic models reachable from a type annotation to `seen`."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        if annotation in seen:
+            return
+        seen.add(annotation)
+        for field in annotation.model_fields.values():
+            collect_models(field.annotation, seen)
+        return
+    for arg in typing.get_args(annotation):
+        collect_models(arg, seen)
+
+
+def get_app_memory(app: FastAPI) -> Dict[str, Any]:
+    """Count the objects a server app holds on to, and the RSS of its processes."""
+    models: Set[type] = set()
+    tool_routes = 0
+    for route in app.routes:
+        if isinstance(route, ToolRoute):
+            tool_routes += 1
+        for field in (
+            getattr(route, "body_field", None),
+            getattr(route, "response_field", None),
+        ):
+            if field is not None:
+                collect_models(field.type_, models)
+
+    state = app.state
+    status = getattr(state, "status", None)
+    pid = status.pid if status else None
+    affinity = getattr(state, "affinity", None)
+    jobs = getattr(state, "jobs", None)
+    return {
+        "routes": len(app.routes),
+        "tool_routes": tool_routes,
+        "models": len(models),
+        "pid": pid,
+        "rss": get_process_rss(pid) if pid is not None else None,
+        "affinity_rss": (
+            {
+                entry.pid: get_process_rss(entry.pid)
+                for entry in affinity.sessions.values()
+                if entry.pid
+            }
+            if affinity
+            else None
+        ),
+        "jobs": len(jobs.jobs) if jobs else None,
+        "buffered_job_results": (
+            sum(1 for job in jobs.jobs.values() if job.result is not None)
+            if jobs
+            else None
+        ),
+    }
+
+
+class MemoryProfiler:
+    """
+    On-demand tracemalloc snapshots, kept so later ones can be diffed against them.
+
+    Only the last `max_snapshots` snapshots are kept, since each holds every
+    traced allocation.
+    """
+
+    def __init__(self, max_snapshots: int = 5):
+        self.max_snapshots = max_snapshots
+        self.snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self.next_id = 1
+
+    def start(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def get_tracing(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced": current,
+            "peak": peak,
+            "snapshots": [
+                {"id": snapshot_id, "taken_at": taken_at}
+                for snapshot_id, (taken_at, _) in self.snapshots.items()
+            ],
+        }
+
+    def take_snapshot(
+        self, top: int = 20, group_by: str = "lineno", compare_to: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Take and keep a snapshot, returning its top allocations, or the top
+        differences from snapshot `compare_to`.
+        """
+        if not tracemalloc.is_tracing():
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "tracemalloc is not tracing, start it first"},
+            )
+        if group_by not in SNAPSHOT_GROUPINGS:
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "message": f"Invalid group_by '{group_by}', "
+                    f"expected one of {SNAPSHOT_GROUPINGS}"
+                },
+            )
+        previous = None
+        if compare_to is not None:
+            if compare_to not in self.snapshots:
+                raise HTTPException(
+                    status_code=404,
+                    detail={"message": f"Snapshot {compare_to} not found"},
+                )
+            previous = self.snapshots[compare_to][1]
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        snapshot_id = self.next_id
+        self.next_id += 1
+        self.snapshots[snapshot_id] = (time.time(), snapshot)
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+
+        if previous is not None:
+            stats = snapshot.compare_to(previous, group_by)[:top]
+            allocations = [
+                {
+                    "location": format_traceback(stat.traceback),
+                    "size": stat.size,
+                    "size_diff": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats
+            ]
+        else:
+            allocations = [
+                {
+                    "location": format_traceback(stat.traceback),
+                    "size": stat.size,
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics(group_by)[:top]
+            ]
+        return {
+            "id": snapshot_id,
+            "compared_to": compare_to,
+            "total": sum(trace.size for trace in snapshot.traces),
+            "allocations": allocations,
+        }
+
+
+def format_traceback(traceback: tracemalloc.Traceback) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+def add_memory_routes(
+    app: FastAPI,
+    servers: List[FastAPI],
+    profiler: MemoryProfiler,
+    api_dependency=None,
+):
+    """
+    Add memory introspection endpoints to the main app.
+    """
+    router = get_admin_router(api_dependency)
+
+    @router.get("/memory")
+    async def get_memory():
+        server_memory = {}
+        for server in servers:
+            name = getattr(server.state, "server_name", None) or server.title
+            server_memory[name] = get_app_memory(server)
+        return {
+            "rss": get_process_rss(os.getpid()),
+            "children": {pid: get_process_rss(pid) for pid in list_child_pids()},
+            "gc": {
+                "counts": gc.get_count(),
+                "objects": len(gc.get_objects()),
+            },
+            "tracemalloc": profiler.get_tracing(),
+            "servers": server_memory,
+        }
+
+    @router.post("/memory/tracemalloc/start")
+    async def start_tracemalloc(frames: int = 1):
+        profiler.start(frames)
+        return profiler.get_tracing()
+
+    @router.post("/memory/tracemalloc/stop")
+    async def stop_tracemalloc():
+        profiler.stop()
+        return profiler.get_tracing()
+
+    @router.post("/memory/snapshots")
+    async def take_snapshot(
+        top: int = 20, group_by: str = "lineno", compare_to: Optional[int] = None
+    ):
+        # Snapshots walk every traced allocation, keep that off the event loop
+        return await run_in_threadpool(
+            profiler.take_snapshot, top, group_by, compare_to
+        )
+
+    app.include_router(router)
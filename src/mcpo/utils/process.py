@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mcpo.utils.health import get_process_rss, is_process_alive, list_child_pids
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Period of cgroup v2 `cpu.max` quotas, in microseconds
+CPU_PERIOD = 100000
+
+
+@dataclass(frozen=True)
+class ProcessLimits:
+    """
+    Resource limits of a stdio server's subprocess and the processes it starts.
+
+    Limits are applied to the subprocess once it is running, and to each
+    process it starts as the supervisor finds them.
+    """
+
+    enabled: bool = False
+    # RLIMIT_AS and RLIMIT_NOFILE of each process
+    max_address_space: Optional[int] = None
+    max_open_files: Optional[int] = None
+    # Resident memory of the whole process tree in bytes. The server is killed
+    # and restarted when it uses more, and it is the cgroup's `memory.max`.
+    max_rss: Optional[int] = None
+    nice: Optional[int] = None
+    cpu_affinity: Optional[Tuple[int, ...]] = None
+    # Parent cgroup v2 directory, mcpo must be allowed to create cgroups in it
+    cgroup: Optional[str] = None
+    # Share of one CPU the cgroup may use, as its `cpu.max`
+    cpu_quota: Optional[float] = None
+    # Start the server with only a minimal environment, plus its `env`
+    inherit_env: bool = True
+    check_interval: float = 5.0
+    restart: bool = True
+    max_restart_delay: float = 30.0
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "ProcessLimits" = None
+    ) -> "ProcessLimits":
+        """Apply a `process` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        cpu_affinity = config.get("cpuAffinity", defaults.cpu_affinity)
+        return cls(
+            enabled=bool(config.get("enabled", bool(config) or defaults.enabled)),
+            max_address_space=config.get("maxAddressSpace", defaults.max_address_space),
+            max_open_files=config.get("maxOpenFiles", defaults.max_open_files),
+            max_rss=config.get("maxRss", defaults.max_rss),
+            nice=config.get("nice", defaults.nice),
+            cpu_affinity=tuple(cpu_affinity) if cpu_affinity is not None else None,
+            cgroup=config.get("cgroup", defaults.cgroup),
+            cpu_quota=config.get("cpuQuota", defaults.cpu_quota),
+            inherit_env=config.get("inheritEnv", defaults.inherit_env),
+            check_interval=config.get("checkInterval", defaults.check_interval),
+            restart=config.get("restart", defaults.restart),
+            max_restart_delay=config.get("maxRestartDelay", defaults.max_restart_delay),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "max_address_space": self.max_address_space,
+            "max_open_files": self.max_open_files,
+            "max_rss": self.max_rss,
+            "nice": self.nice,
+            "cpu_affinity": self.cpu_affinity,
+            "cgroup": self.cgroup,
+            "cpu_quota": self.cpu_quota,
+        }
+
+
+def list_process_tree(pid: int) -> List[int]:
+    """Return `pid` and all of its descendants, parents first."""
+    pids, index = [pid], 0
+    while index < len(pids):
+        pids.extend(list_child_pids(pids[index]))
+        index += 1
+    return pids
+
+
+def get_process_cpu_time(pid: int) -> Optional[float]:
+    """User and system CPU time of a process in seconds, read from /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # utime and stime are the 14th and 15th fields, counted from the
+            # state field that follows the parenthesised command name
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def set_rlimit(pid: int, limit: int, value: int):
+    _, hard = resource.prlimit(pid, limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.prlimit(pid, limit, (value, value))
+
+
+def apply_limits(pid: int, limits: ProcessLimits):
+    """Apply the rlimits, priority and CPU affinity of `limits` to one process."""
+    if resource is not None and hasattr(resource, "prlimit"):
+        if limits.max_address_space:
+            set_rlimit(pid, resource.RLIMIT_AS, limits.max_address_space)
+        if limits.max_open_files:
+            set_rlimit(pid, resource.RLIMIT_NOFILE, limits.max_open_files)
+    if limits.nice is not None:
+        os.setpriority(os.PRIO_PROCESS, pid, limits.nice)
+    if limits.cpu_affinity:
+        os.sched_setaffinity(pid, limits.cpu_affinity)
+
+
+def create_cgroup(limits: ProcessLimits, name: str) -> Optional[str]:
+    """Create the cgroup v2 of a server under `limits.cgroup`, None if unavailable."""
+    if not os.path.exists(os.path.join(limits.cgroup, "cgroup.procs")):
+        logger.warning(f"'{limits.cgroup}' is not a cgroup v2 directory")
+        return None
+    path = os.path.join(limits.cgroup, f"mcpo-{name}")
+    try:
+        os.makedirs(path, exist_ok=True)
+        if limits.max_rss:
+            with open(os.path.join(path, "memory.max"), "w") as f:
+                f.write(str(limits.max_rss))
+        if limits.cpu_quota:
+            with open(os.path.join(path, "cpu.max"), "w") as f:
+                f.write(f"{int(limits.cpu_quota * CPU_PERIOD)} {CPU_PERIOD}")
+    except OSError as e:
+        logger.warning(f"Failed to set up cgroup '{path}': {e}")
+        return None
+    return path
+
+
+class RestartableSession:
+    """Session proxy that follows the server across restarts."""
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+class ProcessSupervisor:
+    """
+    Runs a stdio server's session, limiting and watching its processes.
+
+    Every `check_interval` seconds, limits are applied to new processes of
+    the server and its CPU time and memory are sampled. When the process tree
+    uses more than `max_rss`, or the server exits (e.g. killed by an rlimit or
+    the cgroup), it is killed and connected again, with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limits: ProcessLimits,
+        connect: Callable,
+        status=None,
+        on_restart: List[Callable[[], None]] = (),
+    ):
+        self.name = name
+        self.limits = limits
+        self.connect = connect
+        self.status = status
+        self.on_restart = list(on_restart)
+        self.session = RestartableSession()
+        self.pid: Optional[int] = None
+        self.cgroup: Optional[str] = None
+        self.limited = set()
+        self.ready = asyncio.Event()
+        self.stop = asyncio.Event()
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self.restarts = 0
+        self.last_restart_reason: Optional[str] = None
+        self.pids = 0
+        self.rss: Optional[int] = None
+        self.cpu_time: Optional[float] = None
+        self.cpu_percent: Optional[float] = None
+        self.sampled_at: Optional[float] = None
+
+    def limit_processes(self, pids: List[int]):
+        for pid in pids:
+            if pid in self.limited:
+                continue
+            self.limited.add(pid)
+            try:
+                apply_limits(pid, self.limits)
+                if self.cgroup:
+                    with open(os.path.join(self.cgroup, "cgroup.procs"), "w") as f:
+                        f.write(str(pid))
+            except OSError as e:
+                logger.warning(f"Failed to limit process {pid} of '{self.name}': {e}")
+
+    def sample(self) -> Optional[str]:
+        """Apply limits to new processes and sample usage, returning why to restart."""
+        if not is_process_alive(self.pid):
+            return "exited"
+        pids = list_process_tree(self.pid)
+        self.limit_processes(pids)
+        # Processes that exited are limited no more, and their PIDs may be reused
+        self.limited.intersection_update(pids)
+
+        now = time.monotonic()
+        rss = sum(get_process_rss(pid) or 0 for pid in pids)
+        cpu_time = sum(get_process_cpu_time(pid) or 0 for pid in pids)
+        if self.sampled_at is not None and self.cpu_time is not None:
+            elapsed = now - self.sampled_at
+            if elapsed > 0:
+                self.cpu_percent = max(cpu_time - self.cpu_time, 0) / elapsed * 100
+        self.pids, self.rss = len(pids), rss
+        self.cpu_time, self.sampled_at = cpu_time, now
+        if self.limits.max_rss and rss > self.limits.max_rss:
+            return f"RSS of {rss} bytes exceeds {self.limits.max_rss}"
+        return None
+
+    def kill(self):
+        # Children first, so they are not reparented and left running
+        for pid in reversed(list_process_tree(self.pid)):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    async def watch(self) -> Optional[str]:
+        """Sample the server until it must restart, returning why, or until stopped."""
+        while True:
+            reason = self.sample()
+            if reason:
+                return reason
+            try:
+                await asyncio.wait_for(self.stop.wait(), self.limits.check_interval)
+                return None
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        delay = min(1.0, self.limits.max_restart_delay)
+        while True:
+            reason = None
+            started = time.monotonic()
+            try:
+                async with self.connect() as (session, pid):
+                    if self.ready.is_set():
+                        # The first session is initialized by the app
+                        await session.initialize()
+                        for callback in self.on_restart:
+                            callback()
+                        if self.status:
+                            self.status.set_ready(pid=pid)
+                    self.session.session, self.pid = session, pid
+                    self.rss = self.cpu_time = self.cpu_percent = None
+                    self.sampled_at = None
+                    if pid is not None:
+                        self.limit_processes([pid])
+                    self.ready.set()
+                    if pid is None:
+                        await self.stop.wait()
+                    else:
+                        reason = await self.watch()
+                    if reason == "exited":
+                        logger.warning(f"MCP server '{self.name}' exited")
+                    elif reason:
+                        logger.warning(f"Killing MCP server '{self.name}': {reason}")
+                        self.kill()
+            except Exception as e:
+                if not self.ready.is_set():
+                    self.error = e
+                    self.ready.set()
+                    return
+                reason = reason or str(e) or type(e).__name__
+                logger.error(f"MCP server '{self.name}' failed: {reason}")
+
+            if self.stop.is_set():
+                return
+            self.last_restart_reason = reason
+            if not self.limits.restart:
+                if self.status:
+                    self.status.set_failed(RuntimeError(reason))
+                return
+            # Back off from servers that keep failing right after starting
+            if time.monotonic() - started > self.limits.max_restart_delay:
+                delay = min(1.0, self.limits.max_restart_delay)
+            try:
+                await asyncio.wait_for(self.stop.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.limits.max_restart_delay)
+            self.restarts += 1
+            logger.info(f"Restarting MCP server '{self.name}'")
+
+    def to_dict(self) -> dict:
+        return {
+            "pid": self.pid,
+            "processes": self.pids,
+            "rss": self.rss,
+            "cpu_time": self.cpu_time,
+            "cpu_percent": self.cpu_percent,
+            "restarts": self.restarts,
+            "last_restart_reason": self.last_restart_reason,
+            "cgroup": self.cgroup,
+            "limits": self.limits.to_dict(),
+        }
+
+
+@asynccontextmanager
+async def supervise_server(
+    name: str,
+    limits: ProcessLimits,
+    connect: Callable,
+    status=None,
+    on_restart: List[Callable[[], None]] = (),
+):
+    """
+    Run a server's sessions from `connect()` under a ProcessSupervisor,
+    yielding a session that stays valid across restarts and the first PID.
+    """
+    supervisor = ProcessSupervisor(name, limits, connect, status, on_restart)
+    if limits.cgroup:
+        supervisor.cgroup = create_cgroup(limits, name)
+    if status:
+        status.process = supervisor
+    supervisor.task = asyncio.create_task(supervisor.run())
+    try:
+        await supervisor.ready.wait()
+        if supervisor.error is not None:
+            raise supervisor.error
+        yield supervisor.session, supervisor.pid
+    finally:
+        supervisor.stop.set()
+        await supervisor.task
+        if supervisor.cgroup:
+            try:
+                os.rmdir(supervisor.cgroup)
+            except OSError as e:
+                logger.debug(f"Failed to remove cgroup '{supervisor.cgroup}': {e}")
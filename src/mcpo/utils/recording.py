@@ -0,0 +1,168 @@
+import gzip
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+REDACTED = "[REDACTED]"
+
+# Keys whose values are redacted wherever they appear, matched as substrings
+# of the lowercased key
+DEFAULT_REDACT_KEYS = (
+    "password",
+    "passwd",
+    "secret",
+    "token",
+    "api_key",
+    "apikey",
+    "authorization",
+    "cookie",
+    "credential",
+)
+
+
+@dataclass(frozen=True)
+class RecordingSettings:
+    """Settings of the traffic recording of a server."""
+
+    enabled: bool = False
+    sample_rate: float = 1.0
+    redact: Tuple[str, ...] = DEFAULT_REDACT_KEYS
+    redact_text: bool = False
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "RecordingSettings" = None
+    ) -> "RecordingSettings":
+        """Apply a `recording` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", defaults.enabled)),
+            sample_rate=config.get("sampleRate", defaults.sample_rate),
+            redact=defaults.redact
+            + tuple(key.lower() for key in config.get("redact", ())),
+            redact_text=config.get("redactText", defaults.redact_text),
+        )
+
+
+class TrafficLog:
+    """
+    Append-only JSON Lines file of recorded traffic, gzipped if the path ends
+    in `.gz`.
+
+    Records are buffered and written by a single worker thread, so recording
+    does not block the event loop on disk or compression and batches are
+    written in order.
+    """
+
+    def __init__(self, path: str, flush_every: int = 64):
+        self.path = path
+        self.flush_every = flush_every
+        self.buffer: List[str] = []
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        opener = gzip.open if path.endswith(".gz") else open
+        self.file = opener(path, "at", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]):
+        self.buffer.append(json.dumps(record, separators=(",", ":")))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        lines, self.buffer = self.buffer, []
+        if lines:
+            self.writer.submit(self.write_lines, lines)
+
+    def write_lines(self, lines: List[str]):
+        self.file.write("".join(f"{line}\n" for line in lines))
+
+    def close(self):
+        """Write the buffered records and close the file."""
+        self.flush()
+        self.writer.shutdown(wait=True)
+        self.file.close()
+
+
+def redact(value: Any, keys: Tuple[str, ...]) -> Any:
+    """Replace the values of keys containing one of `keys`, recursively."""
+    if isinstance(value, dict):
+        return {
+            key: (
+                REDACTED
+                if any(k in str(key).lower() for k in keys)
+                else redact(item, keys)
+            )
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item, keys) for item in value]
+    return value
+
+
+class TrafficRecorder:
+    """Sample a server's tool calls and their results into a `TrafficLog`."""
+
+    def __init__(
+        self, log: TrafficLog, settings: RecordingSettings, server: Optional[str]
+    ):
+        self.log = log
+        self.settings = settings
+        self.server = server
+
+    def record_tools(self, tools: List[types.Tool]):
+        """Record the tool list, which the replay backend serves."""
+        self.log.write(
+            {
+                "type": "tools",
+                "server": self.server,
+                "tools": [
+                    tool.model_dump(mode="json", by_alias=True, exclude_none=True)
+                    for tool in tools
+                ],
+            }
+        )
+
+    def sampled(self) -> bool:
+        return random.random() < self.settings.sample_rate
+
+    def record_call(
+        self,
+        tool: str,
+        arguments: dict,
+        latency: float,
+        result: Optional[types.CallToolResult] = None,
+        error: Optional[McpError] = None,
+    ):
+        record = {
+            "type": "call",
+            "server": self.server,
+            "tool": tool,
+            "time": time.time(),
+            "latency": round(latency, 6),
+            "arguments": redact(arguments, self.settings.redact),
+        }
+        if error is not None:
+            record["error"] = error.error.model_dump(mode="json", exclude_none=True)
+        else:
+            record["result"] = self.dump_result(result)
+        self.log.write(record)
+
+    def dump_result(self, result: types.CallToolResult) -> Dict[str, Any]:
+        data = result.model_dump(mode="json", by_alias=True, exclude_none=True)
+        if data.get("structuredContent") is not None:
+            data["structuredContent"] = redact(
+                data["structuredContent"], self.settings.redact
+            )
+        if self.settings.redact_text:
+            # Keep the size of text content, which matters for replay, but not
+            # what it says
+            for content in data.get("content", []):
+                if content.get("type") == "text":
+                    content["text"] = "x" * len(content["text"])
+        return data
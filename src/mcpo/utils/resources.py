@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Body, FastAPI, HTTPException
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from mcpo.utils.auth import get_admin_router
+from mcpo.utils.main import MCP_ERROR_TO_HTTP_STATUS, add_notification_listener
+
+logger = logging.getLogger(__name__)
+
+# Error code MCP servers use for unknown resource URIs
+RESOURCE_NOT_FOUND = -32002
+
+
+@dataclass(frozen=True)
+class ResourceSettings:
+    """Settings of the resource and prompt endpoints of a server."""
+
+    enabled: bool = False
+    # Total size of cached resource contents in bytes, 0 disables caching
+    cache_size: int = 16 * 1024 * 1024
+    # Resources of servers without subscriptions are only cached with a TTL,
+    # which also bounds how long subscribed resources are kept
+    ttl: Optional[float] = None
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "ResourceSettings" = None
+    ) -> "ResourceSettings":
+        """Apply a `resources` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", bool(config) or defaults.enabled)),
+            cache_size=config.get("cacheSize", defaults.cache_size),
+            ttl=config.get("ttl", defaults.ttl),
+        )
+
+
+def get_contents_size(result: types.ReadResourceResult) -> int:
+    size = 0
+    for contents in result.contents:
+        if isinstance(contents, types.TextResourceContents):
+            size += len(contents.text)
+        else:
+            size += len(contents.blob)
+    return size
+
+
+class ResourceCache:
+    """
+    Size-bounded LRU cache of resource reads from one MCP server.
+
+    When the server supports subscriptions, mcpo subscribes to each resource
+    before reading it and drops it from the cache on `resources/updated`, so
+    cached reads are never stale. Without subscriptions, reads are only
+    cached if a TTL is set. Concurrent reads of the same resource share a
+    single request to the server.
+    """
+
+    def __init__(self, settings: ResourceSettings):
+        self.settings = settings
+        self.subscribe = False
+        # URI -> (result, size, time cached), least recently read first
+        self.entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.size = 0
+        self.subscribed = set()
+        # Bumped when a resource is updated, so reads in flight are not cached
+        self.generations: Dict[str, int] = {}
+        self.reads: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.cache_size > 0 and (
+            self.subscribe or self.settings.ttl is not None
+        )
+
+    def get(self, uri: str) -> Optional[types.ReadResourceResult]:
+        entry = self.entries.get(uri)
+        if entry is None:
+            return None
+        result, _, cached_at = entry
+        if self.settings.ttl is not None and (
+            time.monotonic() - cached_at > self.settings.ttl
+        ):
+            self.remove(uri)
+            return None
+        self.entries.move_to_end(uri)
+        return result
+
+    def remove(self, uri: str):
+        entry = self.entries.pop(uri, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def invalidate(self, uri: str):
+        self.generations[uri] = self.generations.get(uri, 0) + 1
+        if uri in self.entries:
+            self.invalidations += 1
+            self.remove(uri)
+
+    def clear(self):
+        """Forget cached reads and subscriptions, e.g. after the server restarted."""
+        for uri in list(self.entries):
+            self.invalidate(uri)
+        self.subscribed.clear()
+
+    async def listener(self, notification):
+        if isinstance(notification, types.ResourceUpdatedNotification):
+            self.invalidate(str(notification.params.uri))
+
+    async def read(self, session, uri: str) -> types.ReadResourceResult:
+        if not self.enabled:
+            return await session.read_resource(uri)
+
+        result = self.get(uri)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+
+        pending = self.reads.get(uri)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self.reads[uri] = future
+        try:
+            result = await self.fetch(session, uri)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no other read waited for it
+            future.exception()
+            raise
+        finally:
+            del self.reads[uri]
+
+    async def fetch(self, session, uri: str) -> types.ReadResourceResult:
+        if self.subscribe and uri not in self.subscribed:
+            # Subscribing first, an update made while reading invalidates the read
+            await session.subscribe_resource(uri)
+            self.subscribed.add(uri)
+        generation = self.generations.get(uri, 0)
+        result = await session.read_resource(uri)
+
+        size = get_contents_size(result)
+        if size <= self.settings.cache_size and generation == self.generations.get(
+            uri, 0
+        ):
+            self.remove(uri)
+            self.entries[uri] = (result, size, time.monotonic())
+            self.size += size
+            while self.size > self.settings.cache_size:
+                evicted, _ = next(iter(self.entries.items()))
+                self.remove(evicted)
+                self.evictions += 1
+                await self.unsubscribe(session, evicted)
+        elif uri not in self.entries:
+            await self.unsubscribe(session, uri)
+        return result
+
+    async def unsubscribe(self, session, uri: str):
+        if uri not in self.subscribed:
+            return
+        self.subscribed.discard(uri)
+        try:
+            await session.unsubscribe_resource(uri)
+        except Exception as e:
+            logger.debug(f"Failed to unsubscribe from {uri}: {e}")
+
+    def to_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "subscribe": self.subscribe,
+            "subscriptions": len(self.subscribed),
+            "resources": len(self.entries),
+            "size": self.size,
+            "max_size": self.settings.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def get_session(app: FastAPI):
+    session = getattr(app.state, "session", None)
+    if session is None:
+        raise HTTPException(
+            status_code=503, detail={"message": "MCP server is not connected"}
+        )
+    return session
+
+
+def to_http_exception(e: McpError) -> HTTPException:
+    status_code = (
+        404
+        if e.error.code == RESOURCE_NOT_FOUND
+        else MCP_ERROR_TO_HTTP_STATUS.get(e.error.code, 500)
+    )
+    return HTTPException(
+        status_code=status_code,
+        detail=(
+            {"message": e.error.message, "data": e.error.data}
+            if e.error.data is not None
+            else {"message": e.error.message}
+        ),
+    )
+
+
+async def request_server(app: FastAPI, method: str, *args):
+    """Send a request to the app's MCP server, raising its errors as HTTP errors."""
+    session = get_session(app)
+    try:
+        return await getattr(session, method)(*args)
+    except McpError as e:
+        raise to_http_exception(e)
+
+
+def dump_result(result) -> dict:
+    return result.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+
+def setup_resource_cache(app: FastAPI, settings: ResourceSettings):
+    """Create the resource cache of a server app, invalidated by its notifications."""
+    app.state.resource_cache = ResourceCache(settings)
+    add_notification_listener(app, app.state.resource_cache.listener)
+
+
+def add_resource_routes(
+    app: FastAPI,
+    capabilities: Optional[types.ServerCapabilities],
+    api_dependency=None,
+):
+    """
+    Add endpoints listing and reading the resources and getting the prompts of
+    a server app, for what the server's capabilities include.
+    """
+    router = get_admin_router(api_dependency)
+    cache: ResourceCache = app.state.resource_cache
+
+    if capabilities and capabilities.resources:
+        cache.subscribe = bool(capabilities.resources.subscribe)
+
+        @router.get("/resources")
+        async def list_resources(cursor: Optional[str] = None):
+            return dump_result(await request_server(app, "list_resources", cursor))
+
+        @router.get("/resources/templates")
+        async def list_resource_templates(cursor: Optional[str] = None):
+            return dump_result(
+                await request_server(app, "list_resource_templates", cursor)
+            )
+
+        @router.get("/resources/read")
+        async def read_resource(uri: str):
+            try:
+                return dump_result(await cache.read(get_session(app), uri))
+            except McpError as e:
+                raise to_http_exception(e)
+
+        @router.get("/resources/cache")
+        async def get_resource_cache():
+            return cache.to_dict()
+
+    if capabilities and capabilities.prompts:
+
+        @router.get("/prompts")
+        async def list_prompts(cursor: Optional[str] = None):
+            return dump_result(await request_server(app, "list_prompts", cursor))
+
+        @router.post("/prompts/{name}")
+        async def get_prompt(
+            name: str, arguments: Optional[Dict[str, str]] = Body(None)
+        ):
+            return dump_result(await request_server(app, "get_prompt", name, arguments))
+
+    app.include_router(router)
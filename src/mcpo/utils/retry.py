@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import anyio
+import httpx
+from mcp import types
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+logger = logging.getLogger(__name__)
+
+# MCP error codes raised by the client session when the transport fails
+TRANSPORT_ERROR_CODES = (CONNECTION_CLOSED, httpx.codes.REQUEST_TIMEOUT)
+
+TRANSPORT_EXCEPTIONS = (
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def is_transport_error(error: BaseException) -> bool:
+    if isinstance(error, McpError):
+        return error.error.code in TRANSPORT_ERROR_CODES
+    return isinstance(error, TRANSPORT_EXCEPTIONS)
+
+
+def is_idempotent_tool(tool: types.Tool) -> bool:
+    """Whether the tool's annotations mark it as read-only or idempotent."""
+    annotations = tool.annotations
+    if annotations is None:
+        return False
+    return bool(annotations.readOnlyHint or annotations.idempotentHint)
+
+
+@dataclass(frozen=True)
+class RetrySettings:
+    """
+    Retry and hedging settings for idempotent tools.
+
+    `idempotent` overrides the tool's `readOnlyHint`/`idempotentHint`
+    annotations. Retries back off exponentially from `backoff` up to
+    `max_backoff` seconds with full jitter. With `hedge`, a second call is
+    sent once the first has taken longer than the `hedge_percentile` latency.
+    """
+
+    max_retries: int = 0
+    backoff: float = 0.1
+    max_backoff: float = 2.0
+    hedge: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_delay: float = 0.01
+    hedge_min_samples: int = 20
+    budget_ratio: float = 0.1
+    budget_burst: float = 10.0
+    idempotent: Optional[bool] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_retries > 0 or self.hedge
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "RetrySettings" = None
+    ) -> "RetrySettings":
+        """Apply a `retry` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        return cls(
+            max_retries=config.get("maxRetries", defaults.max_retries),
+            backoff=config.get("backoff", defaults.backoff),
+            max_backoff=config.get("maxBackoff", defaults.max_backoff),
+            hedge=config.get("hedge", defaults.hedge),
+            hedge_percentile=config.get("hedgePercentile", defaults.hedge_percentile),
+            hedge_min_delay=config.get("hedgeMinDelay", defaults.hedge_min_delay),
+            hedge_min_samples=config.get("hedgeMinSamples", defaults.hedge_min_samples),
+            budget_ratio=config.get("budgetRatio", defaults.budget_ratio),
+            budget_burst=config.get("budgetBurst", defaults.budget_burst),
+            idempotent=config.get("idempotent", defaults.idempotent),
+        )
+
+
+class RetryBudget:
+    """
+    Caps retries and hedges to `ratio` of all calls, plus a burst of `burst`.
+
+    Every call deposits `ratio` tokens and every retry or hedge withdraws one.
+    """
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.retries = 0
+        self.hedges = 0
+        self.exhausted = 0
+
+    def deposit(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            "tokens": self.tokens,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "exhausted": self.exhausted,
+        }
+
+
+class LatencyTracker:
+    """Latencies of the last `size` successful calls of a tool."""
+
+    def __init__(self, size: int = 100):
+        self.samples = deque(maxlen=size)
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        samples = sorted(self.samples)
+        index = min(len(samples) - 1, int(percentile * len(samples)))
+        return samples[index]
+
+
+class RetryPolicy:
+    """Retries and hedges calls to one tool, drawing on the server's budget."""
+
+    def __init__(self, settings: RetrySettings, budget: RetryBudget):
+        self.settings = settings
+        self.budget = budget
+        self.latency = LatencyTracker()
+
+    def get_hedge_delay(self) -> Optional[float]:
+        settings = self.settings
+        if not settings.hedge or len(self.latency.samples) < settings.hedge_min_samples:
+            return None
+        return max(
+            settings.hedge_min_delay,
+            self.latency.percentile(settings.hedge_percentile),
+        )
+
+    def get_backoff(self, attempt: int) -> float:
+        settings = self.settings
+        return random.uniform(
+            0, min(settings.max_backoff, settings.backoff * 2 ** (attempt - 1))
+        )
+
+    async def call(self, make_call: Callable[[], Awaitable[Any]]):
+        """Await `make_call()`, retrying transport errors and hedging slow calls."""
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await self.call_hedged(make_call)
+            except Exception as e:
+                if (
+                    not is_transport_error(e)
+                    or attempt >= self.settings.max_retries
+                    or not self.budget.withdraw()
+                ):
+                    raise
+                attempt += 1
+                self.budget.retries += 1
+                backoff = self.get_backoff(attempt)
+                logger.warning(
+                    f"Retrying tool call in {backoff:.3f}s after transport error: {e!r}"
+                )
+                await asyncio.sleep(backoff)
+
+    async def call_timed(self, make_call: Callable[[], Awaitable[Any]]):
+        started_at = time.monotonic()
+        result = await make_call()
+        self.latency.record(time.monotonic() - started_at)
+        return result
+
+    async def call_hedged(self, make_call: Callable[[], Awaitable[Any]]):
+        """Send a second call if the first outlasts the hedge delay; the first success wins."""
+        delay = self.get_hedge_delay()
+        if delay is None:
+            return await self.call_timed(make_call)
+
+        pending = {asyncio.create_task(self.call_timed(make_call))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self.budget.withdraw():
+                self.budget.hedges += 1
+                pending.add(asyncio.create_task(self.call_timed(make_call)))
+
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            # Cancel the losing call, or all calls if the request was cancelled
+            for task in pending:
+                task.cancel()
+
+
+@dataclass
+class ServerRetryPolicies:
+    """Retry settings of a server, with per-tool overrides and a shared budget."""
+
+    default: RetrySettings = field(default_factory=RetrySettings)
+    tools: Dict[str, RetrySettings] = field(default_factory=dict)
+    budget: RetryBudget = None
+
+    def __post_init__(self):
+        if self.budget is None:
+            self.budget = RetryBudget(
+                self.default.budget_ratio, self.default.budget_burst
+            )
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: RetrySettings = None
+    ) -> "ServerRetryPolicies":
+        config = config or {}
+        default = RetrySettings.from_config(config, defaults)
+        tools = {
+            tool_name: RetrySettings.from_config(tool_config, default)
+            for tool_name, tool_config in (config.get("tools") or {}).items()
+        }
+        return cls(default=default, tools=tools)
+
+    def for_tool(self, tool: types.Tool) -> Optional[RetryPolicy]:
+        """Return a policy for the tool if it is idempotent and retries are enabled."""
+        settings = self.tools.get(tool.name, self.default)
+        idempotent = settings.idempotent
+        if idempotent is None:
+            idempotent = is_idempotent_tool(tool)
+        if not (settings.enabled and idempotent):
+            return None
+        return RetryPolicy(settings, self.budget)
+
+
+def get_retry_policy(app, tool: types.Tool) -> Optional[RetryPolicy]:
+    policies = getattr(app.state, "retry_policies", None)
+    if policies is None:
+        return None
+    return policies.for_tool(tool)
@@ -0,0 +1,272 @@
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+
+from mcpo.utils.auth import get_admin_router, get_bearer_token
+from mcpo.utils.concurrency import AdaptiveLimit
+
+DEFAULT_CLASS = "default"
+
+DEFAULT_CLIENT_HEADER = "X-Client-ID"
+
+# Finish tags at or below the virtual time carry no history, prune them past this size
+MAX_IDLE_FLOWS = 1024
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    """A priority class gets `weight` times the share of a class with weight 1."""
+
+    weight: float = 1.0
+    max_queue: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "PriorityClass":
+        config = config or {}
+        weight = config.get("weight", 1.0)
+        if weight <= 0:
+            raise ValueError(f"Invalid priority class weight {weight}, must be > 0")
+        return cls(weight=weight, max_queue=config.get("maxQueue"))
+
+
+@dataclass(frozen=True)
+class SchedulerSettings:
+    """
+    Settings of the fair-share scheduler in front of a server's session.
+
+    Scheduling is disabled while `max_concurrent` is None.
+    """
+
+    max_concurrent: Optional[int] = None
+    client_header: str = DEFAULT_CLIENT_HEADER
+    default_class: str = DEFAULT_CLASS
+    classes: Dict[str, PriorityClass] = field(
+        default_factory=lambda: {DEFAULT_CLASS: PriorityClass()}
+    )
+    clients: Dict[str, str] = field(default_factory=dict)
+    tools: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent is not None
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[Dict[str, Any]], defaults: "SchedulerSettings" = None
+    ) -> "SchedulerSettings":
+        """Apply a `scheduling` config section on top of `defaults`."""
+        defaults = defaults or cls()
+        config = config or {}
+        if "classes" in config:
+            classes = {
+                name: PriorityClass.from_config(class_config)
+                for name, class_config in config["classes"].items()
+            }
+        else:
+            classes = dict(defaults.classes)
+        default_class = config.get("defaultClass", defaults.default_class)
+        classes.setdefault(default_class, PriorityClass())
+        clients = config.get("clients", defaults.clients)
+        tools = config.get("tools", defaults.tools)
+        for name in (*clients.values(), *tools.values()):
+            if name not in classes:
+                raise ValueError(
+                    f"Unknown priority class '{name}', "
+                    f"expected one of {tuple(classes)}"
+                )
+        return cls(
+            max_concurrent=config.get("maxConcurrent", defaults.max_concurrent),
+            client_header=config.get("clientHeader", defaults.client_header),
+            default_class=default_class,
+            classes=classes,
+            clients=clients,
+            tools=tools,
+        )
+
+
+class ClassMetrics:
+    def __init__(self):
+        self.queued = 0
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "queued": self.queued,
+            "active": self.active,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_time": self.wait_time / self.admitted if self.admitted else 0.0,
+            "max_wait_time": self.max_wait_time,
+        }
+
+
+class Ticket:
+    """A request waiting for, or holding, one of the scheduler's slots."""
+
+    def __init__(self, priority_class: str, flow: Tuple[str, str], start: float):
+        self.priority_class = priority_class
+        self.flow = flow
+        self.start = start
+        self.enqueued_at = time.monotonic()
+        self.future: Optional[asyncio.Future] = None
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing of tool calls across clients and priority classes.
+
+    Every (class, client) pair is a flow. Up to `max_concurrent` calls run at
+    once; beyond that, calls wait and are admitted in order of their virtual
+    finish time, so a flow's share of the slots is proportional to its class
+    weight and a busy client cannot starve others. With an adaptive `limit`,
+    the number of slots follows it instead of the fixed setting.
+    """
+
+    def __init__(
+        self, settings: SchedulerSettings, limit: Optional[AdaptiveLimit] = None
+    ):
+        self.settings = settings
+        self.limit = limit
+        self.active = 0
+        self.virtual_time = 0.0
+        self.finish_tags: Dict[Tuple[str, str], float] = {}
+        self.waiting: List[Tuple[float, int, Ticket]] = []
+        self.counter = itertools.count()
+        self.metrics = {name: ClassMetrics() for name in settings.classes}
+
+    @property
+    def max_concurrent(self) -> int:
+        return self.limit.limit if self.limit else self.settings.max_concurrent
+
+    def get_class(self, client_id: Optional[str], tool_name: str) -> str:
+        settings = self.settings
+        if client_id is not None and client_id in settings.clients:
+            return settings.clients[client_id]
+        return settings.tools.get(tool_name, settings.default_class)
+
+    async def acquire(self, client_id: Optional[str], tool_name: str) -> Ticket:
+        """
+        Wait for a slot and return the ticket to `release` once the call is done.
+
+        Raises 429 when the class queue is full.
+        """
+        priority_class = self.get_class(client_id, tool_name)
+        config = self.settings.classes[priority_class]
+        metrics = self.metrics[priority_class]
+        flow = (priority_class, client_id or "")
+
+        idle = self.active < self.max_concurrent and not self.waiting
+        if not idle and config.max_queue is not None:
+            if metrics.queued >= config.max_queue:
+                metrics.rejected += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail={"message": f"Queue for class '{priority_class}' is full"},
+                )
+
+        start = max(self.virtual_time, self.finish_tags.get(flow, 0.0))
+        finish = start + 1.0 / config.weight
+        self.finish_tags[flow] = finish
+        ticket = Ticket(priority_class, flow, start)
+        if idle:
+            self.admit(ticket)
+            return ticket
+
+        ticket.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (finish, next(self.counter), ticket))
+        metrics.queued += 1
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Admitted just before the waiter was cancelled
+                self.release(ticket)
+            else:
+                ticket.future.cancel()
+                metrics.queued -= 1
+            raise
+        return ticket
+
+    def admit(self, ticket: Ticket):
+        metrics = self.metrics[ticket.priority_class]
+        if ticket.future is not None:
+            metrics.queued -= 1
+            ticket.future.set_result(None)
+        self.virtual_time = max(self.virtual_time, ticket.start)
+        self.active += 1
+        metrics.active += 1
+        metrics.admitted += 1
+        wait_time = time.monotonic() - ticket.enqueued_at
+        metrics.wait_time += wait_time
+        metrics.max_wait_time = max(metrics.max_wait_time, wait_time)
+
+    def release(
+        self,
+        ticket: Ticket,
+        latency: Optional[float] = None,
+        failed: Optional[bool] = None,
+    ):
+        """
+        Free the slot of `ticket`. The latency and outcome of calls that
+        reached the server update the adaptive limit.
+        """
+        if self.limit and latency is not None and failed is not None:
+            self.limit.update(latency, self.active, failed)
+        self.active -= 1
+        self.metrics[ticket.priority_class].active -= 1
+        while self.waiting and self.active < self.max_concurrent:
+            _, _, next_ticket = heapq.heappop(self.waiting)
+            if next_ticket.future.cancelled():
+                continue
+            self.admit(next_ticket)
+        if len(self.finish_tags) > MAX_IDLE_FLOWS:
+            self.finish_tags = {
+                flow: tag
+                for flow, tag in self.finish_tags.items()
+                if tag > self.virtual_time
+            }
+
+    def to_dict(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "adaptive_limit": self.limit.to_dict() if self.limit else None,
+            "active": self.active,
+            "queued": sum(metrics.queued for metrics in self.metrics.values()),
+            "classes": {
+                name: {
+                    "weight": self.settings.classes[name].weight,
+                    **metrics.to_dict(),
+                }
+                for name, metrics in self.metrics.items()
+            },
+        }
+
+
+def get_client_id(request: Request, client_header: str) -> Optional[str]:
+    """Identify the client of a request by its client ID header or bearer API key."""
+    client_id = request.headers.get(client_header)
+    if client_id:
+        return client_id
+    return get_bearer_token(request)
+
+
+def add_scheduler_routes(app: FastAPI, api_dependency=None):
+    """
+    Add an endpoint reporting per-class queue metrics of the app's scheduler.
+    """
+    router = get_admin_router(api_dependency)
+
+    @router.get("/scheduler")
+    async def get_scheduler():
+        return app.state.scheduler.to_dict()
+
+    app.include_router(router)
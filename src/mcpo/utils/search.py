@@ -0,0 +1,396 @@
+import copy
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+from mcp import types
+
+from mcpo.utils.auth import get_admin_router, get_bearer_token
+from mcpo.utils.scheduling import DEFAULT_CLIENT_HEADER
+
+# Weight of a query term matching a word of each field of a tool
+FIELD_WEIGHTS = {"name": 4.0, "parameter": 2.0, "description": 1.0}
+# Matching only the start of a word counts for less than matching all of it
+PREFIX_WEIGHT = 0.5
+
+STOP_WORDS = frozenset(
+    ("a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is")
+    + ("it", "of", "on", "or", "that", "the", "this", "to", "with")
+)
+
+SCHEMA_REF_PREFIX = "#/components/schemas/"
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase words, breaking up snake_case and camelCase names."""
+    if not text:
+        return []
+    words = re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", text)
+    return [word.lower() for word in words if word.lower() not in STOP_WORDS]
+
+
+@dataclass(frozen=True)
+class ToolEntry:
+    server: Optional[str]
+    name: str
+    path: str
+    description: str
+    parameters: Tuple[str, ...]
+    tags: Tuple[str, ...]
+
+    def to_dict(self, score: Optional[float] = None) -> dict:
+        return {
+            "server": self.server,
+            "name": self.name,
+            "path": self.path,
+            "description": self.description,
+            "parameters": list(self.parameters),
+            "tags": list(self.tags),
+            "score": score,
+        }
+
+
+@dataclass(frozen=True)
+class ToolScope:
+    """Servers and tags a client's tool search and OpenAPI slices are limited to."""
+
+    servers: Optional[Tuple[str, ...]] = None
+    tags: Optional[Tuple[str, ...]] = None
+    # A scope this one narrows, which must allow the tool too
+    within: Optional["ToolScope"] = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ToolScope":
+        servers = config.get("servers")
+        tags = config.get("tags")
+        return cls(
+            servers=tuple(servers) if servers is not None else None,
+            tags=tuple(tags) if tags is not None else None,
+        )
+
+    def allows(self, entry: ToolEntry) -> bool:
+        if self.servers is not None and entry.server not in self.servers:
+            return False
+        if self.tags is not None and not set(self.tags) & set(entry.tags):
+            return False
+        return self.within is None or self.within.allows(entry)
+
+    def narrow(self, scope: "ToolScope") -> "ToolScope":
+        """This scope, limited to the tools `scope` allows."""
+        return replace(self, within=scope)
+
+
+class ToolIndex:
+    """
+    In-memory inverted index over tool names, descriptions and parameter names.
+
+    Servers add their tools as they start. Every change bumps `version`, which
+    keys caches built from search results.
+    """
+
+    def __init__(self):
+        self.entries: Dict[int, ToolEntry] = {}
+        self.server_entries: Dict[Optional[str], List[int]] = {}
+        # Word -> entry ID -> weight of the word in the entry
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.vocabulary: Optional[List[str]] = None
+        self.next_id = 0
+        self.version = 0
+
+    def add_server(
+        self,
+        server: Optional[str],
+        tools: Iterable[types.Tool],
+        path: str = "",
+        tags: Iterable[str] = (),
+    ):
+        """Index the tools of a server, replacing any indexed before."""
+        self.remove_server(server)
+        entry_ids = self.server_entries[server] = []
+        for tool in tools:
+            properties = (tool.inputSchema or {}).get("properties", {})
+            entry = ToolEntry(
+                server=server,
+                name=tool.name,
+                path=f"{path}/{tool.name}",
+                description=tool.description or "",
+                parameters=tuple(properties),
+                tags=tuple(tags),
+            )
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = entry
+            entry_ids.append(entry_id)
+
+            words = [(word, "name") for word in tokenize(tool.name)]
+            words.append((tool.name.lower(), "name"))
+            for parameter in entry.parameters:
+                words.extend((word, "parameter") for word in tokenize(parameter))
+            words.extend((word, "description") for word in tokenize(entry.description))
+            for word, field in words:
+                postings = self.postings.setdefault(word, {})
+                postings[entry_id] = postings.get(entry_id, 0.0) + FIELD_WEIGHTS[field]
+        self.vocabulary = None
+        self.version += 1
+
+    def remove_server(self, server: Optional[str]):
+        entry_ids = self.server_entries.pop(server, None)
+        if not entry_ids:
+            return
+        removed = set(entry_ids)
+        for entry_id in entry_ids:
+            del self.entries[entry_id]
+        for word in list(self.postings):
+            postings = self.postings[word]
+            for entry_id in removed & postings.keys():
+                del postings[entry_id]
+            if not postings:
+                del self.postings[word]
+        self.vocabulary = None
+        self.version += 1
+
+    def match(self, term: str) -> Dict[int, float]:
+        """Score entries containing `term` as a word or as the start of one."""
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        scores: Dict[int, float] = dict(self.postings.get(term, {}))
+        start = bisect_left(self.vocabulary, term)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            if word == term:
+                continue
+            for entry_id, weight in self.postings[word].items():
+                scores[entry_id] = max(
+                    scores.get(entry_id, 0.0), weight * PREFIX_WEIGHT
+                )
+        return scores
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        server: Optional[str] = None,
+        tag: Optional[str] = None,
+        scope: Optional[ToolScope] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[ToolEntry, Optional[float]]]:
+        """
+        Find tools matching any word of `query`, ranking tools matching more
+        words first, then by score. Without a query, all tools are returned.
+        """
+
+        def allowed(entry: ToolEntry) -> bool:
+            return (
+                (server is None or entry.server == server)
+                and (tag is None or tag in entry.tags)
+                and (scope is None or scope.allows(entry))
+            )
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            results = [
+                (entry, None) for entry in self.entries.values() if allowed(entry)
+            ]
+            results.sort(key=lambda result: (result[0].server or "", result[0].name))
+            return results[:limit] if limit is not None else results
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for term in terms:
+            for entry_id, score in self.match(term).items():
+                scores[entry_id] = scores.get(entry_id, 0.0) + score
+                matched[entry_id] = matched.get(entry_id, 0) + 1
+        ranked = sorted(
+            (entry_id for entry_id in scores if allowed(self.entries[entry_id])),
+            key=lambda entry_id: (
+                -matched[entry_id],
+                -scores[entry_id],
+                self.entries[entry_id].server or "",
+                self.entries[entry_id].name,
+            ),
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.entries[entry_id], scores[entry_id]) for entry_id in ranked]
+
+
+def collect_schema_refs(value: Any, refs: set):
+    if isinstance(value, dict):
+        ref = value.get("$ref")
+        if isinstance(ref, str) and ref.startswith(SCHEMA_REF_PREFIX):
+            refs.add(ref[len(SCHEMA_REF_PREFIX) :])
+        for item in value.values():
+            collect_schema_refs(item, refs)
+    elif isinstance(value, list):
+        for item in value:
+            collect_schema_refs(item, refs)
+
+
+def rename_schema_refs(value: Any, names: Dict[str, str]) -> Any:
+    if isinstance(value, dict):
+        renamed = {key: rename_schema_refs(item, names) for key, item in value.items()}
+        ref = value.get("$ref")
+        if isinstance(ref, str) and ref.startswith(SCHEMA_REF_PREFIX):
+            name = ref[len(SCHEMA_REF_PREFIX) :]
+            renamed["$ref"] = SCHEMA_REF_PREFIX + names.get(name, name)
+        return renamed
+    if isinstance(value, list):
+        return [rename_schema_refs(item, names) for item in value]
+    return value
+
+
+def slice_openapi(
+    info: dict, entries: Iterable[ToolEntry], servers: Dict[Optional[str], FastAPI]
+) -> dict:
+    """
+    Build an OpenAPI document with only the operations of `entries`, taken from
+    the documents of their servers, along with the schemas they reference.
+
+    Schemas whose name is already taken by a different schema of another
+    server are prefixed with their server's name.
+    """
+    paths: Dict[str, Any] = {}
+    schemas: Dict[str, Any] = {}
+    security_schemes: Dict[str, Any] = {}
+
+    by_server: Dict[Optional[str], List[ToolEntry]] = {}
+    for entry in entries:
+        by_server.setdefault(entry.server, []).append(entry)
+
+    for server_name, server_entries in by_server.items():
+        server = servers.get(server_name)
+        if server is None:
+            continue
+        document = server.openapi()
+        components = document.get("components", {})
+        server_schemas = components.get("schemas", {})
+        security_schemes.update(components.get("securitySchemes", {}))
+
+        path_items = {}
+        pending: set = set()
+        for entry in server_entries:
+            path_item = document.get("paths", {}).get(f"/{entry.name}")
+            if path_item is not None:
+                path_items[entry.path] = path_item
+                collect_schema_refs(path_item, pending)
+
+        needed: set = set()
+        while pending:
+            name = pending.pop()
+            if name in needed or name not in server_schemas:
+                continue
+            needed.add(name)
+            collect_schema_refs(server_schemas[name], pending)
+
+        names = {}
+        for name in sorted(needed):
+            if name in schemas and schemas[name] != server_schemas[name]:
+                names[name] = f"{server_name}__{name}"
+        for name in sorted(needed):
+            schemas[names.get(name, name)] = rename_schema_refs(
+                server_schemas[name], names
+            )
+        for path, path_item in path_items.items():
+            paths[path] = rename_schema_refs(path_item, names)
+
+    document = {"openapi": "3.1.0", "info": copy.deepcopy(info), "paths": paths}
+    components = {}
+    if schemas:
+        components["schemas"] = schemas
+    if security_schemes:
+        components["securitySchemes"] = security_schemes
+    if components:
+        document["components"] = components
+    return document
+
+
+class OpenAPISliceCache:
+    """The last `max_size` OpenAPI slices, keyed by filter and index version."""
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self.slices: "OrderedDict[tuple, dict]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[dict]:
+        document = self.slices.get(key)
+        if document is not None:
+            self.slices.move_to_end(key)
+        return document
+
+    def put(self, key: tuple, document: dict):
+        self.slices[key] = document
+        while len(self.slices) > self.max_size:
+            self.slices.popitem(last=False)
+
+
+def add_tool_search_routes(
+    app: FastAPI,
+    servers: List[FastAPI],
+    index: ToolIndex,
+    scopes: Optional[Dict[str, ToolScope]] = None,
+    client_header: str = DEFAULT_CLIENT_HEADER,
+    api_dependency=None,
+):
+    """
+    Add tool search and filtered OpenAPI endpoints to the main app.
+
+    Clients named in `scopes` only see the tools of their scope. The scope of
+    the bearer API key always applies; a client ID header can only narrow it.
+    """
+    router = get_admin_router(api_dependency)
+    cache = OpenAPISliceCache()
+
+    def get_scope(request: Request) -> Tuple[Any, Optional[ToolScope]]:
+        if not scopes:
+            return None, None
+        api_key = get_bearer_token(request)
+        key_scope = scopes.get(api_key) if api_key else None
+        client_id = request.headers.get(client_header)
+        client_scope = scopes.get(client_id) if client_id else None
+        if key_scope is None:
+            return (client_id, client_scope) if client_scope else (None, None)
+        if client_scope is None or client_id == api_key:
+            return api_key, key_scope
+        return (api_key, client_id), client_scope.narrow(key_scope)
+
+    @router.get("/tools/search")
+    async def search_tools(
+        request: Request,
+        q: Optional[str] = None,
+        server: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 20,
+    ):
+        if limit < 1:
+            raise HTTPException(
+                status_code=422, detail={"message": "limit must be at least 1"}
+            )
+        _, scope = get_scope(request)
+        results = index.search(q, server=server, tag=tag, scope=scope, limit=limit)
+        return {"tools": [entry.to_dict(score) for entry, score in results]}
+
+    @router.get("/tools/openapi.json")
+    async def get_openapi_slice(
+        request: Request,
+        q: Optional[str] = None,
+        server: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: Optional[int] = None,
+    ):
+        scope_name, scope = get_scope(request)
+        key = (index.version, q, server, tag, limit, scope_name)
+        document = cache.get(key)
+        if document is None:
+            results = index.search(q, server=server, tag=tag, scope=scope, limit=limit)
+            document = slice_openapi(
+                {"title": app.title, "version": app.version},
+                [entry for entry, _ in results],
+                {getattr(s.state, "server_name", None): s for s in servers},
+            )
+            cache.put(key, document)
+        return document
+
+    app.include_router(router)
@@ -0,0 +1,184 @@
+import base64
+import importlib.util
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from mcpo.utils.compression import select_encoding
+
+# msgpack and cbor2 are optional dependencies, only imported once a request or
+# response uses their format
+msgpack = None
+cbor2 = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class BinaryContent(str):
+    """
+    Base64 data (or a data URI of it) from a tool result.
+
+    It is a string in JSON responses, and raw bytes in MessagePack and CBOR
+    responses, where images become `{"mimeType": ..., "data": <bytes>}`.
+    """
+
+    def __new__(cls, text: str, data: str, mime_type: Optional[str] = None):
+        value = super().__new__(cls, text)
+        value.data = data
+        value.mime_type = mime_type
+        return value
+
+    def to_native(self):
+        data = base64.b64decode(self.data)
+        if self.mime_type is None:
+            return data
+        return {"mimeType": self.mime_type, "data": data}
+
+
+def to_native(value: Any) -> Any:
+    """
+    Replace the BinaryContent of a tool response with bytes.
+
+    BinaryContent only comes from processed content items, images or resource
+    blobs, so only the top level of the response is searched, not structured
+    content of any depth.
+    """
+    if isinstance(value, list):
+        return [to_native_item(item) for item in value]
+    return to_native_item(value)
+
+
+def to_native_item(value: Any) -> Any:
+    if isinstance(value, BinaryContent):
+        return value.to_native()
+    if isinstance(value, dict) and isinstance(value.get("blob"), BinaryContent):
+        return {**value, "blob": value["blob"].to_native()}
+    return value
+
+
+def from_native(value: Any) -> Any:
+    """Replace the bytes in a request body with base64, as JSON would carry them."""
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, dict):
+        return {key: from_native(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_native(item) for item in value]
+    return value
+
+
+def _import_msgpack():
+    global msgpack
+
+    if msgpack is None:
+        import msgpack
+    return msgpack
+
+
+def _import_cbor2():
+    global cbor2
+
+    if cbor2 is None:
+        import cbor2
+    return cbor2
+
+
+class MessagePackFormat:
+    name = "MessagePack"
+    module = "msgpack"
+    media_type = "application/msgpack"
+    aliases = ("application/x-msgpack", "application/vnd.msgpack")
+
+    def encode(self, content: Any) -> bytes:
+        return _import_msgpack().packb(to_native(content))
+
+    def decode(self, body: bytes) -> Any:
+        return _import_msgpack().unpackb(body)
+
+
+class CBORFormat:
+    name = "CBOR"
+    module = "cbor2"
+    media_type = "application/cbor"
+    aliases = ()
+
+    def encode(self, content: Any) -> bytes:
+        return _import_cbor2().dumps(to_native(content))
+
+    def decode(self, body: bytes) -> Any:
+        return _import_cbor2().loads(body)
+
+
+def get_available_formats() -> Dict[str, object]:
+    """Return the supported binary body formats keyed by media type, aliases included."""
+    formats = {}
+    for body_format in (MessagePackFormat(), CBORFormat()):
+        # Checking for the package does not import it
+        if importlib.util.find_spec(body_format.module) is None:
+            continue
+        for media_type in (body_format.media_type, *body_format.aliases):
+            formats[media_type] = body_format
+    return formats
+
+
+BODY_FORMATS = get_available_formats()
+
+BINARY_MEDIA_TYPES = (
+    MessagePackFormat.media_type,
+    *MessagePackFormat.aliases,
+    CBORFormat.media_type,
+)
+
+
+def get_request_format(request: Request):
+    """The binary format of a request body, None for JSON and other media types."""
+    content_type = request.headers.get("content-type", "")
+    media_type = content_type.partition(";")[0].strip().lower()
+    if media_type in BINARY_MEDIA_TYPES and media_type not in BODY_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail={
+                "message": f"{media_type} bodies need the 'binary' extra: pip install mcpo[binary]"
+            },
+        )
+    return BODY_FORMATS.get(media_type)
+
+
+def get_response_format(request: Request):
+    """The binary format the client prefers in its Accept header, None for JSON."""
+    accept = request.headers.get("accept")
+    if not accept or not BODY_FORMATS:
+        return None
+    # Accept has the same syntax as Accept-Encoding; JSON wins ties
+    media_type = select_encoding(accept, [JSON_MEDIA_TYPE, *BODY_FORMATS])
+    return BODY_FORMATS.get(media_type)
+
+
+async def decode_request(request: Request, body_format) -> Request:
+    """
+    Decode a binary request body, returning a request FastAPI validates like
+    the equivalent JSON request.
+    """
+    body = await request.body()
+    if not body:
+        return request
+    try:
+        data = from_native(body_format.decode(body))
+    except Exception:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": f"Invalid {body_format.name} request body"},
+        )
+
+    scope = dict(request.scope)
+    scope["headers"] = [
+        (key, value) for key, value in scope["headers"] if key != b"content-type"
+    ] + [(b"content-type", JSON_MEDIA_TYPE.encode())]
+    decoded = Request(scope, request.receive)
+    decoded._body = body
+    decoded._json = data
+    return decoded
+
+
+def encode_response(content: Any, body_format) -> Response:
+    return Response(body_format.encode(content), media_type=body_format.media_type)
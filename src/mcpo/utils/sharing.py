@@ -0,0 +1,203 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from fastapi import FastAPI
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+logger = logging.getLogger(__name__)
+
+
+def get_launch_key(app: FastAPI) -> Optional[Hashable]:
+    """What identifies the stdio server an app launches, None for other servers."""
+    if getattr(app.state, "server_type", "stdio") != "stdio":
+        return None
+    command = getattr(app.state, "command", None)
+    if not command:
+        return None
+    args = getattr(app.state, "args", [])
+    args = args if isinstance(args, list) else [args]
+    env = getattr(app.state, "env", {})
+    return command, tuple(args), tuple(sorted(env.items()))
+
+
+class SessionView:
+    """
+    A server app's view of an MCP session, which may be shared with other apps.
+
+    With `allowed_tools`, only those tools are listed and can be called. With
+    `shared`, initialization and resource subscriptions go through the
+    SharedServer, so apps sharing the session do not undo each other's.
+    """
+
+    def __init__(
+        self,
+        session,
+        allowed_tools: Optional[List[str]] = None,
+        shared: Optional["SharedServer"] = None,
+    ):
+        self.session = session
+        self.allowed_tools = (
+            frozenset(allowed_tools) if allowed_tools is not None else None
+        )
+        self.shared = shared
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    def is_allowed(self, name: str) -> bool:
+        return self.allowed_tools is None or name in self.allowed_tools
+
+    async def initialize(self) -> types.InitializeResult:
+        if self.shared is not None:
+            return await self.shared.initialize()
+        return await self.session.initialize()
+
+    async def subscribe_resource(self, uri) -> Any:
+        if self.shared is not None:
+            return await self.shared.subscribe_resource(uri)
+        return await self.session.subscribe_resource(uri)
+
+    async def unsubscribe_resource(self, uri) -> Any:
+        if self.shared is not None:
+            return await self.shared.unsubscribe_resource(uri)
+        return await self.session.unsubscribe_resource(uri)
+
+    async def list_tools(self, *args, **kwargs) -> types.ListToolsResult:
+        result = await self.session.list_tools(*args, **kwargs)
+        if self.allowed_tools is None:
+            return result
+        return result.model_copy(
+            update={
+                "tools": [tool for tool in result.tools if self.is_allowed(tool.name)]
+            }
+        )
+
+    async def call_tool(self, name: str, *args, **kwargs) -> types.CallToolResult:
+        if not self.is_allowed(name):
+            raise McpError(
+                types.ErrorData(
+                    code=types.INVALID_PARAMS, message=f"Unknown tool: {name}"
+                )
+            )
+        return await self.session.call_tool(name, *args, **kwargs)
+
+
+class SharedServer:
+    """
+    One MCP server session used by several server apps.
+
+    The session runs in its own task, so it can be opened by one app and
+    closed by another, and stays open until the last app releases it.
+    Notifications from the server are passed to the handlers of every app.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.refs = 0
+        self.handlers: Dict[FastAPI, Callable] = {}
+        self.session = None
+        self.pid: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        self.ready = asyncio.Event()
+        self.stop = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.initialize_lock = asyncio.Lock()
+        self.initialize_result: Optional[types.InitializeResult] = None
+        # Apps subscribed to each resource URI
+        self.subscriptions: Dict[str, int] = {}
+
+    async def message_handler(self, message):
+        for handler in list(self.handlers.values()):
+            await handler(message)
+
+    async def run(self, open_session):
+        try:
+            async with open_session(self.message_handler) as (session, pid):
+                self.session, self.pid = session, pid
+                self.ready.set()
+                await self.stop.wait()
+        except Exception as e:
+            if self.ready.is_set():
+                logger.error(f"Shared MCP server '{self.name}' failed: {e}")
+                return
+            self.error = e
+        finally:
+            self.ready.set()
+
+    async def initialize(self) -> types.InitializeResult:
+        # The MCP server is only initialized once, by whichever app comes first
+        async with self.initialize_lock:
+            if self.initialize_result is None:
+                self.initialize_result = await self.session.initialize()
+            return self.initialize_result
+
+    async def subscribe_resource(self, uri):
+        """Subscribe to a resource for one more app, once for the server."""
+        uri = str(uri)
+        self.subscriptions[uri] = self.subscriptions.get(uri, 0) + 1
+        if self.subscriptions[uri] > 1:
+            return
+        try:
+            await self.session.subscribe_resource(uri)
+        except BaseException:
+            self.release_subscription(uri)
+            raise
+
+    async def unsubscribe_resource(self, uri):
+        """Unsubscribe from a resource for one app, and for the server after the last."""
+        uri = str(uri)
+        if uri in self.subscriptions and self.release_subscription(uri):
+            await self.session.unsubscribe_resource(uri)
+
+    def release_subscription(self, uri: str) -> bool:
+        """Drop an app's subscription, returning whether it was the last one."""
+        self.subscriptions[uri] -= 1
+        if self.subscriptions[uri] > 0:
+            return False
+        del self.subscriptions[uri]
+        return True
+
+
+class SharedSessions:
+    """Sessions of identical stdio servers, shared between the apps that launch them."""
+
+    def __init__(self):
+        self.servers: Dict[Hashable, SharedServer] = {}
+
+    @asynccontextmanager
+    async def connect(
+        self,
+        app: FastAPI,
+        key: Hashable,
+        open_session: Callable,
+        message_handler: Callable,
+    ):
+        """
+        Yield the session, the server's PID and the SharedServer, which
+        initializes the server once and counts resource subscriptions. The
+        session is opened by `open_session(handler)`, unless another app
+        already opened the same server.
+        """
+        shared = self.servers.get(key)
+        if shared is None:
+            shared = self.servers[key] = SharedServer(app.title)
+            shared.task = asyncio.create_task(shared.run(open_session))
+        else:
+            logger.info(f"Sharing MCP server '{shared.name}' with '{app.title}'")
+        shared.refs += 1
+        shared.handlers[app] = message_handler
+        try:
+            await shared.ready.wait()
+            if shared.error is not None:
+                raise shared.error
+            yield shared.session, shared.pid, shared
+        finally:
+            shared.handlers.pop(app, None)
+            shared.refs -= 1
+            if shared.refs == 0:
+                del self.servers[key]
+                shared.stop.set()
+                await shared.task
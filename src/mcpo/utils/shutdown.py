@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from mcpo.utils.health import HEALTH_PATHS, get_server_statuses
+
+logger = logging.getLogger(__name__)
+
+# Close code telling WebSocket clients to reconnect, to another process
+WS_SERVICE_RESTART = 1012
+
+
+class DrainState:
+    """
+    Whether the server is draining, and until when.
+
+    Draining starts on the first SIGTERM (or SIGINT). From then on, new
+    requests are rejected while tool calls already running get until the
+    deadline to finish.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.deadline: Optional[float] = None
+
+    @property
+    def draining(self) -> bool:
+        return self.deadline is not None
+
+    def start(self):
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.timeout
+            logger.info(f"Draining, waiting up to {self.timeout}s for tool calls")
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return self.timeout
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    async def wait_idle(self, servers: List[FastAPI], interval: float = 0.05) -> bool:
+        """Wait until no tool call is running on any server, or the deadline passes."""
+        while True:
+            in_flight = sum(
+                status.in_flight for status in get_server_statuses(servers).values()
+            )
+            if in_flight == 0:
+                return True
+            if self.remaining() <= 0:
+                logger.warning(
+                    f"Drain deadline passed with {in_flight} call(s) running"
+                )
+                return False
+            await asyncio.sleep(min(interval, self.remaining()))
+
+
+class DrainMiddleware:
+    """Reject new requests and WebSocket connections while draining."""
+
+    def __init__(self, app: ASGIApp, drain: DrainState):
+        self.app = app
+        self.drain = drain
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            not self.drain.draining
+            or scope["type"] not in ("http", "websocket")
+            or scope["path"] in HEALTH_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": WS_SERVICE_RESTART})
+            return
+        response = JSONResponse(
+            status_code=503,
+            content={"detail": "Server is shutting down"},
+            headers={"Connection": "close", "Retry-After": "1"},
+        )
+        await response(scope, receive, send)
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn server that lets running tool calls finish before shutting down.
+
+    uvicorn stops listening and then waits for open connections, which
+    long-lived streams (WebSockets, MCP event streams) never close on their
+    own, and it fails WebSocket connections right away. Here listening stops
+    first, then tool calls on every transport (including async jobs) get
+    until the drain deadline to finish, and only then are connections shut
+    down, with whatever is left of the deadline.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        drain: DrainState,
+        mcp_servers: List[FastAPI],
+        on_drained: List[Callable[[], Awaitable[None]]] = (),
+    ):
+        super().__init__(config)
+        self.drain = drain
+        self.mcp_servers = mcp_servers
+        self.on_drained = list(on_drained)
+
+    def handle_exit(self, sig, frame):
+        self.drain.start()
+        super().handle_exit(sig, frame)
+
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None):
+        self.drain.start()
+        for server in getattr(self, "servers", ()):
+            server.close()
+        for sock in sockets or ():
+            sock.close()
+
+        if not self.force_exit:
+            await self.drain.wait_idle(self.mcp_servers)
+            for callback in self.on_drained:
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.warning(f"Failed to close streams on drain: {e}")
+        self.config.timeout_graceful_shutdown = self.drain.remaining()
+        await super().shutdown()
+
+
+class AppLifespan:
+    """The lifespan of a server app, run in its own task."""
+
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.started = asyncio.Event()
+        self.stop = asyncio.Event()
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self):
+        try:
+            async with self.app.router.lifespan_context(self.app):
+                self.started.set()
+                await self.stop.wait()
+        except Exception as e:
+            if self.started.is_set():
+                raise
+            self.error = e
+            self.started.set()
+
+
+@asynccontextmanager
+async def run_server_lifespans(apps: List[FastAPI]):
+    """
+    Start the lifespans of server apps concurrently, and shut them down in parallel.
+
+    Each lifespan runs in its own task, as the MCP client transports must be
+    entered and exited from the same task. Apps that fail to start are marked
+    failed, and abort startup unless they are optional.
+    """
+    lifespans = [AppLifespan(app) for app in apps]
+    try:
+        for lifespan in lifespans:
+            lifespan.task = asyncio.create_task(lifespan.run())
+        for lifespan in lifespans:
+            await lifespan.started.wait()
+        for lifespan in lifespans:
+            if lifespan.error is None:
+                continue
+            app = lifespan.app
+            status = getattr(app.state, "status", None)
+            if status:
+                status.set_failed(lifespan.error)
+            if not status or status.required:
+                raise lifespan.error
+            logger.error(
+                f"Failed to start optional MCP server '{app.title}': {lifespan.error}"
+            )
+        yield
+    finally:
+        for lifespan in lifespans:
+            lifespan.stop.set()
+        lifespans = [lifespan for lifespan in lifespans if lifespan.task]
+        results = await asyncio.gather(
+            *(lifespan.task for lifespan in lifespans), return_exceptions=True
+        )
+        for lifespan, result in zip(lifespans, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Error shutting down MCP server '{lifespan.app.title}': {result}"
+                )
+
+
+def create_listening_socket(
+    host: str, port: int, reuse_port: bool = False, fd: Optional[int] = None
+) -> socket.socket:
+    """
+    Open the socket to serve on, either inherited as file descriptor `fd` or
+    bound with SO_REUSEPORT so another mcpo process can listen on the same
+    port while this one drains.
+    """
+    if fd is not None:
+        sock = socket.socket(fileno=fd)
+        sock.setblocking(False)
+        return sock
+
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            sock.close()
+            raise ValueError("SO_REUSEPORT is not supported on this platform")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        sock.bind((host, port))
+    except OSError:
+        sock.close()
+        raise
+    sock.set_inheritable(True)
+    return sock
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Phases of each server's startup, in the order they happen
+SERVER_PHASES = ("spawn", "initialize", "list_tools", "models")
+
+
+class StartupReport:
+    """Time spent in each phase of startup, overall and per server."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.servers: Dict[str, Dict[str, float]] = {}
+        self.ready: Optional[float] = None
+
+    def record(self, phase: str, seconds: float, server: Optional[str] = None):
+        phases = self.phases if server is None else self.servers.setdefault(server, {})
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, phase: str, server: Optional[str] = None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started, server)
+
+    def format(self) -> str:
+        lines = [f"Startup report, ready after {self.ready:.3f}s:"]
+        for phase, seconds in self.phases.items():
+            lines.append(f"  {phase:<24}{seconds:>10.3f}s")
+        if self.servers:
+            width = max(max(len(server) for server in self.servers), 6) + 2
+            columns = SERVER_PHASES + ("total",)
+            lines.append(
+                f"  {'server':<{width}}" + "".join(f"{name:>12}" for name in columns)
+            )
+            for server, phases in self.servers.items():
+                values = [phases.get(phase) for phase in SERVER_PHASES]
+                values.append(sum(value or 0 for value in values))
+                lines.append(
+                    f"  {server:<{width}}"
+                    + "".join(
+                        f"{value:>11.3f}s" if value is not None else f"{'-':>12}"
+                        for value in values
+                    )
+                )
+        return "\n".join(lines)
+
+    async def log_when_started(self, server):
+        """Log the report once the uvicorn `server` accepts connections."""
+        while not server.started:
+            if server.should_exit:
+                return
+            await asyncio.sleep(0.01)
+        self.ready = time.perf_counter() - self.started
+        logger.info(self.format())
+
+
+def measure(report: Optional[StartupReport], phase: str, server: Optional[str] = None):
+    """Measure a phase of startup, or do nothing without a report."""
+    return report.measure(phase, server) if report else nullcontext()
@@ -0,0 +1,181 @@
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+
+# OpenTelemetry is an optional dependency, only imported once tracing is enabled
+propagate = None
+trace = None
+SpanKind = Status = StatusCode = None
+
+logger = logging.getLogger(__name__)
+
+# W3C trace context keys forwarded to backends through MCP `_meta` and HTTP headers
+PROPAGATED_KEYS = ("traceparent", "tracestate", "baggage")
+
+_enabled = False
+_tracer_provider = None
+
+
+def _import_opentelemetry() -> bool:
+    global propagate, trace, SpanKind, Status, StatusCode
+
+    if trace is not None:
+        return True
+    try:
+        from opentelemetry import propagate, trace
+        from opentelemetry.trace import SpanKind, Status, StatusCode
+    except ImportError:
+        return False
+    return True
+
+
+def configure_tracing(enabled: bool = True, tracer_provider=None) -> bool:
+    """
+    Enable or disable OpenTelemetry instrumentation of tool calls.
+
+    Args:
+        enabled: Whether spans should be recorded and trace context propagated
+        tracer_provider: Optional provider to use instead of the global one (useful for tests)
+
+    Returns:
+        True if tracing is active after the call
+    """
+    global _enabled, _tracer_provider
+
+    if enabled and not _import_opentelemetry():
+        logger.warning(
+            "OpenTelemetry is not installed, tracing is disabled. "
+            "Install it with `pip install mcpo[otel]`."
+        )
+        enabled = False
+
+    _enabled = enabled
+    _tracer_provider = tracer_provider
+    return _enabled
+
+
+def is_tracing_enabled() -> bool:
+    return _enabled
+
+
+def get_tracer():
+    return trace.get_tracer("mcpo", tracer_provider=_tracer_provider)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: str = "internal",
+    context=None,
+):
+    """Start a span as the current span, or do nothing when tracing is disabled."""
+    if not _enabled:
+        yield None
+        return
+
+    span_kind = {
+        "server": SpanKind.SERVER,
+        "client": SpanKind.CLIENT,
+    }.get(kind, SpanKind.INTERNAL)
+    with get_tracer().start_as_current_span(
+        name, context=context, kind=span_kind, attributes=attributes
+    ) as span:
+        yield span
+
+
+@contextmanager
+def start_request_span(request, server_name: str, tool_name: str):
+    """Start the server span for an incoming tool request, continuing any incoming trace."""
+    if not _enabled:
+        yield None
+        return
+
+    attributes = {
+        "http.request.method": request.method,
+        "url.path": request.url.path,
+        "mcpo.server.name": server_name,
+        "mcp.tool.name": tool_name,
+    }
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        attributes["mcpo.request.size"] = int(content_length)
+
+    with start_span(
+        f"{request.method} /{tool_name}",
+        attributes=attributes,
+        kind="server",
+        context=propagate.extract(request.headers),
+    ) as span:
+        yield span
+
+
+def set_span_attribute(span, key: str, value: Any):
+    if span is not None and value is not None:
+        span.set_attribute(key, value)
+
+
+def set_current_span_attribute(key: str, value: Any):
+    if _enabled and value is not None:
+        trace.get_current_span().set_attribute(key, value)
+
+
+def start_validation_span(request):
+    """
+    Open the validation span for a request. FastAPI reads and validates the body
+    before the tool handler runs, so the span is ended by the handler itself
+    (or by the route if validation fails).
+    """
+    if _enabled:
+        request.state.validation_span = get_tracer().start_span("mcpo.validate")
+
+
+def end_validation_span(request, error: Optional[BaseException] = None):
+    span = getattr(request.state, "validation_span", None)
+    if span is None:
+        return
+    request.state.validation_span = None
+    if error is not None:
+        span.record_exception(error)
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+    span.end()
+
+
+def get_trace_meta() -> Optional[Dict[str, str]]:
+    """Return the current trace context as an MCP `_meta` mapping, if tracing is enabled."""
+    if not _enabled:
+        return None
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier or None
+
+
+async def _propagate_meta_to_headers(request: httpx.Request):
+    """Copy trace context from the JSON-RPC `_meta` of an outgoing message into HTTP headers."""
+    if request.method != "POST" or not request.content:
+        return
+    try:
+        message = json.loads(request.content)
+    except ValueError:
+        return
+    if not isinstance(message, dict):
+        return
+    meta = (message.get("params") or {}).get("_meta") or {}
+    for key in PROPAGATED_KEYS:
+        if key in meta:
+            request.headers[key] = meta[key]
+
+
+def instrument_http_client(client: httpx.AsyncClient) -> httpx.AsyncClient:
+    """
+    Propagate trace context on an httpx client used by the SSE or streamable-HTTP transports.
+
+    The MCP transports write messages from a background task, so the trace context
+    of the calling request is not current when the HTTP request is sent. Instead it
+    is read back from the `_meta` of the message being posted.
+    """
+    client.event_hooks["request"].append(_propagate_meta_to_headers)
+    return client
@@ -0,0 +1,171 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from mcpo.utils.tracing import instrument_http_client, is_tracing_enabled
+
+logger = logging.getLogger(__name__)
+
+# Defaults used by the MCP SDK transports when no timeout is given
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_READ_TIMEOUT = 300.0
+
+
+def is_http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class TransportSettings:
+    """
+    Connection settings for the httpx client of an SSE or streamable-HTTP server.
+
+    Servers with equal settings on the same origin share one connection pool, so
+    keep-alive connections (and their TLS state) are reused across servers.
+    """
+
+    max_connections: Optional[int] = None
+    max_keepalive_connections: Optional[int] = 20
+    keepalive_expiry: Optional[float] = 5.0
+    http2: bool = False
+    connect_timeout: Optional[float] = None
+    read_timeout: Optional[float] = None
+    shared: bool = True
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "TransportSettings":
+        """Build settings from the `transport` section of a server config entry."""
+        config = config or {}
+        defaults = cls()
+        return cls(
+            max_connections=config.get("maxConnections", defaults.max_connections),
+            max_keepalive_connections=config.get(
+                "maxKeepaliveConnections", defaults.max_keepalive_connections
+            ),
+            keepalive_expiry=config.get("keepaliveExpiry", defaults.keepalive_expiry),
+            http2=bool(config.get("http2", defaults.http2)),
+            connect_timeout=config.get("connectTimeout", defaults.connect_timeout),
+            read_timeout=config.get("readTimeout", defaults.read_timeout),
+            shared=bool(config.get("shared", defaults.shared)),
+        )
+
+    def get_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def get_timeout(self, timeout: Optional[httpx.Timeout] = None) -> httpx.Timeout:
+        """Apply the configured connect/read timeouts on top of the transport's defaults."""
+        if timeout is None:
+            timeout = httpx.Timeout(DEFAULT_TIMEOUT, read=DEFAULT_READ_TIMEOUT)
+        return httpx.Timeout(
+            connect=(
+                self.connect_timeout
+                if self.connect_timeout is not None
+                else timeout.connect
+            ),
+            read=self.read_timeout if self.read_timeout is not None else timeout.read,
+            write=timeout.write,
+            pool=timeout.pool,
+        )
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """Handle on a pooled transport; closing it releases the pool's reference."""
+
+    def __init__(self, pool: "TransportPool", key: Tuple, transport):
+        self._pool = pool
+        self._key = key
+        self._transport = transport
+        self._closed = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        await self._pool.release(self._key)
+
+
+class TransportPool:
+    """Reference-counted httpx transports keyed by origin and settings."""
+
+    def __init__(self):
+        self._transports: Dict[Tuple, list] = {}
+
+    def acquire(self, url: str, settings: TransportSettings) -> SharedTransport:
+        parsed = httpx.URL(url)
+        origin = (parsed.scheme, parsed.host, parsed.port)
+        key = (origin, settings) if settings.shared else (origin, settings, object())
+
+        entry = self._transports.get(key)
+        if entry is None:
+            http2 = settings.http2
+            if http2 and not is_http2_available():
+                logger.warning(
+                    "HTTP/2 requested for %s but the 'h2' package is not installed, "
+                    "falling back to HTTP/1.1. Install it with `pip install mcpo[http2]`.",
+                    url,
+                )
+                http2 = False
+            transport = httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=settings.get_limits(),
+            )
+            entry = self._transports[key] = [transport, 0]
+        entry[1] += 1
+        return SharedTransport(self, key, entry[0])
+
+    async def release(self, key: Tuple) -> None:
+        entry = self._transports.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._transports[key]
+            await entry[0].aclose()
+
+    def __len__(self) -> int:
+        return len(self._transports)
+
+
+shared_transports = TransportPool()
+
+
+def get_http_client_factory(
+    url: str,
+    settings: Optional[TransportSettings] = None,
+    pool: TransportPool = shared_transports,
+):
+    """
+    Return an httpx client factory for `sse_client`/`streamablehttp_client` that
+    uses a pooled transport for the origin of `url`.
+    """
+    settings = settings or TransportSettings()
+
+    def create_http_client(
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[httpx.Timeout] = None,
+        auth: Optional[httpx.Auth] = None,
+    ) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(
+            headers=headers,
+            timeout=settings.get_timeout(timeout),
+            auth=auth,
+            transport=pool.acquire(url, settings),
+        )
+        if is_tracing_enabled():
+            instrument_http_client(client)
+        return client
+
+    return create_http_client
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from mcpo.utils.auth import check_bearer_token
+from mcpo.utils.main import ToolCaller
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_PATH = "/ws"
+
+# JSON-RPC error codes; tool call failures use SERVER_ERROR with the HTTP
+# status and detail the route would have responded with
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+# Close code for a failed authentication (policy violation)
+WS_POLICY_VIOLATION = 1008
+
+AUTH_TIMEOUT = 10.0
+
+
+def rpc_error(request_id, code: int, message: str, data: Any = None) -> dict:
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+def http_error(request_id, e: HTTPException) -> dict:
+    message = e.detail.get("message") if isinstance(e.detail, dict) else None
+    return rpc_error(
+        request_id,
+        SERVER_ERROR,
+        message or str(e.detail),
+        {"status": e.status_code, "detail": e.detail},
+    )
+
+
+def read_response_body(response: Response) -> Any:
+    """Load the JSON body of a response a tool call returned, such as a spilled file."""
+    if isinstance(response, FileResponse):
+        try:
+            with open(response.path) as f:
+                return json.load(f)
+        finally:
+            os.unlink(response.path)
+    return json.loads(response.body)
+
+
+class ToolCallSocket:
+    """
+    One WebSocket connection multiplexing JSON-RPC tool calls.
+
+    Each `tools/call` runs in its own task and is answered when it finishes,
+    so responses arrive out of order. While `max_in_flight` calls are
+    running, further calls are rejected with status 429, so reading (and
+    cancelling) never waits for calls to finish.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        get_callers: Callable[[Optional[str]], Optional[Dict[str, ToolCaller]]],
+        api_dependency=None,
+        max_in_flight: int = 64,
+    ):
+        self.websocket = websocket
+        self.get_callers = get_callers
+        self.api_dependency = api_dependency
+        self.max_in_flight = max_in_flight
+        self.send_lock = asyncio.Lock()
+        self.calls: Dict[Any, asyncio.Task] = {}
+
+    async def send(self, message: dict):
+        async with self.send_lock:
+            await self.websocket.send_json(message)
+
+    async def authenticate(self) -> bool:
+        """
+        Check the API key once per connection, from the Authorization header of
+        the handshake or else from an `authenticate` message sent first.
+        """
+        if self.api_dependency is None:
+            return True
+        scheme, _, token = self.websocket.headers.get("authorization", "").partition(
+            " "
+        )
+        if token and scheme.lower() == "bearer":
+            error = await check_bearer_token(self.api_dependency, token)
+        else:
+            try:
+                message = json.loads(
+                    await asyncio.wait_for(
+                        self.websocket.receive_text(), timeout=AUTH_TIMEOUT
+                    )
+                )
+            except (asyncio.TimeoutError, ValueError):
+                message = {}
+            if not isinstance(message, dict) or message.get("method") != "authenticate":
+                await self.websocket.close(
+                    code=WS_POLICY_VIOLATION, reason="Authentication required"
+                )
+                return False
+            params = message.get("params") or {}
+            error = await check_bearer_token(self.api_dependency, params.get("token"))
+            if error is None:
+                await self.send(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": message.get("id"),
+                        "result": {"authenticated": True},
+                    }
+                )
+        if error is not None:
+            await self.websocket.close(
+                code=WS_POLICY_VIOLATION, reason=str(error.detail)
+            )
+            return False
+        return True
+
+    async def run(self):
+        await self.websocket.accept()
+        if not await self.authenticate():
+            return
+        try:
+            while True:
+                text = await self.websocket.receive_text()
+                await self.handle(text)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in self.calls.values():
+                task.cancel()
+            await asyncio.gather(*self.calls.values(), return_exceptions=True)
+
+    async def handle(self, text: str):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            await self.send(rpc_error(None, PARSE_ERROR, "Parse error"))
+            return
+        if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+            await self.send(
+                rpc_error(
+                    message.get("id") if isinstance(message, dict) else None,
+                    INVALID_REQUEST,
+                    "Invalid request",
+                )
+            )
+            return
+
+        request_id = message.get("id")
+        method = message["method"]
+        params = message.get("params") or {}
+        if method == "tools/call":
+            if not isinstance(request_id, (str, int)) or request_id in self.calls:
+                await self.send(
+                    rpc_error(request_id, INVALID_REQUEST, "Missing or duplicate id")
+                )
+                return
+            if len(self.calls) >= self.max_in_flight:
+                await self.send(
+                    http_error(
+                        request_id,
+                        HTTPException(
+                            status_code=429,
+                            detail={"message": "Too many calls in flight"},
+                        ),
+                    )
+                )
+                return
+            task = asyncio.create_task(self.call(request_id, params))
+            self.calls[request_id] = task
+            task.add_done_callback(lambda _: self.finish(request_id))
+        elif method == "notifications/cancelled":
+            task = self.calls.get(params.get("requestId"))
+            if task is not None:
+                task.cancel()
+        elif method == "ping":
+            await self.send({"jsonrpc": "2.0", "id": request_id, "result": {}})
+        else:
+            await self.send(
+                rpc_error(request_id, METHOD_NOT_FOUND, f"Unknown method '{method}'")
+            )
+
+    def finish(self, request_id):
+        self.calls.pop(request_id, None)
+
+    async def call(self, request_id, params: dict):
+        callers = self.get_callers(params.get("server"))
+        caller = callers.get(params.get("name")) if callers else None
+        if caller is None:
+            await self.send(
+                rpc_error(
+                    request_id,
+                    METHOD_NOT_FOUND,
+                    f"Unknown tool '{params.get('name')}'",
+                )
+            )
+            return
+        try:
+            args = caller.validate(params.get("arguments"))
+        except ValidationError as e:
+            await self.send(
+                rpc_error(
+                    request_id,
+                    INVALID_PARAMS,
+                    "Invalid arguments",
+                    e.errors(include_url=False, include_context=False),
+                )
+            )
+            return
+
+        progress_callback = None
+        if params.get("progress"):
+
+            async def progress_callback(progress, total, message=None):
+                await self.send(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "notifications/progress",
+                        "params": {
+                            "requestId": request_id,
+                            "progress": progress,
+                            "total": total,
+                            "message": message,
+                        },
+                    }
+                )
+
+        try:
+            result = await caller.call(self.websocket, args, progress_callback)
+            if isinstance(result, Response):
+                result = await run_in_threadpool(read_response_body, result)
+        except HTTPException as e:
+            await self.send(http_error(request_id, e))
+            return
+        except Exception as e:
+            logger.exception(f"WebSocket call of '{params.get('name')}' failed")
+            await self.send(rpc_error(request_id, SERVER_ERROR, str(e)))
+            return
+        except asyncio.CancelledError:
+            try:
+                await self.send(rpc_error(request_id, SERVER_ERROR, "Cancelled"))
+            except Exception:
+                pass
+            raise
+        await self.send({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+
+def add_websocket_route(
+    app: FastAPI,
+    get_callers: Callable[[Optional[str]], Optional[Dict[str, ToolCaller]]],
+    api_dependency=None,
+):
+    """
+    Add a WebSocket endpoint calling the tools returned by `get_callers`, which
+    is passed the `server` param of each call.
+    """
+
+    @app.websocket(WEBSOCKET_PATH)
+    async def tool_call_socket(websocket: WebSocket):
+        await ToolCallSocket(websocket, get_callers, api_dependency).run()
+
+
+def add_server_websocket_route(app: FastAPI, api_dependency=None):
+    """Add a WebSocket endpoint for the tools of a server app."""
+    add_websocket_route(
+        app,
+        lambda server: getattr(app.state, "tool_callers", None),
+        api_dependency,
+    )
+
+
+def add_main_websocket_route(app: FastAPI, servers, api_dependency=None):
+    """
+    Add a WebSocket endpoint to the main app, calling the tools of the server
+    named by each call's `server` param.
+    """
+
+    def get_callers(server_name: Optional[str]):
+        for server in servers:
+            if getattr(server.state, "server_name", None) == server_name:
+                return getattr(server.state, "tool_callers", None)
+        return None
+
+    add_websocket_route(app, get_callers, api_dependency)